@@ -2,6 +2,7 @@
 ASGI config for SoftDesk project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The handler also streams the async responses, such as the events of the projects.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from SoftDesk.async_views import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SoftDesk.settings')
 
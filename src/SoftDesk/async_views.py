@@ -0,0 +1,209 @@
+"""
+Contains the async views and the streaming responses served by the ASGI application.
+Django 3.2 runs the synchronous views of an ASGI application one at a time in a single thread
+shared by the requests. An async view awaits the authentication, the permission checks and
+the queries of a DRF view in a bounded pool of database threads, and renders the response in
+the event loop, so the requests of a worker are served concurrently and a slow client only holds
+a coroutine.
+"""
+
+# lib
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+# asgiref
+from asgiref.sync import sync_to_async
+
+# django
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
+
+# instrumentation
+from SoftDesk.instrumentation import profile_queries
+
+
+class DatabasePool:
+    """
+    Thread pool of the database work of the async views, created on first use.
+    Each thread keeps its own connections, so ASYNC_DB_WORKERS bounds the connections opened by
+    the async views of a process. The expired and broken connections are closed around each call,
+    like around a request.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def executor(self):
+        """The executor with ASYNC_DB_WORKERS threads."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.ASYNC_DB_WORKERS,
+                        thread_name_prefix='async-db',
+                    )
+        return self._executor
+
+    @staticmethod
+    def call(func, args, kwargs):
+        """Runs func in a worker, its queries are profiled for a sampled request."""
+        close_old_connections()
+        try:
+            with profile_queries():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs func in the pool with the context variables of the caller and awaits its result.
+        Without workers, func runs in the thread of the synchronous code of the request.
+        """
+        if not settings.ASYNC_DB_WORKERS:
+            return await sync_to_async(func, thread_sensitive=True)(*args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(context.run, self.call, func, args, kwargs)
+        )
+
+
+database_pool = DatabasePool()
+
+
+def handle(drf_view, request, *args, **kwargs):
+    """
+    Authenticates the request, checks the permissions of the view and returns the response of
+    the handler of its method, which checks the object permissions. A single call of the pool
+    per request.
+    """
+    drf_view.initial(request, *args, **kwargs)
+    handler = getattr(drf_view, request.method.lower(), drf_view.http_method_not_allowed)
+    return handler(request, *args, **kwargs)
+
+
+def async_view(view_class, methods, **initkwargs):
+    """
+    Returns an async view serving the requests of methods of a DRF generic view with its
+    authentication, permissions, queryset, filters, pagination and serializer.
+    """
+
+    async def view(request, *args, **kwargs):
+        if request.method not in methods:
+            return HttpResponseNotAllowed(methods)
+        drf_view = view_class(**initkwargs)
+        drf_view.setup(request, *args, **kwargs)
+        drf_view.args, drf_view.kwargs = args, kwargs
+        drf_request = drf_view.initialize_request(request, *args, **kwargs)
+        drf_view.request = drf_request
+        drf_view.headers = drf_view.default_response_headers
+        try:
+            response = await database_pool.run(handle, drf_view, drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = drf_view.handle_exception(exc)
+        response = drf_view.finalize_response(drf_request, response, *args, **kwargs)
+        # Rendered here, Django would render it in the thread of the synchronous code.
+        return response.render()
+
+    view.view_class = view_class
+    view.view_initkwargs = initkwargs
+    view.__doc__ = view_class.__doc__
+    view.__module__ = view_class.__module__
+    view.__name__ = view.__qualname__ = f'Async{view_class.__name__}'
+    # Like the views of DRF, the session authentication enforces the CSRF checks.
+    view.csrf_exempt = True
+    return view
+
+
+def async_read_view(view_class, **initkwargs):
+    """Returns an async view serving the GET requests of a DRF generic view."""
+    return async_view(view_class, ['GET'], **initkwargs)
+
+
+# Receive channel of the ASGI request being served.
+current_receive = contextvars.ContextVar('current_receive')
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response whose content is also an async generator, sent by StreamingASGIHandler.
+    Its synchronous content is sent by the other handlers.
+    """
+
+    async def stream_content(self):
+        """Async generator of the bytes of the content, the synchronous content by default."""
+        for chunk in self.streaming_content:
+            yield chunk
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGI handler sending the content of an AsyncStreamingHttpResponse in the event loop, chunk by
+    chunk, until it ends or the client disconnects. Django 3.2 iterates the streaming responses
+    synchronously in the event loop, a stream waiting for its next chunk would block the loop.
+    """
+
+    async def __call__(self, scope, receive, send):
+        """
+        Override of the __call__ method to give the receive channel of the request to
+        send_response, the handler is shared by the requests.
+        """
+        token = current_receive.set(receive)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            current_receive.reset(token)
+
+    async def send_response(self, response, send):
+        """
+        Override of the send_response method to stream the async responses.
+        """
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            return await super().send_response(response, send)
+        headers = [
+            (str(header).encode('ascii'), str(value).encode('latin1'))
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start', 'status': response.status_code, 'headers': headers,
+        })
+        # The body is read, the next message is the disconnection of the client.
+        disconnect = asyncio.ensure_future(current_receive.get()())
+        content = response.stream_content()
+        chunk = None
+        try:
+            while True:
+                chunk = asyncio.ensure_future(content.__anext__())
+                await asyncio.wait({chunk, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    break
+                try:
+                    body = chunk.result()
+                except StopAsyncIteration:
+                    await send({'type': 'http.response.body'})
+                    break
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnect.cancel()
+            if chunk is not None and not chunk.done():
+                # The generator is cancelled at its await and runs its finally clauses.
+                chunk.cancel()
+                await asyncio.gather(chunk, return_exceptions=True)
+            await content.aclose()
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """Returns the ASGI application of the project, which streams the async responses."""
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
@@ -0,0 +1,24 @@
+"""SQLite backend tuned for concurrent writers."""
+
+# django
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Applies the SQLITE_PRAGMAS setting on each new connection (WAL journal, synchronous,
+    busy_timeout, mmap_size).
+    The transactions start with BEGIN IMMEDIATE: a deferred transaction which reads then writes
+    fails with "database is locked" without waiting for busy_timeout when another writer
+    committed in between.
+    """
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,302 @@
+"""
+Contains the performance instrumentation of the requests.
+InstrumentationMiddleware records the duration of every request per endpoint. A sampled request
+is also profiled: its database queries and their time, the time of the permission checks and of
+the serializers, and the size of its response. The profile is sent in the Server-Timing header
+and the histograms of the process are exposed in the Prometheus text format by MetricsView.
+"""
+
+# lib
+import random
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+# asgiref
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# django
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views import View
+
+# Profile of the sampled request being served, None otherwise.
+current_profile = ContextVar('current_profile', default=None)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative histogram of the observations of one endpoint, in fixed buckets."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        """Adds an observation to the first bucket it fits in."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Histograms of the process per metric and per endpoint.
+    Every process of a server has its own histograms, each one is scraped.
+    """
+    definitions = {
+        'request_duration_seconds': (DURATION_BUCKETS, "Duration of the requests."),
+        'db_queries': (COUNT_BUCKETS, "Database queries of the sampled requests."),
+        'db_duration_seconds': (DURATION_BUCKETS, "Query time of the sampled requests."),
+        'permission_duration_seconds': (
+            DURATION_BUCKETS, "Permission check time of the sampled requests."
+        ),
+        'serializer_duration_seconds': (
+            DURATION_BUCKETS, "Serializer time of the sampled requests."
+        ),
+        'response_bytes': (SIZE_BUCKETS, "Response size of the sampled requests."),
+    }
+
+    def __init__(self):
+        self.histograms = defaultdict(dict)
+        self._lock = Lock()
+
+    def observe(self, endpoint, values):
+        """Adds the values of a request by metric name."""
+        with self._lock:
+            for name, value in values.items():
+                histogram = self.histograms[name].get(endpoint)
+                if histogram is None:
+                    histogram = self.histograms[name][endpoint] = Histogram(
+                        self.definitions[name][0]
+                    )
+                histogram.observe(value)
+
+    def render(self):
+        """Returns the histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (buckets, description) in self.definitions.items():
+                metric = f'softdesk_{name}'
+                lines += [f'# HELP {metric} {description}', f'# TYPE {metric} histogram']
+                for endpoint, histogram in sorted(self.histograms[name].items()):
+                    label = f'endpoint="{endpoint}"'
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{label}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class RequestProfile:
+    """Queries and timings of a sampled request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = defaultdict(float)
+        self.open_spans = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper of the connections, times the queries."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings['db'] += perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def span(name):
+    """Adds the time of the block to the timing name of the sampled request, once if nested."""
+    profile = current_profile.get()
+    if profile is None or name in profile.open_spans:
+        yield
+        return
+    profile.open_spans.add(name)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += perf_counter() - start
+        profile.open_spans.discard(name)
+
+
+@contextmanager
+def profile_queries():
+    """Counts and times the queries of the current thread for the sampled request."""
+    profile = current_profile.get()
+    with ExitStack() as stack:
+        if profile is not None:
+            for connection in connections.all():
+                # Nested, such as in the middleware and then in the view, the queries are
+                # counted once.
+                if profile not in connection.execute_wrappers:
+                    stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+class InstrumentationMiddleware:
+    """
+    Records the duration of the requests per endpoint, the name of its url, and profiles
+    PERFORMANCE_SAMPLE_RATE of them. The profile of a sampled request is added to its response
+    in the Server-Timing header when SERVER_TIMING is set.
+    The middleware runs in the mode of the handler: under ASGI the requests are not funneled
+    through the single thread of the synchronous code. There the queries are profiled in the
+    thread of each view, see InstrumentedViewMixin, and in the database pool of the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            start = perf_counter()
+            response = self.get_response(request)
+            metrics.observe(self.endpoint(request), {
+                'request_duration_seconds': perf_counter() - start,
+            })
+            return response
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = perf_counter()
+        try:
+            with profile_queries():
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.record(request, response, profile, perf_counter() - start)
+
+    async def __acall__(self, request):
+        """Async version of __call__."""
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            start = perf_counter()
+            response = await self.get_response(request)
+            metrics.observe(self.endpoint(request), {
+                'request_duration_seconds': perf_counter() - start,
+            })
+            return response
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.record(request, response, profile, perf_counter() - start)
+
+    def record(self, request, response, profile, duration):
+        """Records the profile of a sampled request and adds it to its response."""
+        size = len(response.content) if not response.streaming else 0
+        metrics.observe(self.endpoint(request), {
+            'request_duration_seconds': duration,
+            'db_queries': profile.queries,
+            'db_duration_seconds': profile.timings['db'],
+            'permission_duration_seconds': profile.timings['permissions'],
+            'serializer_duration_seconds': profile.timings['serializer'],
+            'response_bytes': size,
+        })
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.timings["db"] * 1000:.2f};desc="{profile.queries} queries"',
+                f'permissions;dur={profile.timings["permissions"] * 1000:.2f}',
+                f'serializer;dur={profile.timings["serializer"] * 1000:.2f}',
+                f'total;dur={duration * 1000:.2f}',
+            ])
+        return response
+
+    @staticmethod
+    def endpoint(request):
+        """Name of the url of the request."""
+        match = getattr(request, 'resolver_match', None)
+        return (match.url_name or match.view_name) if match else 'unmatched'
+
+
+class InstrumentedViewMixin:
+    """
+    Profiles the queries of a DRF view in its own thread and times its permission checks for
+    the sampled requests. Under ASGI, a synchronous view runs in another thread than the
+    middleware.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Override of the dispatch method to profile the queries of the thread of the view.
+        """
+        with profile_queries():
+            return super().dispatch(request, *args, **kwargs)
+
+    def check_permissions(self, request):
+        """
+        Override of the check_permissions method to time it.
+        """
+        with span('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        """
+        Override of the check_object_permissions method to time it.
+        """
+        with span('permissions'):
+            super().check_object_permissions(request, obj)
+
+
+class TimedSerializerMixin:
+    """
+    Times the representation and the validation of a serializer for the sampled requests.
+    The nested serializers are part of the time of their parent.
+    """
+
+    def to_representation(self, instance):
+        """
+        Override of the to_representation method to time it, called for each item of a list.
+        """
+        if current_profile.get() is None:
+            return super().to_representation(instance)
+        with span('serializer'):
+            return super().to_representation(instance)
+
+    def run_validation(self, *args, **kwargs):
+        """
+        Override of the run_validation method to time it.
+        """
+        if current_profile.get() is None:
+            return super().run_validation(*args, **kwargs)
+        with span('serializer'):
+            return super().run_validation(*args, **kwargs)
+
+
+class MetricsView(View):
+    """
+    Exposes the histograms of the process to Prometheus.
+    Disabled without METRICS_TOKEN, which the scraper sends as a bearer token.
+    """
+
+    def get(self, request):
+        """Returns the histograms in the Prometheus text format."""
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not settings.METRICS_TOKEN \
+                or not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), expected):
+            raise Http404
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
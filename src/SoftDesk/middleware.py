@@ -0,0 +1,89 @@
+"""Contains the middlewares shared by the apps."""
+
+# lib
+import warnings
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+
+# rest_framework
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+# routers
+from SoftDesk.routers import use_primary
+
+
+class ConnectionHealthCheckMiddleware:
+    """
+    Checks the persistent database connections reused by a request and closes the broken
+    ones, Django opens a new connection on the next query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for connection in connections.all():
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tells ReplicaRouter whether the request reads from the primary database.
+    After an unsafe request, the reads of the same user stick to the primary database for
+    REPLICA_STICKY_SECONDS so the user reads their own writes despite the replication lag.
+    The user is identified by the access token, before the authentication of the view. The
+    flag is kept in REPLICA_STICKY_CACHE_ALIAS, which must be shared by the workers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if isinstance(self.cache, LocMemCache):
+            warnings.warn(
+                f'The cache {settings.REPLICA_STICKY_CACHE_ALIAS!r} of REPLICA_STICKY_CACHE_ALIAS '
+                'is local to the process, the reads following a write served by another worker '
+                'may reach a lagging replica.',
+                RuntimeWarning,
+            )
+
+    @property
+    def cache(self):
+        """The cache backend storing the sticky users."""
+        return caches[settings.REPLICA_STICKY_CACHE_ALIAS]
+
+    @staticmethod
+    def get_user_id(request):
+        """Returns the user id of the access token of the request, or None."""
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+            return None
+        try:
+            return UntypedToken(header[1]).get(api_settings.USER_ID_CLAIM)
+        except TokenError:
+            return None
+
+    @staticmethod
+    def sticky_key(user_id):
+        """Cache key set while the reads of user_id stick to the primary database."""
+        return f'replica:primary:{user_id}'
+
+    def __call__(self, request):
+        user_id = self.get_user_id(request)
+        is_write = request.method not in SAFE_METHODS
+        primary = is_write or (user_id is not None and self.cache.get(self.sticky_key(user_id)))
+        token = use_primary.set(bool(primary))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        if is_write and user_id is not None:
+            self.cache.set(self.sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
@@ -0,0 +1,139 @@
+"""Contains the pagination classes shared by the apps."""
+
+# lib
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+# django
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# rest_framework
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def seek_after(ordering, position):
+    """
+    Lookup of the rows after position, the values of the fields of ordering, compared as tuples
+    in the directions of ordering.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class CreatedTimeCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the creation time, the id breaks the ties so the cursors are stable.
+    Each page is a range scan from the cursor position, deep pages cost the same as the first.
+    """
+    ordering = ('-created_time', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class IdCursorPagination(CreatedTimeCursorPagination):
+    """
+    Keyset pagination on the primary key for the models without creation time.
+    """
+    ordering = 'id'
+
+
+class KeysetCursorPagination(CreatedTimeCursorPagination):
+    """
+    Keyset pagination on the whole ordering of the view, such as (priority, created_time, id)
+    for ?ordering=priority. CursorPagination only seeks on the first field and skips the ties
+    with an offset, capped by offset_cutoff: a page of a field shared by many rows is never
+    left. Here the cursor holds the value of every field of the ordering, which ends with a
+    unique field, and a page is the rows after it in the order of the tuple.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Override of the paginate_queryset method to seek from the values of the whole ordering.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        position, reverse = self.decode_position(request)
+        # The previous page is read backwards from the first row of the current one.
+        ordering = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(seek_after(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    @staticmethod
+    def invert(field):
+        """The field of an ordering in the other direction."""
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def decode_position(self, request):
+        """Returns the values of the ordering in the cursor, or None, and the direction."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            values = cursor['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, BinasciiError, FieldDoesNotExist,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, instance, reverse):
+        """Returns the url of the page after or before instance."""
+        values = [str(getattr(instance, field.lstrip('-'))) for field in self.ordering]
+        cursor = {'p': values, 'r': 1} if reverse else {'p': values}
+        encoded = b64encode(json.dumps(cursor).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        """
+        Override of the get_next_link method to encode the last row of the page.
+        """
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_position(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        """
+        Override of the get_previous_link method to encode the first row of the page.
+        """
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_position(self.page[0], reverse=True)
+
+
+class SearchPagination(LimitOffsetPagination):
+    """
+    Offset pagination of the ranked search results, which have no unique key to seek from.
+    """
+    default_limit = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_limit = settings.MAX_PAGE_SIZE
@@ -0,0 +1,38 @@
+"""Contains the database routers."""
+
+# lib
+import random
+from contextvars import ContextVar
+
+# django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# True while a request must read from the primary database, None outside of the requests.
+use_primary = ContextVar('use_primary', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of the safe requests to a random replica of REPLICA_DATABASES and every
+    other query to the primary database.
+    The reads of the unsafe requests, of the requests following a write of the same user
+    (see ReplicaRoutingMiddleware), of the transactions and outside of the requests go to the
+    primary database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if use_primary.get() is not False or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas are migrated by the replication.
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,267 @@
+"""Contains the tests of the project settings modules."""
+
+# lib
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import warnings
+from time import perf_counter
+
+# asgiref
+from asgiref.sync import async_to_sync
+
+# django
+from django.core.cache import cache, caches
+from django.core.signals import request_started, request_finished
+from django.db import close_old_connections, connections, transaction
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, \
+    AsyncClient, override_settings
+from django.urls import path
+
+# rest_framework
+from rest_framework.test import APIClient
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+# models
+from accounts.models import CustomUser
+
+# routing
+from SoftDesk.middleware import ReplicaRoutingMiddleware
+from SoftDesk.routers import ReplicaRouter, use_primary
+
+# database backend
+from SoftDesk.db.backends.sqlite3.base import DatabaseWrapper
+
+# async views
+from SoftDesk.async_views import DatabasePool
+
+# instrumentation
+from SoftDesk.instrumentation import metrics
+
+
+async def slow_view(request):
+    """Async view waiting on a slow read."""
+    await asyncio.sleep(0.3)
+    return HttpResponse()
+
+
+urlpatterns = [path('slow/', slow_view)]
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'], REPLICA_STICKY_SECONDS=60)
+class ReplicaRouterTestCase(TransactionTestCase):
+    """
+    The reads of the safe requests go to the replicas, except right after a write.
+    The test is not run in a transaction, which would send the reads to the primary database.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        # The cache of the tests is local to the process.
+        with self.assertWarnsRegex(RuntimeWarning, 'REPLICA_STICKY_CACHE_ALIAS'):
+            self.middleware = ReplicaRoutingMiddleware(self.get_response)
+        self.factory = RequestFactory()
+        self.user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        self.other = CustomUser.objects.create_user('other@softdesk.fr', 'Other', 'Test', 'pw')
+
+    def get_response(self, request):
+        """Records the database of the reads of the request."""
+        self.read_db = self.router.db_for_read(CustomUser)
+        return HttpResponse()
+
+    def request(self, method, user):
+        """Runs a request of user through the middleware and returns its read database."""
+        token = AccessToken.for_user(user)
+        request = getattr(self.factory, method)('/api/users/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.middleware(request)
+        return self.read_db
+
+    def test_outside_of_requests(self):
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+        self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+
+    def test_safe_request(self):
+        self.assertEqual(self.request('get', self.user), 'replica_1')
+
+    def test_read_your_writes(self):
+        self.assertEqual(self.request('post', self.user), 'default')
+        self.assertEqual(self.request('get', self.user), 'default')
+        self.assertEqual(self.request('get', self.other), 'replica_1')
+
+    def test_anonymous_request(self):
+        self.middleware(self.factory.get('/api/users/'))
+        self.assertEqual(self.read_db, 'replica_1')
+
+    def test_sticky_cache_shared_by_the_workers(self):
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            },
+        }, REPLICA_STICKY_CACHE_ALIAS='shared'):
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                self.middleware = ReplicaRoutingMiddleware(self.get_response)
+            self.request('post', self.user)
+            key = ReplicaRoutingMiddleware.sticky_key(self.user.pk)
+            self.assertTrue(caches['shared'].get(key))
+            self.assertIsNone(caches['default'].get(key))
+            # Another worker, whose local cache is empty, reads from the primary database.
+            caches['default'].clear()
+            self.assertEqual(self.request('get', self.user), 'default')
+
+
+class DatabasePoolTestCase(SimpleTestCase):
+    """
+    The database work of the async views runs in the pool with the context of the request.
+    """
+
+    @staticmethod
+    def current():
+        """Returns the thread and the primary database flag seen by the database work."""
+        return threading.current_thread().name, use_primary.get()
+
+    async def run_in(self, pool):
+        """Runs current in pool within a request reading from the primary database."""
+        use_primary.set(True)
+        return await pool.run(self.current)
+
+    @override_settings(ASYNC_DB_WORKERS=2)
+    def test_pool(self):
+        thread, primary = async_to_sync(self.run_in)(DatabasePool())
+        self.assertTrue(thread.startswith('async-db'))
+        self.assertTrue(primary)
+
+    @override_settings(ASYNC_DB_WORKERS=0)
+    def test_without_workers(self):
+        thread, primary = async_to_sync(self.run_in)(DatabasePool())
+        self.assertEqual(thread, threading.current_thread().name)
+        self.assertTrue(primary)
+
+
+class TunedSQLiteTestCase(SimpleTestCase):
+    """
+    The tuned SQLite backend applies SQLITE_PRAGMAS to its connections and starts its
+    transactions with BEGIN IMMEDIATE.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tuned.sqlite3')
+        connection = DatabaseWrapper(
+            {**connections['default'].settings_dict, 'NAME': self.path}, alias='tuned'
+        )
+        connections['tuned'] = connection
+        self.addCleanup(connections.__delitem__, 'tuned')
+        self.addCleanup(connection.close)
+        self.connection = connection
+
+    def pragma(self, name):
+        """Returns the value of the pragma on the connection."""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                                       'busy_timeout': 1234})
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # 1 is NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_immediate_transaction(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='tuned'):
+            # The write lock is taken by BEGIN, before any statement of the transaction.
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1, SERVER_TIMING=True, METRICS_TOKEN='secret')
+class InstrumentationTestCase(TestCase):
+    """
+    The sampled requests are profiled and every request is counted per endpoint.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        self.client.force_authenticate(self.user)
+
+    def count(self, metric, endpoint):
+        """Returns the number of observations of metric for endpoint."""
+        histogram = metrics.histograms[metric].get(endpoint)
+        return sum(histogram.counts) if histogram else 0
+
+    def test_sampled_request(self):
+        queries = self.count('db_queries', 'list_create_project')
+        response = self.client.get('/api/projects/')
+        timing = response['Server-Timing']
+        for name in ('db', 'permissions', 'serializer', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertIn('desc="2 queries"', timing)
+        self.assertEqual(self.count('db_queries', 'list_create_project'), queries + 1)
+
+    async def test_sampled_asgi_request(self):
+        # The connections of the test are kept, like by the test client.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        # The synchronous view runs in another thread than the middleware.
+        response = await AsyncClient().get(
+            '/api/projects/', authorization=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        queries = self.count('db_queries', 'list_create_project')
+        requests = self.count('request_duration_seconds', 'list_create_project')
+        self.assertFalse(self.client.get('/api/projects/').has_header('Server-Timing'))
+        self.assertEqual(self.count('db_queries', 'list_create_project'), queries)
+        self.assertEqual(
+            self.count('request_duration_seconds', 'list_create_project'), requests + 1
+        )
+
+    def test_metrics(self):
+        self.client.get('/api/projects/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 404)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4')
+        body = response.content.decode()
+        self.assertIn('# TYPE softdesk_serializer_duration_seconds histogram', body)
+        self.assertIn('softdesk_db_queries_bucket{endpoint="list_create_project",le="+Inf"}', body)
+
+
+@override_settings(ROOT_URLCONF='SoftDesk.tests', PERFORMANCE_SAMPLE_RATE=1)
+class AsyncInstrumentationTestCase(SimpleTestCase):
+    """
+    Under ASGI the instrumented requests run concurrently.
+    """
+
+    async def get_concurrently(self, count):
+        """Sends count requests at once to the slow view."""
+        client = AsyncClient()
+        return await asyncio.gather(*(client.get('/slow/') for _ in range(count)))
+
+    def test_concurrent_requests(self):
+        start = perf_counter()
+        responses = async_to_sync(self.get_concurrently)(4)
+        # 1.2 s if the requests were serialized.
+        self.assertLess(perf_counter() - start, 0.9)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('total;dur=', response['Server-Timing'])
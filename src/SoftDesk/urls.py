@@ -4,6 +4,9 @@
 from django.contrib import admin
 from django.urls import path, include
 
+# instrumentation
+from SoftDesk.instrumentation import MetricsView
+
 urlpatterns = [
     # admin
     path('api/admin/', admin.site.urls),
@@ -11,4 +14,6 @@ urlpatterns = [
     path('api/', include("accounts.urls")),
     # projects
     path('api/', include("projects.urls")),
+    # metrics
+    path('api/metrics/', MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,84 @@
+"""Contains the authentication classes of accounts app."""
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# rest_framework
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """
+    Cache of the authenticated users, shared between the requests.
+    Uses the cache alias AUTH_USER_CACHE_ALIAS. The entries are keyed by the user id and a
+    version of the user bumped by each invalidation: a request which loaded the user before an
+    invalidation stores it under the former version, where it is never read.
+    """
+
+    @property
+    def cache(self):
+        """The cache backend storing the users."""
+        return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+    @staticmethod
+    def version_key(user_id):
+        """Cache key of the version of user_id."""
+        return f'auth:user-version:{user_id}'
+
+    def key(self, user_id):
+        """Cache key of the current version of user_id."""
+        version = self.cache.get(self.version_key(user_id), 0)
+        return f'auth:user:{user_id}:{version}'
+
+    def get(self, key):
+        """Returns the cached user or None."""
+        return self.cache.get(key)
+
+    def set(self, key, user):
+        """Caches the user."""
+        self.cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+    def bump(self, user_id):
+        """Bumps the version of user_id."""
+        try:
+            self.cache.incr(self.version_key(user_id))
+        except ValueError:
+            self.cache.set(self.version_key(user_id), 1, None)
+
+    def invalidate(self, user_id):
+        """
+        Bumps the version of user_id, its cached entries are no longer read. The version is
+        bumped again once the transaction commits: a user read by another request before the
+        commit is stored under the version of the change.
+        """
+        self.bump(user_id)
+        transaction.on_commit(lambda: self.bump(user_id))
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication reading the user of the token from the user cache, the user row is only
+    fetched on a miss. The entries are invalidated by the signals of accounts app when the user
+    is saved or deleted, and expire after AUTH_USER_CACHE_TIMEOUT seconds otherwise.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Override of the get_user method to read the user from the cache.
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        key = user_cache.key(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            # Raises AuthenticationFailed for the unknown and inactive users, never cached.
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+        return user
@@ -0,0 +1,168 @@
+"""
+Contains the filter in front of the refresh token blacklist.
+A refresh checks whether its token is blacklisted. With TOKEN_BLACKLIST_FILTER, the tokens
+blacklisted until the last build are kept in a bloom filter of the process, and the tokens
+blacklisted since then in a set in the shared cache, which expire with the tokens. A token absent
+from both is not blacklisted, the table is only read for the tokens found by one of them.
+Otherwise the table is read for every refresh.
+"""
+
+# lib
+import hashlib
+import math
+from threading import Lock, Thread
+from time import monotonic, time
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with false positives but no false negatives.
+    The bits are sized for a capacity and a false positive rate at that capacity.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, MIN_CAPACITY)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        """Positions of the bits of value, derived from two 64 bits hashes."""
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value):
+        """Adds value to the filter."""
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value)
+        )
+
+
+class TokenBlacklistFilter:
+    """
+    Bloom filter of the blacklisted tokens of the process and set of the recently blacklisted
+    tokens in the cache alias TOKEN_BLACKLIST_CACHE_ALIAS.
+    The bloom filter is built on the first lookup, then rebuilt in a background thread every
+    TOKEN_BLACKLIST_FILTER_TTL seconds. The set must be shared by the processes, with a
+    process-local cache a token blacklisted by another process is only seen after the rebuild:
+    the filter is only used with TOKEN_BLACKLIST_FILTER.
+    """
+
+    def __init__(self):
+        self.bloom = None
+        self.built_at = None
+        self._lock = Lock()
+        self._rebuilding = False
+
+    @property
+    def cache(self):
+        """The cache backend storing the recently blacklisted tokens."""
+        return caches[settings.TOKEN_BLACKLIST_CACHE_ALIAS]
+
+    @staticmethod
+    def key(jti):
+        """Cache key of a blacklisted token."""
+        return f'blacklist:jti:{jti}'
+
+    def build(self):
+        """Returns a bloom filter of the unexpired blacklisted tokens."""
+        jtis = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()) \
+            .values_list('token__jti', flat=True)
+        bloom = BloomFilter(2 * jtis.count(), settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE)
+        for jti in jtis.iterator(chunk_size=10000):
+            bloom.add(jti)
+        return bloom
+
+    def rebuild(self):
+        """Replaces the bloom filter, the lookups use the former one meanwhile."""
+        started_at = monotonic()
+        try:
+            bloom = self.build()
+            with self._lock:
+                self.bloom, self.built_at = bloom, started_at
+        finally:
+            self._rebuilding = False
+            connection.close()
+
+    def get_bloom(self):
+        """Returns the bloom filter, built or refreshed if needed."""
+        with self._lock:
+            bloom = self.bloom
+            stale = bloom is not None and not self._rebuilding \
+                and monotonic() - self.built_at > settings.TOKEN_BLACKLIST_FILTER_TTL
+            if stale:
+                self._rebuilding = True
+        if bloom is None:
+            bloom = self.build()
+            with self._lock:
+                if self.bloom is None:
+                    self.bloom, self.built_at = bloom, monotonic()
+        elif stale:
+            Thread(target=self.rebuild, daemon=True).start()
+        return bloom
+
+    def add(self, jti, exp):
+        """Adds a token blacklisted in the database, until its expiration."""
+        if not settings.TOKEN_BLACKLIST_FILTER:
+            return
+        timeout = int(exp - time())
+        if timeout > 0:
+            self.cache.set(self.key(jti), True, timeout)
+        bloom = self.get_bloom()
+        with self._lock:
+            bloom.add(jti)
+
+    def is_blacklisted(self, jti):
+        """The token is blacklisted, the table is only read if the filters may contain it."""
+        if not settings.TOKEN_BLACKLIST_FILTER:
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if self.cache.get(self.key(jti)):
+            return True
+        if jti not in self.get_bloom():
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+token_blacklist = TokenBlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    Refresh token checked and blacklisted through the blacklist filter.
+    """
+
+    def check_blacklist(self):
+        """
+        Override of the check_blacklist method to look the token up in the filter first.
+        """
+        if token_blacklist.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        """
+        Override of the blacklist method to add the token to the filter.
+        """
+        result = super().blacklist()
+        token_blacklist.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
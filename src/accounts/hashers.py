@@ -0,0 +1,189 @@
+"""
+Contains the password hashers of accounts app.
+The costs of the hashers are read from the settings, a hash made with other costs is upgraded
+at the next login. The key derivations run in a bounded thread pool: they release the GIL, so
+PASSWORD_HASHING_WORKERS derivations run in parallel and the others wait for a worker instead
+of competing for the CPU. The calling thread waits for the derivation: under ASGI, the
+synchronous views run one at a time in the thread of the synchronous code of Django, so the
+views hashing a password are also served by the async views of /api/async/, whose threads of
+the database pool wait for the derivations while the event loop serves the other requests.
+"""
+
+# lib
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+
+# django
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare, get_random_string
+from django.utils.translation import gettext_noop as _
+
+
+class HashingPool:
+    """
+    Thread pool of the key derivations, created on first use.
+    A derivation requested from a worker, such as the encode of a verify, runs in place.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = Lock()
+        self._local = local()
+
+    @property
+    def executor(self):
+        """The executor with PASSWORD_HASHING_WORKERS threads."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.PASSWORD_HASHING_WORKERS,
+                        thread_name_prefix='password-hashing',
+                    )
+        return self._executor
+
+    def call(self, func, args, kwargs):
+        """Runs func in a worker."""
+        self._local.active = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.active = False
+
+    def run(self, func, *args, **kwargs):
+        """Runs func in the pool and waits for its result."""
+        if getattr(self._local, 'active', False) or not settings.PASSWORD_HASHING_WORKERS:
+            return func(*args, **kwargs)
+        return self.executor.submit(self.call, func, args, kwargs).result()
+
+
+hashing_pool = HashingPool()
+
+
+class ThreadPoolHasherMixin:
+    """
+    Runs the encode and verify methods of a hasher in the hashing pool.
+    """
+
+    def encode(self, *args, **kwargs):
+        """
+        Override of the encode method to derive the key in the hashing pool.
+        """
+        return hashing_pool.run(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        """
+        Override of the verify method to derive the key in the hashing pool.
+        """
+        return hashing_pool.run(super().verify, *args, **kwargs)
+
+
+class BaseScryptPasswordHasher(hashers.BasePasswordHasher):
+    """
+    Secure password hashing using the scrypt algorithm of hashlib, memory-hard like Argon2
+    without a third-party library. The cost is PASSWORD_SCRYPT_WORK_FACTOR (N),
+    PASSWORD_SCRYPT_BLOCK_SIZE (r) and PASSWORD_SCRYPT_PARALLELISM (p), a derivation uses
+    128 * N * r bytes. The format is the one of the scrypt hasher of Django 4.
+    """
+    algorithm = 'scrypt'
+
+    def salt(self):
+        """Returns a random salt of 128 bits."""
+        return get_random_string(22)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or settings.PASSWORD_SCRYPT_WORK_FACTOR
+        r = r or settings.PASSWORD_SCRYPT_BLOCK_SIZE
+        p = p or settings.PASSWORD_SCRYPT_PARALLELISM
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r * p,
+            dklen=64
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def decode(self, encoded):
+        algorithm, n, salt, r, p, hash_ = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(n),
+            'salt': salt,
+            'block_size': int(r),
+            'parallelism': int(p),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password, decoded['salt'], decoded['work_factor'], decoded['block_size'],
+            decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded['work_factor'], decoded['block_size'], decoded['parallelism']
+        ) != (
+            settings.PASSWORD_SCRYPT_WORK_FACTOR, settings.PASSWORD_SCRYPT_BLOCK_SIZE,
+            settings.PASSWORD_SCRYPT_PARALLELISM,
+        )
+
+    def harden_runtime(self, password, encoded):
+        # The work factor is a power of two, the extra time of an older hash is not padded.
+        pass
+
+
+class ScryptPasswordHasher(ThreadPoolHasherMixin, BaseScryptPasswordHasher):
+    """
+    scrypt hasher deriving the keys in the hashing pool.
+    """
+
+
+class Argon2PasswordHasher(ThreadPoolHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2 hasher of Django with the costs PASSWORD_ARGON2_TIME_COST,
+    PASSWORD_ARGON2_MEMORY_COST and PASSWORD_ARGON2_PARALLELISM.
+    Requires the argon2-cffi library.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class PBKDF2PasswordHasher(ThreadPoolHasherMixin, hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher of Django with PASSWORD_PBKDF2_ITERATIONS iterations, verifies the hashes
+    made before the change of hasher.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,56 @@
+"""Benchmark of the password hashers."""
+
+# lib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+# django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers, make_password
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Measures the password verifications per second of each hasher of PASSWORD_HASHERS, the cost
+    of a login, with N request threads verifying in parallel through the hashing pool.
+    """
+    help = "Benchmark the logins per second and per core of the password hashers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+            help="Numbers of request threads."
+        )
+        parser.add_argument(
+            '--logins', type=int, default=50, help="Verifications per hasher and thread count."
+        )
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        self.stdout.write(
+            f"{cores} cores, {settings.PASSWORD_HASHING_WORKERS} hashing workers"
+        )
+        for hasher in get_hashers():
+            try:
+                encoded = make_password('benchmark-password', hasher=hasher.algorithm)
+            except ValueError as err:
+                # The library of the hasher is not installed.
+                self.stdout.write(f"{hasher.algorithm:<16} | skipped: {err}")
+                continue
+            for threads in sorted(set(options['threads'])):
+                with ThreadPoolExecutor(max_workers=threads) as clients:
+                    start = perf_counter()
+                    results = list(clients.map(
+                        lambda _: hasher.verify('benchmark-password', encoded),
+                        range(options['logins'])
+                    ))
+                    duration = perf_counter() - start
+                assert all(results)
+                rate = options['logins'] / duration
+                used = min(threads, settings.PASSWORD_HASHING_WORKERS or threads, cores)
+                self.stdout.write(
+                    f"{hasher.algorithm:<16} | {threads:3} threads | {rate:8.1f} logins/s "
+                    f"| {rate / used:8.1f} logins/s per core"
+                )
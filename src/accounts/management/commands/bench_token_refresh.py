@@ -0,0 +1,90 @@
+"""Benchmark of the refresh token blacklist lookups."""
+
+# lib
+from datetime import timedelta
+from time import perf_counter
+from uuid import uuid4
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# blacklist
+from accounts.blacklist import token_blacklist
+
+# models
+from accounts.models import CustomUser
+
+# serializers
+from accounts.serializers import CustomTokenRefreshSerializer
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency of the validation of a token refresh as the blacklist grows, with the
+    blacklist read from the table and through the filter.
+    The dataset is created in a transaction which is rolled back at the end.
+    """
+    help = "Benchmark the token refresh latency as the blacklist grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help="Numbers of blacklisted tokens."
+        )
+        parser.add_argument('--refreshes', type=int, default=500, help="Refreshes per size.")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Rows per INSERT.")
+
+    def grow(self, user, count, batch_size):
+        """Blacklists count unexpired tokens of user."""
+        expires_at = timezone.now() + timedelta(days=1)
+        for start in range(0, count, batch_size):
+            jtis = [uuid4().hex for _ in range(min(batch_size, count - start))]
+            OutstandingToken.objects.bulk_create([
+                OutstandingToken(user=user, jti=jti, token='', expires_at=expires_at)
+                for jti in jtis
+            ])
+            BlacklistedToken.objects.bulk_create([
+                BlacklistedToken(token=token)
+                for token in OutstandingToken.objects.filter(jti__in=jtis).only('pk')
+            ])
+
+    def measure(self, serializer_class, refresh, count):
+        """Returns the mean latency of a refresh in milliseconds."""
+        start = perf_counter()
+        for _ in range(count):
+            serializer_class(data={'refresh': refresh}).is_valid(raise_exception=True)
+        return (perf_counter() - start) / count * 1000
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create(email='bench-token-refresh@softdesk.local')
+            refresh = str(RefreshToken.for_user(user))
+            blacklisted = 0
+            for size in sorted(options['sizes']):
+                self.grow(user, size - blacklisted, options['batch_size'])
+                blacklisted = size
+
+                table = self.measure(TokenRefreshSerializer, refresh, options['refreshes'])
+                # The bloom filter of the process is built with the blacklist of this size.
+                token_blacklist.bloom = None
+                start = perf_counter()
+                with override_settings(TOKEN_BLACKLIST_FILTER=True):
+                    token_blacklist.get_bloom()
+                build = perf_counter() - start
+                with override_settings(TOKEN_BLACKLIST_FILTER=True):
+                    filtered = self.measure(
+                        CustomTokenRefreshSerializer, refresh, options['refreshes']
+                    )
+                self.stdout.write(
+                    f"{size:>9} blacklisted | table {table:7.3f} ms | filter {filtered:7.3f} ms "
+                    f"| filter built in {build:6.2f} s"
+                )
+            transaction.set_rollback(True)
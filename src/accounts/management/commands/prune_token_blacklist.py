@@ -0,0 +1,47 @@
+"""Pruning of the expired tokens of the blacklist."""
+
+# lib
+from time import sleep
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+
+class Command(BaseCommand):
+    """
+    Deletes the expired outstanding tokens and their blacklist entries by batches, each batch in
+    its own short transaction, so the pruning of millions of rows does not hold the tables.
+    Meant to be scheduled, for instance daily by cron. Unlike flushexpiredtokens, at most a
+    batch of rows is loaded in memory.
+    """
+    help = "Delete the expired outstanding and blacklisted tokens by batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000, help="Number of tokens per DELETE."
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0, help="Seconds between two batches."
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk')
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                pks = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+                if not pks:
+                    break
+                # The blacklist entries have no dependents, they are deleted without loading.
+                BlacklistedToken.objects.filter(token_id__in=pks).delete()
+                OutstandingToken.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            if options['pause']:
+                sleep(options['pause'])
+        self.stdout.write(f"{deleted} expired tokens deleted.")
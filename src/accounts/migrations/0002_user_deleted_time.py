@@ -0,0 +1,18 @@
+# Generated by Django 3.2.5 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='deleted_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
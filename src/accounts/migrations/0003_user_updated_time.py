@@ -0,0 +1,18 @@
+# Generated by Django 3.2.5 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_deleted_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
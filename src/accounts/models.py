@@ -50,6 +50,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     last_name = models.CharField(max_length=150, blank=True)
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Set when the user is deactivated and its rows deleted by projects.deletion.
+    deleted_time = models.DateTimeField(null=True, editable=False)
+    # Part of the validators of the responses serializing the users, see ConditionalGetMixin.
+    updated_time = models.DateTimeField(auto_now=True, db_index=True)
 
     objects = CustomAccountManager()
 
@@ -5,17 +5,24 @@ from django.utils.text import gettext_lazy as _
 
 # rest_framework
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework import serializers, fields
 
 # rest_auth
 from rest_auth.registration.serializers import RegisterSerializer
 
+# instrumentation
+from SoftDesk.instrumentation import TimedSerializerMixin
+
+# blacklist
+from accounts.blacklist import FilteredRefreshToken
+
 # models
 from accounts.models import CustomUser
 
 
-class CustomRegistrationSerializer(RegisterSerializer):
+class CustomRegistrationSerializer(TimedSerializerMixin, RegisterSerializer):
     """
     Inherits from RegisterSerializer.
     Allows to serialize or deserialize the register for CustomUser.
@@ -37,7 +44,7 @@ class CustomRegistrationSerializer(RegisterSerializer):
         user.save(update_fields=['first_name', 'last_name'])
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Allows to serialize or deserialize the user according
     to the verb of the request.
@@ -49,7 +56,7 @@ class CustomUserSerializer(serializers.ModelSerializer):
         fields = ('id', 'email', 'first_name', "last_name")
 
 
-class RefreshTokenSerializer(serializers.Serializer):
+class RefreshTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     Allows to serialize refresh token.
     """
@@ -81,12 +88,39 @@ class RefreshTokenSerializer(serializers.Serializer):
         adds it to the blacklist.
         """
         try:
-            RefreshToken(self.token).blacklist()
+            FilteredRefreshToken(self.token).blacklist()
         except TokenError:
             self.fail('bad_token')
 
 
-class UpdatePasswordSerializer(serializers.Serializer):
+class CustomTokenRefreshSerializer(TimedSerializerMixin, TokenRefreshSerializer):
+    """
+    Inherits from TokenRefreshSerializer.
+    Checks the refresh token against the blacklist filter.
+    """
+
+    def validate(self, attrs):
+        """
+        Override of the validate method to use FilteredRefreshToken.
+        """
+        refresh = FilteredRefreshToken(attrs['refresh'])
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    # Attempt to blacklist the given refresh token
+                    refresh.blacklist()
+                except AttributeError:
+                    # If blacklist app not installed, `blacklist` method will
+                    # not be present
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class UpdatePasswordSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     Allows to serialize refresh old and new password.
     """
@@ -100,7 +134,7 @@ class UpdatePasswordSerializer(serializers.Serializer):
         pass
 
 
-class DestroyCustomUserSerializer(serializers.Serializer):
+class DestroyCustomUserSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     Allows to serialize password.
     """
@@ -0,0 +1,20 @@
+"""Contains the signal receivers of accounts app."""
+
+# django
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+# authentication
+from accounts.authentication import user_cache
+
+# models
+from accounts.models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    The password, the active flag or the profile of the user changed, or the user was deleted.
+    """
+    user_cache.invalidate(instance.pk)
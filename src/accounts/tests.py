@@ -1,3 +1,260 @@
-from django.test import TestCase
+"""Contains the tests of accounts app."""
 
-# Create your tests here.
+# lib
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from threading import Barrier, current_thread
+from unittest import mock
+
+# django
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.utils import timezone
+
+# rest_framework
+from rest_framework.test import APITestCase
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# authentication
+from accounts.authentication import user_cache
+
+# blacklist
+from accounts.blacklist import BloomFilter, token_blacklist
+
+# hashers
+from accounts.hashers import ScryptPasswordHasher, hashing_pool
+
+# models
+from accounts.models import CustomUser
+
+# async views
+from SoftDesk.async_views import database_pool
+
+
+class QueryCountTestCase(APITestCase):
+    """
+    The number of queries of each endpoint must not depend on the number of rows.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        self.client.force_authenticate(self.user)
+
+    def test_list_users(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/')
+        for index in range(10):
+            CustomUser.objects.create_user(f'user{index}@softdesk.fr', 'User', 'Test', 'pw')
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/')
+
+    def test_retrieve_user(self):
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/users/{self.user.pk}/')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """
+    The user authenticated by a JWT is read from the cache until it changes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        response = self.client.post(
+            '/api/login/', {'email': 'user@softdesk.fr', 'password': 'pw'}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.url = f'/api/users/{self.user.pk}/'
+
+    def test_user_is_cached(self):
+        # user, retrieve
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_password_change_invalidates(self):
+        self.client.get(self.url)
+        response = self.client.put(
+            f'/api/users/{self.user.pk}/new-password/',
+            {'old_password': 'pw', 'new_password': 'A-new-passw0rd'}
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_deactivation_invalidates(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_read_before_commit_is_not_served(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # Another request reads the row before the commit and caches it.
+            key = user_cache.key(self.user.pk)
+            user_cache.set(key, CustomUser(pk=self.user.pk, email=self.user.email))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deletion_invalidates(self):
+        self.client.get(self.url)
+        response = self.client.delete(
+            f'/api/users/{self.user.pk}/delete-user/', {'password': 'pw'}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TOKEN_BLACKLIST_FILTER=True
+)
+class TokenBlacklistTestCase(APITestCase):
+    """
+    The refresh tokens are checked against the blacklist through its filter.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_blacklist.bloom = None
+        self.user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        self.client.force_authenticate(self.user)
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f'in-{index}')
+        self.assertTrue(all(f'in-{index}' in bloom for index in range(1000)))
+        false_positives = sum(f'out-{index}' in bloom for index in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_refresh_skips_the_table(self):
+        self.assertEqual(
+            self.client.post('/api/refresh/', {'refresh': self.refresh}).status_code, 200
+        )
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_blacklists(self):
+        response = self.client.post('/api/logout/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 204)
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_blacklist_found_after_rebuild(self):
+        self.client.post('/api/logout/', {'refresh': self.refresh})
+        cache.clear()
+        token_blacklist.bloom = None
+        response = self.client.post('/api/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(TOKEN_BLACKLIST_FILTER=False)
+    def test_without_filter(self):
+        self.client.post('/api/refresh/', {'refresh': self.refresh})
+        # Blacklisted by another process, after the filter of this one was built.
+        token = RefreshToken(self.refresh)
+        BlacklistedToken.objects.create(
+            token=OutstandingToken.objects.get(jti=token['jti'])
+        )
+        response = self.client.post('/api/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_prune_token_blacklist(self):
+        self.client.post('/api/logout/', {'refresh': self.refresh})
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        RefreshToken.for_user(self.user)
+        call_command('prune_token_blacklist', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(
+    PASSWORD_HASHERS=[
+        'accounts.hashers.ScryptPasswordHasher', 'accounts.hashers.PBKDF2PasswordHasher',
+    ],
+    PASSWORD_SCRYPT_WORK_FACTOR=2 ** 4, PASSWORD_PBKDF2_ITERATIONS=1, PASSWORD_HASHING_WORKERS=2,
+)
+class PasswordHasherTestCase(APITestCase):
+    """
+    The passwords are hashed with scrypt in the hashing pool, the former hashes are upgraded.
+    """
+
+    def test_scrypt(self):
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('pw', hasher.salt())
+        self.assertTrue(encoded.startswith('scrypt$16$'))
+        self.assertTrue(hasher.verify('pw', encoded))
+        self.assertFalse(hasher.verify('other', encoded))
+        self.assertFalse(hasher.must_update(encoded))
+        with self.settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 5):
+            self.assertTrue(hasher.must_update(encoded))
+
+    def test_derivations_run_in_the_pool(self):
+        self.assertTrue(hashing_pool.run(lambda: current_thread().name).startswith(
+            'password-hashing'
+        ))
+
+    def test_login_upgrades_the_hash(self):
+        user = CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test')
+        user.password = make_password('pw', hasher='pbkdf2_sha256')
+        user.save()
+        response = self.client.post('/api/login/', {'email': 'user@softdesk.fr', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['accounts.hashers.ScryptPasswordHasher'],
+    PASSWORD_SCRYPT_WORK_FACTOR=2 ** 4, PASSWORD_HASHING_WORKERS=2, ASYNC_DB_WORKERS=2,
+)
+class AsyncLoginTestCase(TransactionTestCase):
+    """
+    Under ASGI, the async logins wait for their derivations outside of the thread of the
+    synchronous code of Django. The test is not run in a transaction, the logins run in the
+    threads of the database pool.
+    """
+
+    def setUp(self):
+        CustomUser.objects.create_user('user@softdesk.fr', 'User', 'Test', 'pw')
+        # The pools of the process may have been created with other settings.
+        for pool in (hashing_pool, database_pool):
+            executor = ThreadPoolExecutor(max_workers=2)
+            self.addCleanup(executor.shutdown)
+            patcher = mock.patch.object(pool, '_executor', executor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_concurrent_logins(self):
+        # Each derivation waits for the other one, the logins fail if they run one at a time.
+        barrier = Barrier(2, timeout=5)
+        call = hashing_pool.call
+
+        def wait_for_the_other_derivation(func, args, kwargs):
+            barrier.wait()
+            return call(func, args, kwargs)
+
+        client = AsyncClient()
+        data = {'email': 'user@softdesk.fr', 'password': 'pw'}
+        login = functools.partial(
+            client.post, '/api/async/login/', data, content_type='application/json'
+        )
+        with mock.patch.object(hashing_pool, 'call', wait_for_the_other_derivation):
+            responses = await asyncio.gather(login(), login())
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertIn('access', responses[0].json())
@@ -6,9 +6,14 @@ from django.urls import path, include
 # rest_framework
 from rest_framework_simplejwt import views as jwt_views
 
+from rest_auth.registration.views import RegisterView
+
+# async views
+from SoftDesk.async_views import async_view
+
 # views
 from accounts.views import CustomUserListView, LogoutView, CustomUserRetrieveUpdateView,\
-    CustomUserUpdatePasswordView, CustomUserDestroyView
+    CustomUserUpdatePasswordView, CustomUserDestroyView, CustomTokenRefreshView
 
 urlpatterns = [
     # POST
@@ -18,7 +23,7 @@ urlpatterns = [
     # POST
     path('logout/', LogoutView.as_view(), name='logout'),
     # POST
-    path('refresh/', jwt_views.TokenRefreshView.as_view(), name='token_refresh'),
+    path('refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     # GET
     path('users/', CustomUserListView.as_view(), name='users'),
     # GET, PUT
@@ -30,4 +35,19 @@ urlpatterns = [
     ),
     # DELETE
     path('users/<int:pk>/delete-user/', CustomUserDestroyView.as_view(), name='delete_user'),
+
+    # async views hashing a password, served concurrently by the ASGI application
+    # POST
+    path('async/signup/', async_view(RegisterView, ['POST']), name='async_signup'),
+    path('async/login/', async_view(jwt_views.TokenObtainPairView, ['POST']), name='async_login'),
+    # PUT
+    path(
+        'async/users/<int:pk>/new-password/', async_view(CustomUserUpdatePasswordView, ['PUT']),
+        name='async_update_password_user'
+    ),
+    # DELETE
+    path(
+        'async/users/<int:pk>/delete-user/', async_view(CustomUserDestroyView, ['DELETE']),
+        name='async_delete_user'
+    ),
 ]
@@ -8,28 +8,43 @@ from rest_framework.generics import ListAPIView, UpdateAPIView, \
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+# rest_framework_simplejwt
+from rest_framework_simplejwt.views import TokenRefreshView
+
+# instrumentation
+from SoftDesk.instrumentation import InstrumentedViewMixin
+
+# pagination
+from SoftDesk.pagination import IdCursorPagination
+
 # models
 from accounts.models import CustomUser
 
+# deletion
+from projects.deletion import delete_user
+from projects.mixins import BackgroundDestroyMixin
+
 # permissions
 from accounts.permissions import IsUser, IsUserRequest
 
 # serializers
 from accounts.serializers import CustomUserSerializer, RefreshTokenSerializer, \
-    UpdatePasswordSerializer, DestroyCustomUserSerializer
+    UpdatePasswordSerializer, DestroyCustomUserSerializer, CustomTokenRefreshSerializer
 
 
-class CustomUserListView(ListAPIView):
+class CustomUserListView(InstrumentedViewMixin, ListAPIView):
     """
     Concrete view for listing a queryset or creating a CustomUser instance.
     """
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.filter(deleted_time__isnull=True)
     serializer_class = CustomUserSerializer
     # A user must be authenticated.
     permission_classes = [IsAuthenticated]
+    # CustomUser has no creation time.
+    pagination_class = IdCursorPagination
 
 
-class LogoutView(GenericAPIView):
+class LogoutView(InstrumentedViewMixin, GenericAPIView):
     """
     Concrete view for adds the token to the blacklist.
     """
@@ -45,20 +60,28 @@ class LogoutView(GenericAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CustomUserRetrieveUpdateView(RetrieveUpdateAPIView):
+class CustomTokenRefreshView(InstrumentedViewMixin, TokenRefreshView):
+    """
+    Concrete view for refreshing an access token, the blacklist is checked through its filter.
+    """
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class CustomUserRetrieveUpdateView(InstrumentedViewMixin, RetrieveUpdateAPIView):
     """
     Concrete view for retrieving, updating a CustomUser instance.
     """
 
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.filter(deleted_time__isnull=True)
     serializer_class = CustomUserSerializer
     # A user must be authenticated, be the user or admin.
     permission_classes = [IsAuthenticated, IsUser]
 
 
-class CustomUserDestroyView(DestroyAPIView):
+class CustomUserDestroyView(InstrumentedViewMixin, BackgroundDestroyMixin, DestroyAPIView):
     """
     Concrete view for deleting a CustomUser instance.
+    The user is deactivated at once, its projects and rows are deleted in the background.
     """
 
     queryset = CustomUser.objects.all()
@@ -77,11 +100,10 @@ class CustomUserDestroyView(DestroyAPIView):
         # confirm password
         if not instance.check_password(request.data.get("password")):
             raise ValidationError("The password does not match.")
-        self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.deletion_response(delete_user(instance))
 
 
-class CustomUserUpdatePasswordView(UpdateAPIView):
+class CustomUserUpdatePasswordView(InstrumentedViewMixin, UpdateAPIView):
     """
     Concrete view for updating a password of CustomUser instance.
     """
@@ -0,0 +1,25 @@
+"""Contains the bulk writes of projects app."""
+
+# django
+from django.conf import settings
+from django.db import connection, transaction
+
+# signals
+from projects.signals import post_bulk_create
+
+
+def bulk_create(model, instances, batch_size=None):
+    """
+    Inserts the instances with bulk_create in a transaction and sends post_bulk_create.
+    The ids are set on the instances, including on SQLite which does not return them.
+    """
+    with transaction.atomic():
+        model.objects.bulk_create(instances, batch_size=batch_size or settings.BULK_BATCH_SIZE)
+        if instances and instances[0].pk is None and connection.vendor == 'sqlite':
+            # The database is locked by the transaction,
+            # the last ids of the table are the ones of the batch.
+            pks = model.objects.order_by('-pk').values_list('pk', flat=True)[:len(instances)]
+            for instance, pk in zip(instances, reversed(pks)):
+                instance.pk = pk
+        post_bulk_create.send(sender=model, instances=instances)
+    return instances
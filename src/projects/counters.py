@@ -0,0 +1,39 @@
+"""
+Contains the expressions recomputing the counters of the projects and issues.
+The counters are maintained by projects.signals, these expressions are used to fill them and to
+reconcile their drift. The functions take the models as arguments to be usable in migrations.
+"""
+
+# django
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field):
+    """Subquery counting the rows of the queryset whose field is the outer primary key."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field) \
+        .annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def project_counters(Issue, Comment, Contributor):
+    """Expressions of the actual counters of a project, by counter field."""
+    return {
+        'issue_count': count_of(Issue.objects.all(), 'project'),
+        'comment_count': count_of(Comment.objects.all(), 'issue__project'),
+        'contributor_count': count_of(Contributor.objects.all(), 'project'),
+    }
+
+
+def issue_counters(Comment):
+    """Expressions of the actual counters of an issue, by counter field."""
+    return {'comment_count': count_of(Comment.objects.all(), 'issue')}
+
+
+def drifted(queryset, counters):
+    """Returns the rows of the queryset whose stored counters differ from the actual ones."""
+    actual = {f'actual_{name}': expression for name, expression in counters.items()}
+    differs = Q()
+    for name in counters:
+        differs |= ~Q(**{name: F(f'actual_{name}')})
+    return queryset.annotate(**actual).filter(differs)
@@ -0,0 +1,201 @@
+"""
+Contains the generator of the synthetic datasets of the benchmarks.
+The rows are written with multi-row INSERTs and explicit ids, so the ids of the parents are
+known without reading them back and the creation times are not overwritten by auto_now_add.
+The counters of the projects and issues are computed while the rows are generated and the
+search index is rebuilt once at the end, no signal is sent.
+"""
+
+# lib
+import random
+from datetime import timedelta
+
+# django
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Contributor, Issue, Comment
+
+# search
+from projects.search import get_search_backend
+
+FIRST_NAMES = (
+    "Alice", "Bruno", "Camille", "David", "Emma", "Farid", "Gaëlle", "Hugo", "Inès", "Jules",
+    "Karim", "Léa", "Manon", "Nathan", "Océane", "Paul", "Quentin", "Rose", "Sarah", "Tom",
+)
+LAST_NAMES = (
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy",
+    "Moreau", "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux",
+)
+WORDS = (
+    "login", "password", "token", "database", "timeout", "deadlock", "cache", "upload", "export",
+    "import", "search", "index", "crash", "memory", "leak", "button", "layout", "mobile",
+    "android", "ios", "release", "deploy", "migration", "permission", "comment", "issue",
+    "backend", "frontend", "latency", "error", "warning", "retry", "queue", "worker", "email",
+    "the", "a", "when", "after", "before", "fails", "shows", "returns", "slow", "missing",
+    "user", "page", "request", "response", "server", "client", "update", "delete", "create",
+)
+PROJECT_TYPES = ("back-end", "front-end", "iOS", "Android")
+TAGS = ("bug", "improvement", "task")
+PRIORITIES = ("low", "medium", "high")
+STATUSES = ("open", "in progress", "closed")
+ROLES = ("dev", "reviewer", "manager")
+
+
+class DatasetGenerator:
+    """
+    Generates users, projects, contributors, issues and comments.
+    The fan-outs are means: each parent gets a uniform random number of children between 0 and
+    twice the mean. The creation times are spread over the last days, a child is created after
+    its parent. The same seed generates the same dataset on an empty database.
+    """
+
+    def __init__(self, users, projects, contributors, issues, comments, days=365, seed=0,
+                 password='softdesk', batch_size=5000, email_domain='bench.softdesk.local'):
+        self.users = users
+        self.projects = projects
+        self.contributors = contributors
+        self.issues = issues
+        self.comments = comments
+        self.days = days
+        self.random = random.Random(seed)
+        self.password = password
+        self.batch_size = batch_size
+        self.email_domain = email_domain
+        self.now = timezone.now()
+        self.buffers = {model: [] for model in (CustomUser, Project, Contributor, Issue, Comment)}
+        self.counts = dict.fromkeys(self.buffers, 0)
+
+    @staticmethod
+    def next_id(model):
+        """First free id of the table of model."""
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def fan_out(self, mean):
+        """Random number of children of a parent."""
+        return self.random.randint(0, 2 * mean) if mean else 0
+
+    def text(self, words):
+        """Random sentence of words words."""
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def time_after(self, start):
+        """Random time between start and now."""
+        return start + (self.now - start) * self.random.random()
+
+    def add(self, model, row):
+        """Buffers a row, the buffer of model is inserted once full."""
+        self.buffers[model].append(row)
+        if len(self.buffers[model]) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        """Inserts the buffered rows of model, as many per statement as the database allows."""
+        rows = self.buffers[model]
+        if not rows:
+            return
+        fields = model._meta.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        row_sql = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        size = max(1, connection.ops.bulk_batch_size(fields, rows))
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), size):
+                batch = rows[start:start + size]
+                cursor.execute(
+                    f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+                    f'VALUES {", ".join([row_sql] * len(batch))}',
+                    [
+                        field.get_db_prep_save(row.get(field.attname, field.get_default()),
+                                               connection)
+                        for row in batch for field in fields
+                    ]
+                )
+        self.counts[model] += len(rows)
+        self.buffers[model] = []
+
+    def generate(self):
+        """Writes the dataset and returns the number of rows per model."""
+        start = self.now - timedelta(days=self.days)
+        user_ids = self.generate_users(start)
+        project_id = self.next_id(Project)
+        contributor_id = self.next_id(Contributor)
+        issue_id = self.next_id(Issue)
+        comment_id = self.next_id(Comment)
+        for _ in range(self.projects):
+            project = {
+                'id': project_id, 'title': self.text(3), 'description': self.text(30),
+                'type': self.random.choice(PROJECT_TYPES),
+                'author_id': self.random.choice(user_ids),
+                'created_time': self.time_after(start),
+                'issue_count': 0, 'comment_count': 0, 'contributor_count': 0,
+            }
+            members = [project['author_id']]
+            count = self.fan_out(self.contributors)
+            sample = self.random.sample(user_ids, min(len(user_ids), count + 1))
+            for user_id in [pk for pk in sample if pk != project['author_id']][:count]:
+                self.add(Contributor, {
+                    'id': contributor_id, 'user_id': user_id, 'project_id': project_id,
+                    'role': self.random.choice(ROLES),
+                })
+                contributor_id += 1
+                project['contributor_count'] += 1
+                members.append(user_id)
+            for _ in range(self.fan_out(self.issues)):
+                issue = {
+                    'id': issue_id, 'title': self.text(6), 'description': self.text(40),
+                    'tag': self.random.choice(TAGS), 'priority': self.random.choice(PRIORITIES),
+                    'status': self.random.choice(STATUSES),
+                    'created_time': self.time_after(project['created_time']),
+                    'author_id': self.random.choice(members),
+                    'assignee_id': self.random.choice(members),
+                    'project_id': project_id, 'comment_count': 0,
+                }
+                updated_time = issue['created_time']
+                for _ in range(self.fan_out(self.comments)):
+                    created_time = self.time_after(issue['created_time'])
+                    self.add(Comment, {
+                        'id': comment_id, 'description': self.text(25),
+                        'author_id': self.random.choice(members), 'issue_id': issue_id,
+                        'created_time': created_time, 'updated_time': created_time,
+                    })
+                    comment_id += 1
+                    issue['comment_count'] += 1
+                    updated_time = max(updated_time, created_time)
+                issue['updated_time'] = updated_time
+                self.add(Issue, issue)
+                issue_id += 1
+                project['issue_count'] += 1
+                project['comment_count'] += issue['comment_count']
+            project['updated_time'] = project['created_time']
+            self.add(Project, project)
+            project_id += 1
+        # The foreign keys are checked at the commit, a child may be inserted before its parent.
+        for model in (Project, Contributor, Issue, Comment):
+            self.flush(model)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(self.buffers)):
+                cursor.execute(sql)
+        get_search_backend().rebuild()
+        return self.counts
+
+    def generate_users(self, start):
+        """Writes the users, who share the same password hash, and returns their ids."""
+        password = make_password(self.password)
+        first_id = self.next_id(CustomUser)
+        user_ids = list(range(first_id, first_id + self.users))
+        for user_id in user_ids:
+            self.add(CustomUser, {
+                'id': user_id, 'email': f'user{user_id}@{self.email_domain}',
+                'password': password,
+                'first_name': self.random.choice(FIRST_NAMES),
+                'last_name': self.random.choice(LAST_NAMES),
+                'is_staff': False, 'is_active': True, 'is_superuser': False,
+                'updated_time': start,
+            })
+        self.flush(CustomUser)
+        return user_ids
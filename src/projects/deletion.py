@@ -0,0 +1,229 @@
+"""
+Contains the background deletion of the projects and of the user accounts.
+A deleted project is hidden at once by its deleted_time, a deleted user is deactivated and its
+projects hidden, and a Deletion row records the progress. Once the transaction commits, a worker
+of the deletion queue deletes the rows by batches of DELETION_BATCH_SIZE, each batch in its own
+short transaction with a DELETE on primary keys: the cascade is neither collected in Python nor
+held in a single transaction. The rows of the hidden projects are deleted without signals, the
+rows of the other projects, such as the issues of a deleted user, send post_bulk_delete. The
+project or the user itself is deleted last, by the ORM once its cascade is empty. A worker
+claims a deletion before running it, a deletion is never run twice at the same time. An
+interrupted deletion is resumed by the process_deletions command.
+"""
+
+# lib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import sleep
+
+# django
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Contributor, Issue, Comment, Deletion
+
+# search
+from projects.search import get_search_backend
+
+# signals
+from projects.signals import post_bulk_delete, post_soft_delete
+
+# Deletion modes of a batch: the rows of a hidden project only leave the search index, the rows
+# of a visible project send post_bulk_delete, and a project or user whose cascade is empty is
+# deleted by the ORM with its signals.
+HIDDEN = 'hidden'
+VISIBLE = 'visible'
+COLLECTED = 'collected'
+
+
+class DeletionQueue:
+    """
+    Local task queue of the deletions: DELETION_WORKERS threads created on first use. Without
+    workers, a deletion runs in the thread which commits it.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def executor(self):
+        """The executor with DELETION_WORKERS threads."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.DELETION_WORKERS, thread_name_prefix='deletion',
+                    )
+        return self._executor
+
+    def submit(self, deletion_id):
+        """Queues the deletion once the transaction commits."""
+        transaction.on_commit(lambda: self.start(deletion_id))
+
+    def start(self, deletion_id):
+        """Runs the deletion in a worker."""
+        if not settings.DELETION_WORKERS:
+            run_deletion(deletion_id)
+            return
+        self.executor.submit(self.call, deletion_id)
+
+    @staticmethod
+    def call(deletion_id):
+        """Runs the deletion with the connections of the worker."""
+        close_old_connections()
+        try:
+            run_deletion(deletion_id)
+        finally:
+            close_old_connections()
+
+
+deletion_queue = DeletionQueue()
+
+
+def hide_projects(projects):
+    """Hides the projects from every reader, see post_soft_delete."""
+    projects = list(projects)
+    now = timezone.now()
+    Project.all_objects.filter(pk__in=[project.pk for project in projects]) \
+        .update(deleted_time=now)
+    for project in projects:
+        project.deleted_time = now
+    if projects:
+        post_soft_delete.send(sender=Project, instances=projects)
+
+
+def delete_project(project):
+    """Hides the project and queues the deletion of its rows. Returns the Deletion."""
+    hide_projects([project])
+    deletion = Deletion.objects.create(model='project', object_id=project.pk)
+    deletion_queue.submit(deletion.pk)
+    return deletion
+
+
+def delete_user(user):
+    """
+    Deactivates the user, hides its projects and queues the deletion of its rows.
+    Returns the Deletion.
+    """
+    user.is_active = False
+    user.deleted_time = timezone.now()
+    user.save(update_fields=['is_active', 'deleted_time'])
+    hide_projects(Project.objects.filter(author=user))
+    deletion = Deletion.objects.create(model='user', object_id=user.pk)
+    deletion_queue.submit(deletion.pk)
+    return deletion
+
+
+def project_tasks(project_id):
+    """Yields the model, rows and mode of each step of the deletion of a hidden project."""
+    yield Comment, Comment.objects.filter(issue__project_id=project_id), HIDDEN
+    yield Issue, Issue.objects.filter(project_id=project_id), HIDDEN
+    yield Contributor, Contributor.objects.filter(project_id=project_id), HIDDEN
+    yield Project, Project.all_objects.filter(pk=project_id), COLLECTED
+
+
+def user_tasks(user_id):
+    """
+    Yields the steps of the deletion of a user: its projects, then its rows in the other
+    projects, the comments before their issues.
+    """
+    project_ids = Project.all_objects.filter(author_id=user_id).values_list('pk', flat=True)
+    for project_id in list(project_ids):
+        yield from project_tasks(project_id)
+    issues = Issue.objects.filter(Q(author_id=user_id) | Q(assignee_id=user_id))
+    comments = Comment.objects.filter(Q(author_id=user_id) | Q(issue__in=issues.values('pk')))
+    yield Comment, comments, VISIBLE
+    yield Issue, issues, VISIBLE
+    yield Contributor, Contributor.objects.filter(user_id=user_id), VISIBLE
+    yield CustomUser, CustomUser.objects.filter(pk=user_id), COLLECTED
+
+
+def count_rows(deletion):
+    """Returns the number of rows of the deletion, read from the counters of the projects."""
+    if deletion.model == 'project':
+        projects = Project.all_objects.filter(pk=deletion.object_id)
+        others = 0
+    else:
+        projects = Project.all_objects.filter(author_id=deletion.object_id)
+        issues = Issue.objects.filter(
+            Q(author_id=deletion.object_id) | Q(assignee_id=deletion.object_id)
+        ).exclude(project__author_id=deletion.object_id)
+        comments = Comment.objects.filter(
+            Q(author_id=deletion.object_id) | Q(issue__in=issues.values('pk'))
+        ).exclude(issue__project__author_id=deletion.object_id)
+        contributors = Contributor.objects.filter(user_id=deletion.object_id)
+        others = issues.count() + comments.count() + contributors.count() + 1
+    counters = projects.values_list('issue_count', 'comment_count', 'contributor_count')
+    return others + sum(sum(row) + 1 for row in counters)
+
+
+def delete_batch(model, queryset, mode):
+    """Deletes a batch of the rows of queryset in a transaction. Returns the rows deleted."""
+    using = router.db_for_write(model)
+    if mode == COLLECTED:
+        _, deleted = queryset.using(using).delete()
+        return deleted.get(model._meta.label, 0)
+    rows = queryset.using(using).order_by()[:settings.DELETION_BATCH_SIZE]
+    instances = list(rows) if mode == VISIBLE else None
+    pks = [instance.pk for instance in instances] if mode == VISIBLE \
+        else list(rows.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    # Deleted without the collector, the effects of the rows are applied to the batch.
+    deleted = model.objects.filter(pk__in=pks)._raw_delete(using)
+    if mode == VISIBLE:
+        post_bulk_delete.send(sender=model, instances=instances)
+    elif model in (Issue, Comment):
+        get_search_backend(using).unindex(model, pks)
+    return deleted
+
+
+def claim_deletion(deletion_id, stale_before=None):
+    """
+    Marks the deletion as running if it is pending or failed, in a single conditional UPDATE.
+    With stale_before, a running deletion without progress since then is claimed too, its
+    worker is assumed to be stopped. Returns whether the deletion was claimed.
+    """
+    claimable = Q(status__in=(Deletion.PENDING, Deletion.FAILED))
+    if stale_before is not None:
+        claimable |= Q(status=Deletion.RUNNING, updated_time__lt=stale_before)
+    return bool(Deletion.objects.filter(claimable, pk=deletion_id).update(
+        status=Deletion.RUNNING, error='', updated_time=timezone.now(),
+    ))
+
+
+def run_deletion(deletion_id, stale_before=None):
+    """
+    Runs or resumes a deletion, batch by batch, and records its progress. Returns without
+    running it if another worker runs it, see claim_deletion. A failed deletion records its
+    error and is resumed by process_deletions.
+    """
+    if not claim_deletion(deletion_id, stale_before):
+        return
+    deletion = Deletion.objects.get(pk=deletion_id)
+    progress = Deletion.objects.filter(pk=deletion_id)
+    tasks = project_tasks if deletion.model == 'project' else user_tasks
+    try:
+        if deletion.total_rows is None:
+            progress.update(total_rows=count_rows(deletion))
+        for model, queryset, mode in tasks(deletion.object_id):
+            while True:
+                with transaction.atomic():
+                    deleted = delete_batch(model, queryset, mode)
+                    progress.update(
+                        deleted_rows=F('deleted_rows') + deleted, updated_time=timezone.now()
+                    )
+                if not deleted or mode == COLLECTED:
+                    break
+                if settings.DELETION_PAUSE_SECONDS:
+                    sleep(settings.DELETION_PAUSE_SECONDS)
+    except Exception as err:
+        progress.update(status=Deletion.FAILED, error=repr(err), updated_time=timezone.now())
+        return
+    now = timezone.now()
+    progress.update(status=Deletion.DONE, finished_time=now, updated_time=now)
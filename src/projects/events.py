@@ -0,0 +1,397 @@
+"""
+Contains the server-sent events of the projects.
+The signals of projects app publish the creations, updates and deletions of the issues, comments
+and contributors of a project once their transaction commits. The broker of the process appends
+them to a bounded log per project and pushes them to the streams of the project, which are async
+generators served by the ASGI application. A client resumes with the Last-Event-ID header: the
+events it missed are replayed from the log, or a reset event asks it to read the lists again.
+Only the projects streamed in the last EVENTS_LOG_IDLE_SECONDS are logged, at most
+EVENTS_LOG_PROJECTS of them: the events of the other projects are dropped.
+With EVENTS_BROKER_ALIAS, the events go through a cache shared by the processes instead.
+"""
+
+# lib
+import asyncio
+import json
+import threading
+from collections import OrderedDict, defaultdict, deque
+from time import monotonic, time
+from uuid import uuid4
+
+# asgiref
+from asgiref.sync import sync_to_async
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# rest_framework
+from rest_framework.renderers import BaseRenderer
+
+# async views
+from SoftDesk.async_views import AsyncStreamingHttpResponse
+
+# models
+from projects.models import Contributor, Issue, Comment
+
+# Fields of the rows sent in the events, the related rows are sent by id.
+EVENT_FIELDS = {
+    Issue: ('id', 'title', 'tag', 'priority', 'status', 'author_id', 'assignee_id',
+            'comment_count', 'created_time', 'updated_time'),
+    Comment: ('id', 'issue_id', 'description', 'author_id', 'created_time', 'updated_time'),
+    Contributor: ('id', 'user_id', 'role'),
+}
+
+
+class Event:
+    """Event of a project, its id is the epoch of the log and its sequence number."""
+
+    def __init__(self, epoch, seq, name, data):
+        self.epoch = epoch
+        self.seq = seq
+        self.name = name
+        self.data = data
+
+    @property
+    def id(self):
+        """Id of the event, sent back by the client in the Last-Event-ID header."""
+        return f'{self.epoch}-{self.seq}'
+
+    def encode(self):
+        """Returns the event in the text/event-stream format."""
+        data = json.dumps(self.data, cls=DjangoJSONEncoder)
+        return f'id: {self.id}\nevent: {self.name}\ndata: {data}\n\n'.encode()
+
+
+def parse_event_id(event_id):
+    """Returns the epoch and the sequence number of an event id, or None."""
+    epoch, _, seq = (event_id or '').rpartition('-')
+    if not epoch or not seq.isdigit():
+        return None
+    return epoch, int(seq)
+
+
+class Subscription:
+    """
+    Queue of the events of a stream, bounded by EVENTS_QUEUE_SIZE. A stream too slow to read
+    its events is closed once its queue is full, its client resumes from the log.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, events):
+        """Adds events to the queue, in the event loop of the stream."""
+        for event in events:
+            if self.queue.full():
+                self.overflowed = True
+                return
+            self.queue.put_nowait(event)
+
+
+class EventLog:
+    """
+    Last EVENTS_LOG_SIZE events of a project and the time a stream of the project last started
+    or ended. A log created again after its eviction has a new epoch, the clients resuming
+    from the former one are reset.
+    """
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.seq = 0
+        self.events = deque(maxlen=settings.EVENTS_LOG_SIZE)
+        self.followed_at = monotonic()
+
+    def append(self, name, data):
+        """Appends an event and returns it."""
+        self.seq += 1
+        event = Event(self.epoch, self.seq, name, data)
+        self.events.append(event)
+        return event
+
+
+class EventBroker:
+    """
+    Broker of the events of the process: the logs of the projects followed by a stream and the
+    subscriptions of the streams. The events are published by any thread and delivered in the
+    event loop of each stream.
+    """
+
+    def __init__(self):
+        self.epoch = uuid4().hex[:12]
+        self.generation = 0
+        # The least recently used log first.
+        self.logs = OrderedDict()
+        self.subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get_log(self, project_id):
+        """
+        Returns the log of the project, created if needed, and evicts the least recently used
+        logs beyond EVENTS_LOG_PROJECTS. Called with the lock.
+        """
+        log = self.logs.get(project_id)
+        if log is not None:
+            self.logs.move_to_end(project_id)
+            return log
+        self.generation += 1
+        log = self.logs[project_id] = EventLog(f'{self.epoch}.{self.generation}')
+        while len(self.logs) > settings.EVENTS_LOG_PROJECTS:
+            self.logs.popitem(last=False)
+        return log
+
+    def follow(self, project_id):
+        """A stream of the project started, its events are logged."""
+        with self._lock:
+            self.get_log(project_id).followed_at = monotonic()
+
+    def publish(self, project_id, name, data):
+        """
+        Appends an event to the log of the project and delivers it to its streams. The events
+        of a project without streams for EVENTS_LOG_IDLE_SECONDS are dropped, with its log.
+        """
+        with self._lock:
+            log = self.logs.get(project_id)
+            if project_id not in self.subscriptions and (
+                log is None or monotonic() - log.followed_at > settings.EVENTS_LOG_IDLE_SECONDS
+            ):
+                self.logs.pop(project_id, None)
+                return
+            event = self.get_log(project_id).append(name, data)
+        self.deliver(project_id, [event])
+
+    def deliver(self, project_id, events):
+        """Delivers events to the streams of the project."""
+        for subscription in list(self.subscriptions.get(project_id, ())):
+            subscription.loop.call_soon_threadsafe(subscription.deliver, events)
+
+    def replay(self, project_id, last_event_id):
+        """
+        Returns the events of the project after last_event_id and whether none is missing.
+        Without last_event_id, nothing is replayed. The project is followed from then on.
+        """
+        with self._lock:
+            log = self.get_log(project_id)
+            log.followed_at = monotonic()
+            events, epoch, current = list(log.events), log.epoch, log.seq
+        if last_event_id is None:
+            return [], True
+        parsed = parse_event_id(last_event_id)
+        if parsed is None or parsed[0] != epoch or parsed[1] > current:
+            return [], False
+        seq = parsed[1]
+        first = events[0].seq if events else current + 1
+        return [event for event in events if event.seq > seq], seq >= first - 1
+
+    def subscribe(self, project_id):
+        """Returns a subscription to the events of the project, in an event loop."""
+        subscription = Subscription(project_id)
+        with self._lock:
+            self.subscriptions[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stops the delivery of the events to a subscription."""
+        with self._lock:
+            subscriptions = self.subscriptions.get(subscription.project_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.project_id, None)
+                # Logged for the client reconnecting.
+                log = self.logs.get(subscription.project_id)
+                if log is not None:
+                    log.followed_at = monotonic()
+
+
+class CacheEventBroker(EventBroker):
+    """
+    Broker relaying the events between the processes through the cache alias, such as a local
+    Redis. A project has a sequence number and an entry per event kept EVENTS_LOG_TIMEOUT
+    seconds, its last EVENTS_LOG_SIZE events are replayed. Each process polls the sequence of
+    the projects it streams every EVENTS_POLL_SECONDS, in a single task per project.
+    """
+
+    def __init__(self, alias):
+        super().__init__()
+        self.alias = alias
+        self.pollers = {}
+
+    @property
+    def cache(self):
+        """The cache backend relaying the events."""
+        return caches[self.alias]
+
+    @staticmethod
+    def sequence_key(project_id):
+        """Cache key of the last sequence number of the events of project_id."""
+        return f'events:{project_id}:seq'
+
+    @staticmethod
+    def event_key(project_id, seq):
+        """Cache key of an event of project_id."""
+        return f'events:{project_id}:{seq}'
+
+    def shared_epoch(self):
+        """Epoch of the log of the cache, a new one once the cache lost it."""
+        self.cache.add('events:epoch', self.epoch, None)
+        return self.cache.get('events:epoch', self.epoch)
+
+    def publish(self, project_id, name, data):
+        key = self.sequence_key(project_id)
+        self.cache.add(key, 0, None)
+        event = Event(self.shared_epoch(), self.cache.incr(key), name, data)
+        self.cache.set(
+            self.event_key(project_id, event.seq), (event.epoch, event.name, event.data),
+            settings.EVENTS_LOG_TIMEOUT,
+        )
+
+    def read(self, project_id, after, until):
+        """Returns the events of the project from after to until found in the cache."""
+        after = max(after, until - settings.EVENTS_LOG_SIZE)
+        entries = self.cache.get_many([
+            self.event_key(project_id, seq) for seq in range(after + 1, until + 1)
+        ])
+        events = []
+        for seq in range(after + 1, until + 1):
+            entry = entries.get(self.event_key(project_id, seq))
+            if entry is not None:
+                events.append(Event(entry[0], seq, entry[1], entry[2]))
+        return events
+
+    def replay(self, project_id, last_event_id):
+        if last_event_id is None:
+            return [], True
+        parsed = parse_event_id(last_event_id)
+        current = self.cache.get(self.sequence_key(project_id), 0)
+        if parsed is None or parsed[0] != self.shared_epoch() or parsed[1] > current:
+            return [], False
+        events = self.read(project_id, parsed[1], current)
+        return events, len(events) == current - parsed[1]
+
+    def subscribe(self, project_id):
+        subscription = super().subscribe(project_id)
+        if project_id not in self.pollers:
+            self.pollers[project_id] = asyncio.ensure_future(self.poll(project_id))
+        return subscription
+
+    async def poll(self, project_id):
+        """Delivers the new events of the project to the streams of the process."""
+        get_sequence = sync_to_async(self.cache.get, thread_sensitive=False)
+        read = sync_to_async(self.read, thread_sensitive=False)
+        last = await get_sequence(self.sequence_key(project_id), 0)
+        try:
+            while self.subscriptions.get(project_id):
+                await asyncio.sleep(settings.EVENTS_POLL_SECONDS)
+                current = await get_sequence(self.sequence_key(project_id), 0)
+                if current > last:
+                    self.deliver(project_id, await read(project_id, last, current))
+                    last = current
+        finally:
+            self.pollers.pop(project_id, None)
+
+
+_brokers = {}
+
+
+def get_event_broker():
+    """Returns the broker of the process, relayed by EVENTS_BROKER_ALIAS if set."""
+    alias = settings.EVENTS_BROKER_ALIAS
+    if alias not in _brokers:
+        _brokers[alias] = CacheEventBroker(alias) if alias else EventBroker()
+    return _brokers[alias]
+
+
+def publish_event(project_id, name, instance=None, **data):
+    """
+    Publishes an event of the project once the transaction commits, with the fields of the
+    instance. An event of a rolled back write is not published.
+    """
+    if instance is not None:
+        data.update({field: getattr(instance, field) for field in EVENT_FIELDS[type(instance)]})
+    transaction.on_commit(lambda: get_event_broker().publish(project_id, name, data))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Accepts the text/event-stream requests of the EventSource clients, renders their errors
+    in JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class EventStreamResponse(AsyncStreamingHttpResponse):
+    """
+    Stream of the events of a project to a user. Served by the ASGI application, it replays the
+    events after last_event_id and pushes the new ones, with a comment every
+    EVENTS_HEARTBEAT_SECONDS, until the project is deleted, the user leaves it or its token
+    expires. Iterated synchronously, by WSGI or the test client, it only sends the replay and
+    the client reconnects after EVENTS_RETRY_MILLISECONDS. expires_at is a timestamp.
+    """
+
+    def __init__(self, project_id, user_id, last_event_id=None, expires_at=None):
+        self.project_id = project_id
+        self.user_id = user_id
+        self.last_event_id = last_event_id
+        self.expires_at = expires_at
+        super().__init__(self.replay_content(), content_type='text/event-stream')
+        self['Cache-Control'] = 'no-cache'
+        # Not buffered by nginx.
+        self['X-Accel-Buffering'] = 'no'
+
+    def head(self, complete):
+        """Returns the retry delay of the client, and a reset event if events are missing."""
+        head = f'retry: {settings.EVENTS_RETRY_MILLISECONDS}\n\n'.encode()
+        return head if complete else head + b'event: reset\ndata: {}\n\n'
+
+    def closes_stream(self, event):
+        """The stream ends after the deletion of the project or of the membership of the user."""
+        return event.name == 'project.deleted' or (
+            event.name == 'contributor.deleted' and event.data.get('user_id') == self.user_id
+        )
+
+    def replay_content(self):
+        events, complete = get_event_broker().replay(self.project_id, self.last_event_id)
+        yield self.head(complete)
+        for event in events:
+            yield event.encode()
+
+    async def stream_content(self):
+        broker = get_event_broker()
+        # Subscribed before the replay, the events published meanwhile are in both.
+        subscription = broker.subscribe(self.project_id)
+        try:
+            events, complete = await sync_to_async(broker.replay, thread_sensitive=False)(
+                self.project_id, self.last_event_id
+            )
+            yield self.head(complete)
+            last = None
+            for event in events:
+                yield event.encode()
+                last = (event.epoch, event.seq)
+                if self.closes_stream(event):
+                    return
+            while self.expires_at is None or time() < self.expires_at:
+                timeout = settings.EVENTS_HEARTBEAT_SECONDS
+                if self.expires_at is not None:
+                    timeout = min(timeout, self.expires_at - time())
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+                    continue
+                if last is not None and event.epoch == last[0] and event.seq <= last[1]:
+                    continue
+                yield event.encode()
+                if self.closes_stream(event) or subscription.overflowed:
+                    return
+        finally:
+            broker.unsubscribe(subscription)
@@ -0,0 +1,215 @@
+"""
+Contains the newline-delimited JSON export and import of a project.
+Each line is a JSON object with a "model" key: one "project" line, then the "contributor",
+"issue" and "comment" lines. The users are referenced by their email address, the issues of
+the comments by their id in the exported database.
+The rows are read by chunks, each by its own query from the last row of the previous chunk: no
+cursor stays open between two chunks, which can be read by different threads, such as the
+workers of the pool of the async views under ASGI.
+"""
+
+# lib
+import json
+
+# django
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# async views
+from SoftDesk.async_views import AsyncStreamingHttpResponse, database_pool
+
+# pagination
+from SoftDesk.pagination import seek_after
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Contributor, Issue, Comment
+
+# bulk
+from projects.bulk import bulk_create
+
+PROJECT_FIELDS = ('title', 'description', 'type')
+ISSUE_FIELDS = ('title', 'description', 'tag', 'priority', 'status')
+
+
+def dump_line(row):
+    """Returns a row as a line of newline-delimited JSON."""
+    return json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n'
+
+
+def read_chunks(queryset, ordering, chunk_size):
+    """
+    Yields the rows of a values queryset by lists of at most chunk_size rows, in the order of
+    ordering, whose fields are among the values. Each list is read by its own query.
+    """
+    queryset = queryset.order_by(*ordering)
+    position = None
+    while True:
+        chunk = queryset if position is None else queryset.filter(seek_after(ordering, position))
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        # Read before the rows are handed over.
+        position = [rows[-1][field.lstrip('-')] for field in ordering]
+        yield rows
+        if len(rows) < chunk_size:
+            return
+
+
+def export_project(project_id, chunk_size=None):
+    """
+    Yields the export of a project, a bytes string of lines per chunk of rows.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    project = Project.objects.filter(pk=project_id) \
+        .values('id', *PROJECT_FIELDS, 'author__email', 'created_time').get()
+    project['author'] = project.pop('author__email')
+    yield dump_line({'model': 'project', **project})
+
+    contributors = Contributor.objects.filter(project_id=project_id) \
+        .values('id', 'user__email', 'role')
+    for rows in read_chunks(contributors, ('id',), chunk_size):
+        yield b''.join(
+            dump_line({'model': 'contributor', 'user': row['user__email'], 'role': row['role']})
+            for row in rows
+        )
+
+    # The orderings follow the indexes, the rows are streamed without sorting.
+    issues = Issue.objects.filter(project_id=project_id).values(
+        'id', *ISSUE_FIELDS, 'author__email', 'assignee__email', 'created_time', 'updated_time'
+    )
+    for rows in read_chunks(issues, ('created_time', 'id'), chunk_size):
+        lines = []
+        for issue in rows:
+            issue['author'] = issue.pop('author__email')
+            issue['assignee'] = issue.pop('assignee__email')
+            lines.append(dump_line({'model': 'issue', **issue}))
+        yield b''.join(lines)
+
+    comments = Comment.objects.filter(issue__project_id=project_id).values(
+        'id', 'issue_id', 'description', 'author__email', 'created_time', 'updated_time',
+        'issue__created_time',
+    )
+    ordering = ('issue__created_time', 'issue_id', 'created_time', 'id')
+    for rows in read_chunks(comments, ordering, chunk_size):
+        lines = []
+        for comment in rows:
+            del comment['issue__created_time']
+            comment['issue'] = comment.pop('issue_id')
+            comment['author'] = comment.pop('author__email')
+            lines.append(dump_line({'model': 'comment', **comment}))
+        yield b''.join(lines)
+
+
+class ExportResponse(AsyncStreamingHttpResponse):
+    """
+    Newline-delimited JSON export of a project. Served by the ASGI application, each chunk is
+    read in the pool of the async views, the event loop never runs a query.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        super().__init__(export_project(project_id), content_type='application/x-ndjson')
+        self['Content-Disposition'] = f'attachment; filename="project-{project_id}.ndjson"'
+
+    async def stream_content(self):
+        chunks = export_project(self.project_id)
+        while True:
+            chunk = await database_pool.run(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class ProjectImporter:
+    """
+    Creates a new project from the lines of an export.
+    The issues and comments are inserted by batches. The users are looked up by email, the
+    unknown users are replaced by the author of the project.
+    The creation times are not imported, the rows are created at the time of the import.
+    """
+
+    def __init__(self, author=None, batch_size=None):
+        self.author = author
+        self.batch_size = batch_size or settings.BULK_BATCH_SIZE
+        self.project = None
+        self.users = {}
+        self.unknown_users = set()
+        self.issue_ids = {}
+        self.counts = {'contributor': 0, 'issue': 0, 'comment': 0}
+        self._pending = []
+
+    def get_user(self, email):
+        """Returns the user with this email or the author of the project."""
+        if email not in self.users:
+            self.users[email] = CustomUser.objects.filter(email=email).first()
+            if self.users[email] is None:
+                self.unknown_users.add(email)
+        return self.users[email] or self.project.author
+
+    def run(self, lines):
+        """Imports the lines in a single transaction and returns the project."""
+        with transaction.atomic():
+            for line in lines:
+                if line.strip():
+                    self.load(json.loads(line))
+            self.flush()
+        return self.project
+
+    def load(self, row):
+        """Loads a row of the export."""
+        kind = row['model']
+        if kind == 'project':
+            if self.project is not None:
+                raise ValueError("An export contains a single project.")
+            author = self.author or CustomUser.objects.get(email=row['author'])
+            self.project = Project.objects.create(
+                author=author, **{field: row[field] for field in PROJECT_FIELDS}
+            )
+            return
+        if self.project is None:
+            raise ValueError("The export must start with the project.")
+        if kind == 'contributor':
+            user = self.get_user(row['user'])
+            if user.pk != self.project.author_id:
+                self.add(Contributor(user=user, project=self.project, role=row['role']))
+        elif kind == 'issue':
+            issue = Issue(
+                project=self.project, author=self.get_user(row['author']),
+                assignee=self.get_user(row['assignee']),
+                **{field: row[field] for field in ISSUE_FIELDS}
+            )
+            issue.exported_id = row['id']
+            self.add(issue)
+        elif kind == 'comment':
+            if row['issue'] not in self.issue_ids:
+                self.flush()
+                if row['issue'] not in self.issue_ids:
+                    raise ValueError(f"Unknown issue {row['issue']}.")
+            self.add(Comment(
+                issue_id=self.issue_ids[row['issue']], author=self.get_user(row['author']),
+                description=row['description'],
+            ))
+        else:
+            raise ValueError(f"Unknown row type {kind}.")
+
+    def add(self, instance):
+        """Adds an instance to the pending batch."""
+        if self._pending and type(self._pending[0]) is not type(instance):
+            self.flush()
+        self._pending.append(instance)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Inserts the pending batch."""
+        if not self._pending:
+            return
+        model = type(self._pending[0])
+        bulk_create(model, self._pending, self.batch_size)
+        if model is Issue:
+            for issue in self._pending:
+                self.issue_ids[issue.exported_id] = issue.pk
+        self.counts[model.__name__.lower()] += len(self._pending)
+        self._pending = []
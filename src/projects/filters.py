@@ -0,0 +1,72 @@
+"""Contains the filter backends of projects app."""
+
+# django
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+# rest_framework
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+MAX_FILTER_VALUES = 20
+
+
+class AllowListFilterBackend(BaseFilterBackend):
+    """
+    Filters a list by the query parameters named in the filter_fields of the view and orders it
+    by one of its ordering_fields.
+    ?status=open,in progress keeps the rows matching one of the values, ?ordering=-priority
+    orders them descending. The other query parameters are left to the view.
+    The ties are broken by the creation time and the id in the direction of the ordering, so the
+    cursors of the pagination are stable and the composite indexes are read in a single pass.
+    """
+    ordering_param = 'ordering'
+    default_ordering = ('-created_time', '-id')
+
+    def get_filters(self, request, queryset, view):
+        """Returns the validated lookups of the query parameters."""
+        lookups = {}
+        errors = {}
+        for name in getattr(view, 'filter_fields', ()):
+            if name not in request.query_params:
+                continue
+            values = [value.strip() for value in request.query_params[name].split(',')]
+            field = queryset.model._meta.get_field(name)
+            try:
+                if not all(values) or len(values) > MAX_FILTER_VALUES:
+                    raise DjangoValidationError(
+                        f"Expected 1 to {MAX_FILTER_VALUES} comma-separated values."
+                    )
+                values = [field.to_python(value) for value in values]
+            except DjangoValidationError as err:
+                errors[name] = err.messages
+                continue
+            if len(values) == 1:
+                lookups[name] = values[0]
+            else:
+                lookups[f'{name}__in'] = values
+        if errors:
+            raise ValidationError(errors)
+        return lookups
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns the ordering of the query parameter with its tie-breakers, also used by the
+        cursor pagination.
+        """
+        ordering = request.query_params.get(self.ordering_param)
+        if not ordering:
+            return self.default_ordering
+        name = ordering[1:] if ordering.startswith('-') else ordering
+        if name not in getattr(view, 'ordering_fields', ()):
+            raise ValidationError({self.ordering_param: [
+                f"Expected one of {', '.join(view.ordering_fields)}, "
+                f"prefixed by - for the descending order."
+            ]})
+        prefix = '-' if ordering.startswith('-') else ''
+        tie_breakers = [f'{prefix}{field}' for field in ('created_time', 'id') if field != name]
+        return (ordering, *tie_breakers)
+
+    def filter_queryset(self, request, queryset, view):
+        """Filters and orders the queryset."""
+        return queryset.filter(**self.get_filters(request, queryset, view)) \
+            .order_by(*self.get_ordering(request, queryset, view))
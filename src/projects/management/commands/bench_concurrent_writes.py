@@ -0,0 +1,84 @@
+"""Benchmark of the write throughput of the database under parallel clients."""
+
+# lib
+from threading import Thread
+from time import perf_counter
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+from django.utils import timezone
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Issue
+
+
+class Command(BaseCommand):
+    """
+    Each client is a thread with its own connection, each write is a transaction reading the
+    project, inserting an issue and updating the project.
+    Runs against the database of DATABASE_URL, the rows are deleted at the end.
+    """
+    help = "Benchmark the write throughput of the database under N parallel clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, nargs='+', default=[1, 4, 16],
+            help="Numbers of parallel clients to benchmark."
+        )
+        parser.add_argument('--writes', type=int, default=200, help="Writes per client.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{connection.vendor} ({connection.settings_dict['ENGINE']}) "
+            f"{connection.settings_dict['NAME']}"
+        )
+        author = CustomUser.objects.create(email='bench-concurrent-writes@softdesk.local')
+        try:
+            for clients in options['clients']:
+                project = Project.objects.create(
+                    title="Writes", description="benchmark", type="back-end", author=author
+                )
+                self.run_case(project, clients, options['writes'])
+        finally:
+            author.delete()
+
+    def run_case(self, project, clients, writes):
+        """Runs the clients in parallel and writes the throughput."""
+        errors = [0] * clients
+        threads = [
+            Thread(target=self.client, args=(project, writes, errors, index))
+            for index in range(clients)
+        ]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = perf_counter() - start
+        committed = Issue.objects.filter(project=project).count()
+        self.stdout.write(
+            f"{clients:>4} clients | {committed:>6} writes | {duration:7.2f} s | "
+            f"{committed / duration:8.0f} writes/s | {sum(errors)} errors"
+        )
+
+    @staticmethod
+    def client(project, writes, errors, index):
+        """Writes in its own connection and counts the failed transactions."""
+        try:
+            for number in range(writes):
+                try:
+                    with transaction.atomic():
+                        Project.objects.filter(pk=project.pk).values('title').get()
+                        Issue.objects.create(
+                            title=f"Issue {index}-{number}", description="benchmark",
+                            tag="bug", priority="low", status="open",
+                            author=project.author, assignee=project.author, project=project,
+                        )
+                        Project.objects.filter(pk=project.pk) \
+                            .update(updated_time=timezone.now())
+                except OperationalError:
+                    errors[index] += 1
+        finally:
+            connection.close()
@@ -0,0 +1,321 @@
+"""Benchmark of every endpoint of the API through the test client."""
+
+# lib
+import json
+import tracemalloc
+from copy import copy
+from time import perf_counter
+
+# django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+
+# rest_framework
+from rest_framework.test import APIClient
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# models
+from accounts.models import CustomUser
+from projects.models import Contributor, Comment, Deletion
+
+# urls
+from accounts.urls import urlpatterns as accounts_urlpatterns
+from projects.urls import urlpatterns as projects_urlpatterns
+
+BENCH_PASSWORD = 'bench-endpoints-password'
+METRICS_TOKEN = 'bench-endpoints'
+
+# (url name, method, user, url kwargs by fixture, data, query string)
+# The users are fixtures: the project author, the issue and comment authors, an admin and a
+# user who is not a member of the project. Anonymous requests have no user.
+CASES = (
+    # projects
+    ('list_create_project', 'GET', 'author', {}, None, ''),
+    ('list_create_project', 'POST', 'author', {},
+     {'title': "Bench", 'description': "Benchmark project", 'type': "back-end"}, ''),
+    ('update_destroy_retrieve_project', 'GET', 'author', {'pk': 'project'}, None, ''),
+    ('update_destroy_retrieve_project', 'PUT', 'author', {'pk': 'project'},
+     {'title': "Bench", 'description': "Benchmark project", 'type': "back-end"}, ''),
+    ('update_destroy_retrieve_project', 'DELETE', 'author', {'pk': 'project'}, None, ''),
+    ('export_project', 'GET', 'author', {'id_project': 'project'}, None, ''),
+    ('project_events', 'GET', 'author', {'id_project': 'project'}, None, ''),
+    ('search_project', 'GET', 'author', {'id_project': 'project'}, None, 'q=login'),
+    ('search', 'GET', 'author', {}, None, 'q=login'),
+    # A full page of changes, unless the change log was pruned.
+    ('sync', 'GET', 'author', {}, None, 'since=0'),
+    ('deletion', 'GET', None, {'pk': 'deletion'}, None, ''),
+    # contributors
+    ('list_create_contributor', 'GET', 'author', {'id_project': 'project'}, None, ''),
+    ('list_create_contributor', 'POST', 'author', {'id_project': 'project'},
+     {'user': 'user', 'role': "dev"}, ''),
+    ('delete_contributor', 'DELETE', 'author', {'id_project': 'project', 'pk': 'contributor'},
+     None, ''),
+    # issues
+    ('list_create_issue', 'GET', 'author', {'id_project': 'project'}, None, ''),
+    ('list_create_issue', 'POST', 'author', {'id_project': 'project'},
+     {'title': "Bench", 'description': "Benchmark issue", 'tag': "bug", 'priority': "low",
+      'status': "open"}, ''),
+    ('list_create_issue', 'PATCH', 'issue_author', {'id_project': 'project'},
+     [{'id': 'issue', 'status': "closed"}], ''),
+    ('update_destroy_issue', 'GET', 'issue_author', {'id_project': 'project', 'pk': 'issue'},
+     None, ''),
+    ('update_destroy_issue', 'PUT', 'issue_author', {'id_project': 'project', 'pk': 'issue'},
+     {'title': "Bench", 'description': "Benchmark issue", 'tag': "bug", 'priority': "low",
+      'status': "open"}, ''),
+    ('update_destroy_issue', 'DELETE', 'issue_author', {'id_project': 'project', 'pk': 'issue'},
+     None, ''),
+    # comments
+    ('list_create_comment', 'GET', 'author', {'id_project': 'project', 'id_issue': 'issue'},
+     None, ''),
+    ('list_create_comment', 'POST', 'author', {'id_project': 'project', 'id_issue': 'issue'},
+     {'description': "Benchmark comment"}, ''),
+    ('update_destroy_retrieve_comment', 'GET', 'comment_author',
+     {'id_project': 'project', 'id_issue': 'issue', 'pk': 'comment'}, None, ''),
+    ('update_destroy_retrieve_comment', 'PUT', 'comment_author',
+     {'id_project': 'project', 'id_issue': 'issue', 'pk': 'comment'},
+     {'description': "Benchmark comment"}, ''),
+    ('update_destroy_retrieve_comment', 'DELETE', 'comment_author',
+     {'id_project': 'project', 'id_issue': 'issue', 'pk': 'comment'}, None, ''),
+    # async reads
+    ('async_list_project', 'GET', 'author', {}, None, ''),
+    ('async_retrieve_project', 'GET', 'author', {'pk': 'project'}, None, ''),
+    ('async_list_issue', 'GET', 'author', {'id_project': 'project'}, None, ''),
+    ('async_retrieve_issue', 'GET', 'issue_author', {'id_project': 'project', 'pk': 'issue'},
+     None, ''),
+    ('async_list_comment', 'GET', 'author', {'id_project': 'project', 'id_issue': 'issue'},
+     None, ''),
+    ('async_retrieve_comment', 'GET', 'comment_author',
+     {'id_project': 'project', 'id_issue': 'issue', 'pk': 'comment'}, None, ''),
+    # stats
+    ('membership_cache_stats', 'GET', 'admin', {}, None, ''),
+    ('response_cache_stats', 'GET', 'admin', {}, None, ''),
+    ('metrics', 'GET', None, {}, None, ''),
+    # accounts
+    ('rest_register', 'POST', None, {},
+     {'email': "bench-signup@softdesk.local", 'password1': BENCH_PASSWORD,
+      'password2': BENCH_PASSWORD}, ''),
+    ('rest_verify_email', 'POST', None, {}, {'key': "bench"}, ''),
+    ('login', 'POST', None, {}, {'email': 'user_email', 'password': BENCH_PASSWORD}, ''),
+    ('token_refresh', 'POST', None, {}, {'refresh': 'refresh'}, ''),
+    ('logout', 'POST', 'user', {}, {'refresh': 'refresh'}, ''),
+    ('users', 'GET', 'user', {}, None, ''),
+    ('retrieve_update_user', 'GET', 'user', {'pk': 'user'}, None, ''),
+    ('retrieve_update_user', 'PUT', 'user', {'pk': 'user'},
+     {'email': "bench-updated@softdesk.local", 'first_name': "Bench", 'last_name': "User"}, ''),
+    ('update_password_user', 'PUT', 'user', {'pk': 'user'},
+     {'old_password': BENCH_PASSWORD, 'new_password': "bench-endpoints-new-password"}, ''),
+    ('delete_user', 'DELETE', 'user', {'pk': 'user'}, {'password': BENCH_PASSWORD}, ''),
+)
+
+
+def route_names(patterns):
+    """Names of the urls of patterns, including those of the included patterns."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def percentile(timings, rank):
+    """Nearest-rank percentile of sorted timings, in milliseconds."""
+    return timings[min(len(timings) - 1, int(len(timings) * rank))] * 1000
+
+
+class Command(BaseCommand):
+    """
+    Sends each case of CASES to the API through the test client and writes its latency
+    percentiles, its queries and the peak memory allocated by a request. The objects of the
+    requests are sampled from the database, for instance a dataset of generate_dataset, and the
+    fixtures are created in a transaction which is rolled back at the end. The writes of each
+    request are rolled back too, so every iteration sees the same rows.
+    The async views run their queries in the thread of the request, the test client serves a
+    single request at a time, load_test measures the concurrency.
+    """
+    help = "Benchmark the latency, the queries and the memory of every endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Requests per case.")
+        parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per case.")
+        parser.add_argument('--routes', nargs='+', help="Url names of the cases to run.")
+        parser.add_argument('--output', help="Writes the results to this JSON file.")
+        parser.add_argument('--baseline', help="JSON file of a former run to compare with.")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Relative increase of the p95 latency reported as a regression."
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=1.0,
+            help="Increase of the p95 latency in ms below which a change is noise."
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("At least one iteration is required.")
+        names = set(route_names(projects_urlpatterns + accounts_urlpatterns)) | {'metrics'}
+        covered = {case[0] for case in CASES}
+        for name in sorted(names - covered):
+            self.stderr.write(self.style.WARNING(f"No benchmark case for the url {name}."))
+        cases = [
+            case for case in CASES if not options['routes'] or case[0] in options['routes']
+        ]
+        if not cases:
+            raise CommandError("No benchmark case for these urls.")
+
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts, ASYNC_DB_WORKERS=0,
+                               METRICS_TOKEN=METRICS_TOKEN), transaction.atomic():
+            fixtures = self.fixtures()
+            results = {
+                f'{method} {name}': self.run_case(
+                    fixtures, name, method, user, kwargs, data, query, options
+                )
+                for name, method, user, kwargs, data, query in cases
+            }
+            transaction.set_rollback(True)
+
+        self.write_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'iterations': options['iterations'], 'results': results}, file,
+                          indent=2)
+        if options['baseline']:
+            self.compare(results, options)
+
+    @staticmethod
+    def fixtures():
+        """Samples the objects of the requests and creates the benchmark users."""
+        comment = Comment.objects.select_related('issue__project__author', 'issue__author') \
+            .filter(issue__project__contributor_count__gt=0).order_by('pk').first()
+        if comment is None:
+            raise CommandError(
+                "The database has no comment of a project with contributors, "
+                "run generate_dataset first."
+            )
+        issue = comment.issue
+        project = issue.project
+        user = CustomUser.objects.create_user(
+            email='bench-endpoints@softdesk.local', first_name="Bench", last_name="User",
+            password=BENCH_PASSWORD,
+        )
+        admin = CustomUser.objects.create_user(
+            email='bench-endpoints-admin@softdesk.local', first_name="Bench", last_name="Admin",
+            password=BENCH_PASSWORD, is_staff=True, is_superuser=True,
+        )
+        return {
+            'project': project, 'issue': issue, 'comment': comment,
+            'contributor': Contributor.objects.filter(project=project).order_by('pk').first(),
+            'author': project.author, 'issue_author': issue.author,
+            'comment_author': CustomUser.objects.get(pk=comment.author_id),
+            'user': user, 'admin': admin, 'user_email': user.email,
+            'deletion': Deletion.objects.create(model='project', object_id=project.pk),
+            # A new token per request, a blacklisted token stays in the filter of the process.
+            'refresh': lambda: str(RefreshToken.for_user(user)),
+        }
+
+    @classmethod
+    def resolve(cls, data, fixtures):
+        """Replaces the names of fixtures in the data of a case by their pk or value."""
+        if isinstance(data, list):
+            return [cls.resolve(item, fixtures) for item in data]
+        if isinstance(data, dict):
+            return {key: cls.resolve(value, fixtures) for key, value in data.items()}
+        if isinstance(data, str) and data in fixtures:
+            value = fixtures[data]
+            return value() if callable(value) else getattr(value, 'pk', value)
+        return data
+
+    def run_case(self, fixtures, name, method, user, kwargs, data, query, options):
+        """Runs the requests of a case and returns its statistics."""
+        client = APIClient()
+        url = reverse(name, kwargs={key: fixtures[value].pk for key, value in kwargs.items()})
+        path = f'{url}?{query}' if query else url
+        send = getattr(client, method.lower())
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {METRICS_TOKEN}'} if name == 'metrics' else {}
+
+        def request(body):
+            if user:
+                # A copy, the views of the user act on the authenticated instance.
+                client.force_authenticate(copy(fixtures[user]))
+            with transaction.atomic():
+                response = send(path, body, format='json', **extra)
+                if response.streaming:
+                    # The queries of a streaming response run while its body is read.
+                    b''.join(response.streaming_content)
+                transaction.set_rollback(True)
+            return response
+
+        for _ in range(options['warmup']):
+            request(self.resolve(data, fixtures))
+        timings = []
+        for _ in range(options['iterations']):
+            body = self.resolve(data, fixtures)
+            start = perf_counter()
+            response = request(body)
+            timings.append(perf_counter() - start)
+        body = self.resolve(data, fixtures)
+        with CaptureQueriesContext(connection) as context:
+            request(body)
+        # The savepoint of the request and its rollback are not queries of the endpoint.
+        queries = len([
+            query for query in context.captured_queries if 'SAVEPOINT' not in query['sql']
+        ])
+        body = self.resolve(data, fixtures)
+        tracemalloc.start()
+        try:
+            request(body)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        return {
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': queries,
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def write_results(self, results):
+        """Writes a line per case."""
+        self.stdout.write(
+            f"{'case':<40} | {'status':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+            f"{'queries':>7} | {'peak KiB':>9}"
+        )
+        for key, result in results.items():
+            self.stdout.write(
+                f"{key:<40} | {result['status']:>6} | {result['p50_ms']:>8.2f} | "
+                f"{result['p95_ms']:>8.2f} | {result['p99_ms']:>8.2f} | "
+                f"{result['queries']:>7} | {result['peak_kib']:>9.1f}"
+            )
+
+    def compare(self, results, options):
+        """Raises an error listing the cases slower or issuing more queries than the baseline."""
+        try:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+        except (OSError, ValueError, KeyError) as err:
+            raise CommandError(f"Invalid baseline {options['baseline']}: {err}") from err
+        regressions = []
+        for key, result in results.items():
+            former = baseline.get(key)
+            if former is None:
+                continue
+            delta = result['p95_ms'] - former['p95_ms']
+            if delta > options['min_delta'] and delta > former['p95_ms'] * options['threshold']:
+                regressions.append(
+                    f"{key}: p95 {former['p95_ms']:.2f} ms -> {result['p95_ms']:.2f} ms"
+                )
+            if result['queries'] > former['queries']:
+                regressions.append(
+                    f"{key}: {former['queries']} -> {result['queries']} queries"
+                )
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regression against the baseline."))
@@ -0,0 +1,75 @@
+"""Benchmark of the issue import through IssueListCreateView."""
+
+# lib
+from time import perf_counter
+
+# django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+# rest_framework
+from rest_framework.test import APIClient
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    """
+    Compares the import of issues posted one by one with the import posted in batches.
+    The dataset is created in a transaction which is rolled back at the end.
+    """
+    help = "Benchmark the per-item and batched import of issues."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=2000, help="Number of issues.")
+        parser.add_argument(
+            '--batch-size', type=int, default=500, help="Number of issues per request."
+        )
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                transaction.atomic():
+            author = CustomUser.objects.create(email='bench-issue-import@softdesk.local')
+            project = Project.objects.create(
+                title="Import", description="benchmark", type="back-end", author=author
+            )
+            client = APIClient()
+            client.force_authenticate(author)
+            url = f'/api/projects/{project.pk}/issues/'
+            data = [
+                {
+                    'title': f"Issue {index}", 'description': "benchmark", 'tag': "bug",
+                    'priority': "low", 'status': "open",
+                }
+                for index in range(options['issues'])
+            ]
+
+            start = perf_counter()
+            for item in data:
+                self.check_response(client.post(url, item, format='json'))
+            self.report("per item", len(data), perf_counter() - start)
+
+            batch_size = options['batch_size']
+            start = perf_counter()
+            for index in range(0, len(data), batch_size):
+                self.check_response(
+                    client.post(url, data[index:index + batch_size], format='json')
+                )
+            self.report(f"batches of {batch_size}", len(data), perf_counter() - start)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def check_response(response):
+        """Stops the benchmark if the import failed."""
+        if response.status_code != 201:
+            raise CommandError(f"Import failed: {response.status_code} {response.data}")
+
+    def report(self, label, count, duration):
+        """Writes the throughput of an import."""
+        self.stdout.write(
+            f"{label:<16} | {count} issues | {duration:8.2f} s | {count / duration:10.0f} issues/s"
+        )
@@ -0,0 +1,90 @@
+"""Benchmark of the project listing of ProjectListCreateView."""
+
+# lib
+from itertools import chain
+from time import perf_counter
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Contributor
+
+
+class Command(BaseCommand):
+    """
+    Compares the former Python set merging with the database-side listing.
+    The dataset is created in a transaction which is rolled back at the end.
+    """
+    help = "Benchmark the project listing for a user member of many projects."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--projects', type=int, nargs='+', default=[10000, 100000],
+            help="Sizes of the datasets to benchmark."
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=50, help="Number of projects of a page."
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Number of runs per case.")
+
+    def handle(self, *args, **options):
+        for size in options['projects']:
+            with transaction.atomic():
+                user = self.create_dataset(size)
+                self.run_case(
+                    size, "python set merging", options['repeat'],
+                    lambda: len(set(chain(
+                        Project.objects.filter(author=user),
+                        Project.objects.filter(contributors=user),
+                    )))
+                )
+                self.run_case(
+                    size, "queryset first page", options['repeat'],
+                    lambda: len(Project.objects.for_user(user)[:options['page_size']])
+                )
+                self.run_case(
+                    size, "queryset count", options['repeat'],
+                    lambda: Project.objects.for_user(user).count()
+                )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def create_dataset(size):
+        """Creates a user author of half of the projects and contributor of the other half."""
+        user = CustomUser.objects.create(email='bench-project-list@softdesk.local')
+        other = CustomUser.objects.create(email='bench-project-list-other@softdesk.local')
+        Project.objects.bulk_create(
+            [
+                Project(
+                    title=f"Project {i}", description="benchmark", type="back-end",
+                    author=user if i % 2 else other,
+                )
+                for i in range(size)
+            ],
+            batch_size=1000,
+        )
+        Contributor.objects.bulk_create(
+            [
+                Contributor(user=user, project_id=pk, role="contributor")
+                for pk in Project.objects.filter(author=other).values_list('pk', flat=True)
+            ],
+            batch_size=1000,
+        )
+        return user
+
+    def run_case(self, size, label, repeat, func):
+        """Runs func repeat times and writes the best latency and the query count."""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                func()
+                timings.append(perf_counter() - start)
+        self.stdout.write(
+            f"{size:>8} projects | {label:<22} | "
+            f"{len(context.captured_queries)} queries | {min(timings) * 1000:9.2f} ms"
+        )
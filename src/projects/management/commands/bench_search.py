@@ -0,0 +1,90 @@
+"""Benchmark of the full-text search against the LIKE scan."""
+
+# lib
+import random
+from time import perf_counter
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Issue, Comment
+
+# bulk
+from projects.bulk import bulk_create
+
+# search
+from projects.search import LikeSearchBackend, VENDOR_BACKENDS
+
+WORDS = (
+    "login", "password", "token", "database", "timeout", "deadlock", "cache", "upload", "export",
+    "import", "search", "index", "crash", "memory", "leak", "button", "layout", "mobile",
+    "android", "ios", "release", "deploy", "migration", "permission", "comment", "issue",
+    "backend", "frontend", "latency", "error", "warning", "retry", "queue", "worker", "email",
+)
+
+
+class Command(BaseCommand):
+    """
+    Compares the ranked search of the database vendor index with the LIKE scan over a generated
+    project. The dataset is created in a transaction which is rolled back at the end.
+    """
+    help = "Benchmark the full-text search index against the LIKE baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=10000, help="Number of issues.")
+        parser.add_argument(
+            '--comments', type=int, default=3, help="Number of comments per issue."
+        )
+        parser.add_argument('--words', type=int, default=60, help="Words per description.")
+        parser.add_argument(
+            '--vocabulary', type=int, default=20000, help="Number of distinct generated words."
+        )
+        parser.add_argument('--repeat', type=int, default=20, help="Searches per query.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the generated text.")
+
+    def text(self, words):
+        """Returns a random text, the searched words are as rare as the generated ones."""
+        return ' '.join(random.choices(self.vocabulary, k=words))
+
+    def handle(self, *args, **options):
+        backend_class = VENDOR_BACKENDS.get(connection.vendor)
+        if backend_class is None:
+            raise CommandError(f"No full-text index for {connection.vendor}.")
+        random.seed(options['seed'])
+        self.vocabulary = WORDS + tuple(f'word{index}' for index in range(options['vocabulary']))
+        with transaction.atomic():
+            author = CustomUser.objects.create(email='bench-search@softdesk.local')
+            project = Project.objects.create(
+                title="Search", description="benchmark", type="back-end", author=author
+            )
+            issues = bulk_create(Issue, [
+                Issue(
+                    title=self.text(5), description=self.text(options['words']), tag="bug",
+                    priority="low", status="open", author=author, assignee=author,
+                    project=project,
+                )
+                for _ in range(options['issues'])
+            ])
+            bulk_create(Comment, [
+                Comment(description=self.text(options['words']), author=author, issue=issue)
+                for issue in issues for _ in range(options['comments'])
+            ])
+            projects = Project.objects.filter(pk=project.pk)
+
+            queries = ("deadlock", "memory leak", "android crash timeout", "latenc")
+            for backend in (LikeSearchBackend(), backend_class()):
+                for query in queries:
+                    start = perf_counter()
+                    for _ in range(options['repeat']):
+                        results = backend.search(query, projects)
+                        count = results.count()
+                        results[0:50]
+                    duration = (perf_counter() - start) / options['repeat']
+                    self.stdout.write(
+                        f"{type(backend).__name__:<22} | {query:<22} | {count:6} hits "
+                        f"| {duration * 1000:9.2f} ms"
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,59 @@
+"""Generation of a synthetic dataset for the benchmarks."""
+
+# lib
+from time import perf_counter
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+# dataset
+from projects.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    """
+    Writes users, projects, contributors, issues and comments in a single transaction, with
+    bulk INSERTs and without signals. The fan-outs are the mean number of children per parent,
+    for instance 1000 projects with 20 issues and 10 comments per issue write about 200000
+    comments. The generated users log in with --password.
+    """
+    help = "Generate a synthetic dataset of users, projects, contributors, issues and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Number of users.")
+        parser.add_argument('--projects', type=int, default=1000, help="Number of projects.")
+        parser.add_argument(
+            '--contributors', type=int, default=5, help="Mean contributors per project."
+        )
+        parser.add_argument('--issues', type=int, default=20, help="Mean issues per project.")
+        parser.add_argument('--comments', type=int, default=5, help="Mean comments per issue.")
+        parser.add_argument(
+            '--days', type=int, default=365, help="Days over which the rows are created."
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator.")
+        parser.add_argument(
+            '--password', default='softdesk', help="Password of the generated users."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000, help="Rows buffered per table before a write."
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['projects']:
+            raise CommandError("The projects need at least one user.")
+        generator = DatasetGenerator(
+            options['users'], options['projects'], options['contributors'], options['issues'],
+            options['comments'], days=options['days'], seed=options['seed'],
+            password=options['password'], batch_size=options['batch_size'],
+        )
+        start = perf_counter()
+        with transaction.atomic():
+            counts = generator.generate()
+        duration = perf_counter() - start
+        for model, count in counts.items():
+            self.stdout.write(f"{model.__name__:<12} | {count:>10}")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} rows in {duration:.1f} s, {total / duration:.0f} rows/s."
+        ))
@@ -0,0 +1,55 @@
+"""Import of a project exported by ProjectExportView."""
+
+# lib
+import sys
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+
+# models
+from accounts.models import CustomUser
+
+# export
+from projects.export import ProjectImporter
+
+
+class Command(BaseCommand):
+    """
+    Creates a new project from a newline-delimited JSON export, read line by line.
+    """
+    help = "Import a project from a newline-delimited JSON export."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the export, - for the standard input.")
+        parser.add_argument(
+            '--author', help="Email of the author of the new project, "
+                             "defaults to the author of the exported project."
+        )
+        parser.add_argument('--batch-size', type=int, help="Number of rows per INSERT.")
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = CustomUser.objects.filter(email=options['author']).first()
+            if author is None:
+                raise CommandError(f"Unknown user {options['author']}.")
+        importer = ProjectImporter(author, options['batch_size'])
+        try:
+            if options['path'] == '-':
+                project = importer.run(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as lines:
+                    project = importer.run(lines)
+        except (ValueError, KeyError, CustomUser.DoesNotExist) as err:
+            raise CommandError(f"Invalid export: {err!r}") from err
+        if project is None:
+            raise CommandError("The export is empty.")
+
+        self.stdout.write(
+            f"Project {project.pk} created with {importer.counts['contributor']} contributors, "
+            f"{importer.counts['issue']} issues and {importer.counts['comment']} comments."
+        )
+        if importer.unknown_users:
+            self.stdout.write(
+                f"{len(importer.unknown_users)} unknown users were replaced by the author."
+            )
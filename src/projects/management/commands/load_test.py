@@ -0,0 +1,157 @@
+"""Load test of the read endpoints served by WSGI and ASGI servers."""
+
+# lib
+import asyncio
+import resource
+from time import perf_counter
+from urllib.parse import urlsplit
+
+# django
+from django.core.management.base import BaseCommand, CommandError
+
+# rest_framework_simplejwt
+from rest_framework_simplejwt.tokens import AccessToken
+
+# models
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Opens many keep-alive HTTP/1.1 connections to each target in turn, each connection sending a
+    GET as soon as the previous response is read, and writes the throughput and the latencies.
+    The servers are started beforehand, for instance:
+        gunicorn SoftDesk.wsgi -w 4 --threads 8 -b 127.0.0.1:8000
+        uvicorn SoftDesk.asgi:application --workers 4 --port 8001
+    """
+    help = "Compare the throughput and the latencies of URLs under many concurrent connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help="URLs to load, optionally labelled: wsgi=http://127.0.0.1:8000/api/projects/"
+        )
+        parser.add_argument('--user', help="Email of the user authenticated by an access token.")
+        parser.add_argument('--connections', type=int, default=1000, help="Open connections.")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds per target.")
+        parser.add_argument(
+            '--ramp-up', type=float, default=5,
+            help="Seconds over which the connections are opened, not measured."
+        )
+        parser.add_argument('--timeout', type=float, default=30, help="Seconds per response.")
+
+    def handle(self, *args, **options):
+        self.raise_open_files_limit(options['connections'])
+        headers = {}
+        if options['user']:
+            try:
+                user = CustomUser.objects.get(email=options['user'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']}.")
+            headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+        self.stdout.write(
+            f"{'target':<10} | {'requests':>8} | {'errors':>6} | {'req/s':>8} | "
+            f"{'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8}"
+        )
+        for target in options['targets']:
+            label, _, url = target.rpartition('=')
+            stats = asyncio.run(self.load(url, headers, options))
+            self.write_stats(label or urlsplit(url).netloc, stats, options['duration'])
+
+    @staticmethod
+    def raise_open_files_limit(connections):
+        """Raises the soft limit of open files to fit the connections."""
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        needed = connections + 64
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            if hard != resource.RLIM_INFINITY and hard < needed:
+                raise CommandError(f"{connections} connections exceed the open files limit {hard}.")
+            resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+    async def load(self, url, headers, options):
+        """Loads url and returns the latencies of the measured responses and the errors."""
+        loop = asyncio.get_running_loop()
+        start = loop.time() + options['ramp_up']
+        deadline = start + options['duration']
+        stats = {'latencies': [], 'errors': 0}
+        connections = options['connections']
+        await asyncio.gather(*(
+            self.connection(
+                url, headers, options['timeout'], start, deadline, stats,
+                delay=options['ramp_up'] * index / connections,
+            )
+            for index in range(connections)
+        ))
+        return stats
+
+    async def connection(self, url, headers, timeout, start, deadline, stats, delay):
+        """Sends the requests of one connection until the deadline, reconnects on errors."""
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        request = ''.join(
+            [f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n']
+            + [f'{name}: {value}\r\n' for name, value in headers.items()]
+            + ['\r\n']
+        ).encode()
+        await asyncio.sleep(delay)
+        writer = None
+        while loop.time() < deadline:
+            sent_at = perf_counter()
+            measured = loop.time() >= start
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port), timeout
+                    )
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(self.read_response(reader), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                status, keep_alive = None, False
+            if measured and loop.time() < deadline:
+                if status == 200:
+                    stats['latencies'].append(perf_counter() - sent_at)
+                else:
+                    stats['errors'] += 1
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    @staticmethod
+    async def read_response(reader):
+        """Reads a response and returns its status and whether the connection is kept."""
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        version, status = head[0].split(' ', 2)[:2]
+        headers = {}
+        for line in head[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            await reader.readexactly(int(headers.get('content-length', 0)))
+        keep_alive = headers.get('connection') != 'close' and version == 'HTTP/1.1'
+        return int(status), keep_alive
+
+    def write_stats(self, label, stats, duration):
+        """Writes the throughput and the latency percentiles of a target."""
+        latencies = sorted(stats['latencies'])
+
+        def percentile(rank):
+            if not latencies:
+                return float('nan')
+            return latencies[min(len(latencies) - 1, int(len(latencies) * rank))] * 1000
+
+        self.stdout.write(
+            f"{label:<10} | {len(latencies):>8} | {stats['errors']:>6} | "
+            f"{len(latencies) / duration:>8.1f} | {percentile(0.5):>8.2f} | "
+            f"{percentile(0.99):>8.2f} | {percentile(1):>8.2f}"
+        )
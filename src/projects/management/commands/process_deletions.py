@@ -0,0 +1,41 @@
+"""Resumption of the background deletions of the projects and users."""
+
+# lib
+from datetime import timedelta
+
+# django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# deletion
+from projects.deletion import run_deletion
+
+# models
+from projects.models import Deletion
+
+
+class Command(BaseCommand):
+    """
+    Runs the deletions which are not done, oldest first, in the process of the command: the
+    deletions queued by a process stopped before their end, and the failed ones. A deletion
+    resumes after its last deleted batch. A running deletion is left to its worker, unless it
+    made no progress for --stale-seconds. Meant to be run after a restart or scheduled.
+    """
+    help = "Run or resume the unfinished background deletions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-seconds', type=int, default=600,
+            help="Seconds without progress after which a running deletion is resumed."
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(seconds=options['stale_seconds'])
+        unfinished = Deletion.objects.exclude(status=Deletion.DONE).order_by('created_time')
+        for deletion_id in unfinished.values_list('pk', flat=True):
+            run_deletion(deletion_id, stale_before)
+            deletion = Deletion.objects.get(pk=deletion_id)
+            self.stdout.write(
+                f"{deletion.model} {deletion.object_id}: {deletion.status}, "
+                f"{deletion.deleted_rows}/{deletion.total_rows} rows {deletion.error}".rstrip()
+            )
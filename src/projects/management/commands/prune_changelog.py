@@ -0,0 +1,55 @@
+"""Pruning of the old entries of the sync change log."""
+
+# lib
+from datetime import timedelta
+from time import sleep
+
+# django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+# models
+from projects.models import ChangeLog
+
+
+class Command(BaseCommand):
+    """
+    Deletes the change log entries older than --days by batches, each batch in its own short
+    transaction. The last entry is kept, it holds the current token. A client whose token is
+    older than the remaining entries is asked to sync from scratch. Meant to be scheduled, for
+    instance daily by cron.
+    """
+    help = "Delete the old entries of the sync change log by batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_RETENTION_DAYS,
+            help="Age in days of the entries deleted."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000, help="Number of entries per DELETE."
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0, help="Seconds between two batches."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        entries = ChangeLog.objects.order_by('-id').values_list('id', flat=True)
+        last = entries.first()
+        # The ids follow the creation times, the newest old entry bounds the batches by id.
+        bound = entries.filter(created_time__lte=cutoff).first()
+        old = ChangeLog.objects.filter(id__lte=bound or 0, id__lt=last or 0).order_by('id')
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                pks = list(old.values_list('pk', flat=True)[:options['batch_size']])
+                if not pks:
+                    break
+                ChangeLog.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            if options['pause']:
+                sleep(options['pause'])
+        self.stdout.write(f"{deleted} change log entries deleted.")
@@ -0,0 +1,25 @@
+"""Rebuild of the full-text search index."""
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# search
+from projects.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Fills the search index again from the issues and comments, after changes made outside the
+    ORM or a change of SEARCH_BACKEND. The PostgreSQL index is maintained by the database.
+    """
+    help = "Rebuild the full-text search index of the issues and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database alias.")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options['database'])
+        with transaction.atomic(using=options['database']):
+            backend.rebuild()
+        self.stdout.write(f"Search index rebuilt by {type(backend).__name__}.")
@@ -0,0 +1,45 @@
+"""Reconciliation of the counters of the projects and issues."""
+
+# django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# models
+from projects.models import Project, Contributor, Issue, Comment
+
+# counters
+from projects.counters import project_counters, issue_counters, drifted
+
+
+class Command(BaseCommand):
+    """
+    Compares the counters maintained by the signals with the actual counts and fixes the
+    drifted rows, left by raw SQL, QuerySet.delete() or QuerySet.update() changes.
+    """
+    help = "Report and fix the drift of the issue, comment and contributor counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true', help="Only report the drifted rows."
+        )
+
+    def handle(self, *args, **options):
+        targets = (
+            (Project, project_counters(Issue, Comment, Contributor)),
+            (Issue, issue_counters(Comment)),
+        )
+        with transaction.atomic():
+            for model, counters in targets:
+                rows = drifted(model.objects.all(), counters) \
+                    .values('pk', *counters, *(f'actual_{name}' for name in counters))
+                pks = []
+                for row in rows:
+                    pks.append(row['pk'])
+                    changes = ', '.join(
+                        f"{name} {row[name]} -> {row[f'actual_{name}']}" for name in counters
+                        if row[name] != row[f'actual_{name}']
+                    )
+                    self.stdout.write(f"{model.__name__} {row['pk']}: {changes}")
+                if pks and not options['dry_run']:
+                    model.objects.filter(pk__in=pks).update(**counters)
+                self.stdout.write(f"{len(pks)} drifted {model._meta.verbose_name_plural}.")
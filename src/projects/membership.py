@@ -0,0 +1,149 @@
+"""Contains the resolution of the membership of a user in a project."""
+
+# lib
+from threading import Lock
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+# rest_framework
+from rest_framework.generics import get_object_or_404
+
+# models
+from projects.models import Project, Contributor
+
+
+class MembershipCache:
+    """
+    Cache of the role of the users in the projects, shared between the requests.
+    Uses the cache alias MEMBERSHIP_CACHE_ALIAS, the hits and misses are counted per process.
+    The entries are keyed by a version of the project bumped by each invalidation, as in the
+    user cache of accounts app: a request which read a role before an invalidation stores it
+    under the former version, where it is never read.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @property
+    def cache(self):
+        """The cache backend storing the roles."""
+        return caches[settings.MEMBERSHIP_CACHE_ALIAS]
+
+    @staticmethod
+    def version_key(project_id):
+        """Cache key of the version of project_id."""
+        return f'membership-version:{project_id}'
+
+    def key(self, user_id, project_id):
+        """Cache key of the role of user_id in the current version of project_id."""
+        version = self.cache.get(self.version_key(project_id), 0)
+        return f'membership:{project_id}:{version}:{user_id}'
+
+    def get(self, key):
+        """Returns the cached (is_author, is_contributor) tuple or None."""
+        role = self.cache.get(key)
+        with self._lock:
+            if role is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return role
+
+    def set(self, key, is_author, is_contributor):
+        """Caches a role."""
+        self.cache.set(key, (is_author, is_contributor), settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+    def bump(self, project_id):
+        """Bumps the version of project_id."""
+        try:
+            self.cache.incr(self.version_key(project_id))
+        except ValueError:
+            self.cache.set(self.version_key(project_id), 1, None)
+
+    def invalidate(self, project_id):
+        """
+        Bumps the version of project_id, its cached roles are no longer read. The version is
+        bumped again once the transaction commits: a role read by another request before the
+        commit is stored under the version of the change.
+        """
+        self.bump(project_id)
+        transaction.on_commit(lambda: self.bump(project_id))
+
+    def stats(self):
+        """Returns the counters of the process."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+        }
+
+
+membership_cache = MembershipCache()
+
+
+class ProjectMembership:
+    """
+    Role of the authenticated user in a project.
+    The project itself is only loaded if the view needs it.
+    """
+
+    def __init__(self, project_id, is_author, is_contributor, project=None):
+        self.project_id = project_id
+        self.is_author = is_author
+        self.is_contributor = is_contributor
+        self._project = project
+
+    @property
+    def is_member(self):
+        """The user is the author or a contributor of the project."""
+        return self.is_author or self.is_contributor
+
+    @property
+    def project(self):
+        """The project instance with its author."""
+        if self._project is None:
+            self._project = get_object_or_404(
+                Project.objects.select_related('author'), pk=self.project_id
+            )
+        return self._project
+
+
+def get_project_membership(request, project_id):
+    """
+    Returns the membership of the authenticated user in the project.
+    The role is read from the membership cache first. On a miss the project, its author and
+    the contributor EXISTS subquery are loaded in a single query. The result is kept on the
+    request to be shared by the permissions and the view.
+    Raises Http404 if the project does not exist.
+    """
+    memberships = getattr(request, '_project_memberships', None)
+    if memberships is None:
+        memberships = request._project_memberships = {}
+    project_id = int(project_id)
+    if project_id in memberships:
+        return memberships[project_id]
+
+    user = request.user
+    # The key is read before the project, see MembershipCache.
+    key = membership_cache.key(user.pk, project_id)
+    role = membership_cache.get(key)
+    if role is not None:
+        membership = ProjectMembership(project_id, *role)
+    else:
+        queryset = Project.objects.select_related('author').annotate(
+            is_contributor=Exists(Contributor.objects.filter(project=OuterRef('pk'), user=user.pk))
+        )
+        project = get_object_or_404(queryset, pk=project_id)
+        membership = ProjectMembership(
+            project_id, project.author_id == user.pk, project.is_contributor, project
+        )
+        membership_cache.set(key, membership.is_author, membership.is_contributor)
+    memberships[project_id] = membership
+    return membership
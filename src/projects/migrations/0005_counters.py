@@ -0,0 +1,46 @@
+# Generated by Django 3.2.5 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+from projects.counters import project_counters, issue_counters
+
+
+def fill_counters(apps, schema_editor):
+    """Counts the existing rows."""
+    Project = apps.get_model('projects', 'Project')
+    Issue = apps.get_model('projects', 'Issue')
+    Comment = apps.get_model('projects', 'Comment')
+    Contributor = apps.get_model('projects', 'Contributor')
+    Project.objects.update(**project_counters(Issue, Comment, Contributor))
+    Issue.objects.update(**issue_counters(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_foreign_key_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='contributor_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='issue_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from projects.search import VENDOR_BACKENDS
+
+
+def create_search_index(apps, schema_editor):
+    """Creates the full-text index of the database vendor, if it has one."""
+    backend_class = VENDOR_BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is not None:
+        backend_class.create_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    backend_class = VENDOR_BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is not None:
+        backend_class.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
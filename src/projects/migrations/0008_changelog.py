@@ -0,0 +1,33 @@
+# Generated by Django 3.2.5 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_issue_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.IntegerField()),
+                ('model', models.CharField(max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('action', models.CharField(max_length=8)),
+                ('user_id', models.IntegerField(null=True)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['project_id', 'id'], name='changelog_project_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(condition=models.Q(('user_id__isnull', False)), fields=['user_id', 'id'], name='changelog_user_idx'),
+        ),
+    ]
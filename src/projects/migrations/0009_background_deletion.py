@@ -0,0 +1,38 @@
+# Generated by Django 3.2.5 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deletion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('status', models.CharField(default='pending', max_length=8)),
+                ('total_rows', models.PositiveIntegerField(null=True)),
+                ('deleted_rows', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('finished_time', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deleted_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='deletion',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['created_time'], name='deletion_unfinished_idx'),
+        ),
+    ]
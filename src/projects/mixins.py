@@ -0,0 +1,240 @@
+"""Contains the view mixins of projects app."""
+
+# lib
+from copy import copy
+from hashlib import md5
+
+# django
+from django.conf import settings
+from django.db.models import Count, Max, Subquery, Value
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# rest_framework
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# models
+from accounts.models import CustomUser
+
+# bulk
+from projects.bulk import bulk_create
+
+# serializers
+from projects.serializers import DeletionSerializer
+
+# response cache
+from projects.response_cache import response_cache
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for the list and retrieve actions.
+    A weak ETag is derived from the requesting user, the last update time and the number of
+    rows serialized by the response and the last update time of the users, which are nested in
+    the rows. Last-Modified is added to the single resources. The requests matching
+    If-None-Match or If-Modified-Since are answered 304 Not Modified without running the
+    serializer.
+    The relations added with ?expand= are not covered by the validators, those requests are
+    always served in full.
+    """
+
+    @staticmethod
+    def get_users_updated_time():
+        """
+        Returns the subquery of the last update time of the users, read from the index of
+        updated_time with the validators.
+        """
+        # Grouped on a constant, the subquery is a single MAX of the whole table.
+        return Subquery(
+            CustomUser.objects.annotate(table=Value(1)).values('table')
+            .annotate(last_updated_time=Max('updated_time')).values('last_updated_time')
+        )
+
+    def get_etag(self, updated_time, count, users_updated_time):
+        """Returns the weak ETag of the response to the current request."""
+        digest = md5(':'.join((
+            self.request.get_full_path(), str(self.request.user.pk), str(count),
+            updated_time.isoformat(), users_updated_time.isoformat(),
+        )).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def get_not_modified_response(self, updated_time, count, users_updated_time,
+                                  last_modified=None):
+        """
+        Returns the 304 response if the client has the current version, else None.
+        The validators are also stored to be added to the full response.
+        """
+        self.conditional_headers = {'ETag': self.get_etag(updated_time, count, users_updated_time)}
+        if last_modified is not None:
+            last_modified = max(last_modified, users_updated_time)
+            self.conditional_headers['Last-Modified'] = http_date(last_modified.timestamp())
+        response = get_conditional_response(
+            self.request,
+            etag=self.conditional_headers['ETag'],
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+        if response is not None:
+            for header, value in self.conditional_headers.items():
+                response[header] = value
+        return response
+
+    def is_conditional(self):
+        """The validators cover the response to the current request."""
+        return 'expand' not in self.request.query_params
+
+    def filter_queryset(self, queryset):
+        """
+        Override of the filter_queryset method to read the last update time of the users with
+        the instance of a conditional retrieve.
+        """
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'conditional_retrieve', False):
+            queryset = queryset.annotate(users_updated_time=self.get_users_updated_time())
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Lists a queryset or answers 304 Not Modified."""
+        self.conditional_headers = {}
+        if self.is_conditional():
+            validators = self.filter_queryset(self.get_queryset()).aggregate(
+                updated_time=Max('updated_time'), count=Count('id'),
+                users_updated_time=Max(self.get_users_updated_time()),
+            )
+            if validators['count']:
+                response = self.get_not_modified_response(**validators)
+                if response is not None:
+                    return response
+        response = super().list(request, *args, **kwargs)
+        for header, value in self.conditional_headers.items():
+            response[header] = value
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves a model instance or answers 304 Not Modified."""
+        self.conditional_retrieve = self.is_conditional()
+        instance = self.get_object()
+        headers = {}
+        if self.conditional_retrieve:
+            response = self.get_not_modified_response(
+                instance.updated_time, 1, instance.users_updated_time,
+                last_modified=instance.updated_time,
+            )
+            if response is not None:
+                return response
+            headers = self.conditional_headers
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers=headers)
+
+
+class CachedListMixin:
+    """
+    Serves the list action from the response cache when RESPONSE_CACHE_TIMEOUT is set.
+    The key is built from the user, the path with its query string and the media type, the entry
+    is valid as long as the version of get_response_version_key is unchanged. A hit answers with
+    the cached bytes and validators without a query, or 304 Not Modified.
+    """
+    response_cache_name = None
+
+    def get_response_version_key(self):
+        """Returns the cache key of the version the list depends on."""
+        raise NotImplementedError
+
+    def get_cached_response(self, entry):
+        """Returns the response of a cache entry, or 304 if the client has it."""
+        response = get_conditional_response(self.request, etag=entry['headers'].get('ETag'))
+        if response is None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        for header, value in entry['headers'].items():
+            response[header] = value
+        return response
+
+    def revalidate(self, key, version, request, *args, **kwargs):
+        """Renders the list again with a copy of the view and caches it."""
+        view = copy(self)
+        response = super(CachedListMixin, view).list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response = view.finalize_response(request, response, *args, **kwargs).render()
+            response_cache.set(key, version, response)
+
+    def list(self, request, *args, **kwargs):
+        """Lists a queryset from the response cache."""
+        if not settings.RESPONSE_CACHE_TIMEOUT:
+            return super().list(request, *args, **kwargs)
+        key = response_cache.key(self.response_cache_name, request.user.pk, request)
+        entry, version = response_cache.get(key, self.get_response_version_key())
+        if entry is not None and entry['version'] == version:
+            response_cache.count(self.response_cache_name, 'hits')
+            return self.get_cached_response(entry)
+        if entry is not None and response_cache.is_servable_stale(version):
+            response_cache.count(self.response_cache_name, 'stale')
+            response = self.get_cached_response(entry)
+            response_cache.revalidate(
+                key, lambda: self.revalidate(key, version, request, *args, **kwargs)
+            )
+            return response
+        response_cache.count(self.response_cache_name, 'misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # The version was read before the queries, a write committed meanwhile makes the
+            # entry stale.
+            response.add_post_render_callback(
+                lambda rendered: response_cache.set(key, version, rendered)
+            )
+        return response
+
+
+class BulkCreateMixin:
+    """
+    Accepts a list of objects on POST in addition to a single object.
+    The batch is validated in one pass, an invalid item rejects the whole batch and the errors
+    are reported at the index of each item. The valid batch is written with bulk_create in a
+    single transaction.
+    """
+
+    def get_save_kwargs(self):
+        """Returns the attributes set by the view on the created instances."""
+        return {}
+
+    def perform_create(self, serializer):
+        """Saves a single instance with the attributes of the view."""
+        serializer.save(**self.get_save_kwargs())
+
+    def create(self, request, *args, **kwargs):
+        """Creates a model instance or a batch of instances."""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        if len(request.data) > settings.MAX_BULK_SIZE:
+            raise ValidationError(f"A batch contains at most {settings.MAX_BULK_SIZE} items.")
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        instances = self.perform_bulk_create(serializer)
+        return Response(
+            self.get_serializer(instances, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def perform_bulk_create(self, serializer):
+        """Inserts the validated batch and returns the created instances."""
+        model = serializer.child.Meta.model
+        save_kwargs = self.get_save_kwargs()
+        return bulk_create(
+            model, [model(**item, **save_kwargs) for item in serializer.validated_data]
+        )
+
+
+class BackgroundDestroyMixin:
+    """
+    Answers the deletion of an instance, hidden at once and deleted in the background, with
+    202 Accepted and its progress, also read from the url of the Location header.
+    """
+
+    def deletion_response(self, deletion):
+        """Returns the response to a queued deletion."""
+        location = self.request.build_absolute_uri(reverse('deletion', kwargs={'pk': deletion.pk}))
+        return Response(
+            DeletionSerializer(deletion).data, status=status.HTTP_202_ACCEPTED,
+            headers={'Location': location},
+        )
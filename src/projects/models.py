@@ -1,14 +1,62 @@
 """Contains the models of projects app."""
 
+# lib
+from uuid import uuid4
+
 # django
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Q
 
 # settings.AUTH_USER_MODEL
 CustomUserModel = get_user_model()
 
 
-class Project(models.Model):
+class ProjectQuerySet(models.QuerySet):
+    """Custom QuerySet for Project instances."""
+
+    def for_user(self, user):
+        """
+        Returns the projects of which the user is the author or a contributor.
+        The membership is resolved by the database in a single query, so the
+        result stays ordered, lazy and can be sliced by the pagination.
+        """
+        contributor_projects = Contributor.objects.filter(user=user).values('project_id')
+        return self.filter(Q(author=user) | Q(pk__in=contributor_projects))
+
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    """
+    Default manager of the projects, a project being deleted in the background is hidden.
+    """
+
+    def get_queryset(self):
+        """
+        Override of the get_queryset method to exclude the projects being deleted.
+        """
+        return super().get_queryset().filter(deleted_time__isnull=True)
+
+
+class CounterFieldsMixin:
+    """
+    The counter fields are only written by the F() updates of projects.signals, the save of a
+    loaded instance leaves them out so it does not overwrite them with stale values.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        """
+        Override of the save method to exclude the counters from the update of the instance.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Project(CounterFieldsMixin, models.Model):
     """
     This is a class allowing to create a Project.
     """
@@ -20,6 +68,17 @@ class Project(models.Model):
     )
     contributors = models.ManyToManyField(CustomUserModel, through="Contributor")
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    # Counters maintained by projects.signals, see the reconcile_counters command.
+    issue_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    contributor_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('issue_count', 'comment_count', 'contributor_count')
+    # Set when the project is hidden, its rows are deleted by projects.deletion.
+    deleted_time = models.DateTimeField(null=True, editable=False)
+
+    objects = ProjectManager()
+    all_objects = ProjectQuerySet.as_manager()
 
     class Meta:
         """Meta options."""
@@ -35,7 +94,8 @@ class Contributor(models.Model):
     """
     This is a class allowing to create a Contributor.
     """
-    user = models.ForeignKey(CustomUserModel, on_delete=models.CASCADE)
+    # The user_id lookups use the (user, project) unique index.
+    user = models.ForeignKey(CustomUserModel, on_delete=models.CASCADE, db_index=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     role = models.CharField(max_length=128)
 
@@ -48,7 +108,7 @@ class Contributor(models.Model):
         return str(self.user)
 
 
-class Issue(models.Model):
+class Issue(CounterFieldsMixin, models.Model):
     """
     This is a class allowing to create a Issue.
     """
@@ -58,18 +118,45 @@ class Issue(models.Model):
     priority = models.CharField(max_length=128)
     status = models.CharField(max_length=128)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    # Counter maintained by projects.signals, see the reconcile_counters command.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('comment_count',)
     author = models.ForeignKey(
         to=CustomUserModel, on_delete=models.CASCADE, related_name='author_issue'
     )
+    # The assignee_id lookups use the issue_assignee_created_idx index.
     assignee = models.ForeignKey(
-        to=CustomUserModel, on_delete=models.CASCADE, related_name='assignee'
+        to=CustomUserModel, on_delete=models.CASCADE, related_name='assignee', db_index=False
+    )
+    # The project_id lookups use the issue_project_created_idx index.
+    project = models.ForeignKey(
+        to=Project, on_delete=models.CASCADE, related_name='issue', db_index=False
     )
-    project = models.ForeignKey(to=Project, on_delete=models.CASCADE, related_name='issue')
 
     class Meta:
         """Meta options."""
         ordering = ["-created_time"]
         verbose_name = "Issue"
+        indexes = [
+            # Cursor pagination of the issues of a project.
+            models.Index(
+                fields=['project', 'created_time', 'id'], name='issue_project_created_idx'
+            ),
+            # Filters of the issue list, ordered by the cursor.
+            models.Index(
+                fields=['project', 'status', 'created_time', 'id'], name='issue_status_created_idx'
+            ),
+            models.Index(
+                fields=['assignee', 'project', 'created_time', 'id'],
+                name='issue_assignee_created_idx'
+            ),
+            # The open issues of a project by priority.
+            models.Index(
+                fields=['project', 'priority', 'created_time', 'id'], condition=Q(status='open'),
+                name='issue_open_priority_idx'
+            ),
+        ]
 
     def __str__(self):
         """Represents the class objects as a string."""
@@ -84,10 +171,93 @@ class Comment(models.Model):
     author = models.ForeignKey(
         to=CustomUserModel, on_delete=models.CASCADE, related_name='author_comment'
     )
-    issue = models.ForeignKey(to=Issue, on_delete=models.CASCADE, related_name='comment')
+    # The issue_id lookups use the comment_issue_created_idx index.
+    issue = models.ForeignKey(
+        to=Issue, on_delete=models.CASCADE, related_name='comment', db_index=False
+    )
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
 
     class Meta:
         """Meta options."""
         ordering = ["-created_time"]
         verbose_name = "Comment"
+        indexes = [
+            # Cursor pagination of the comments of an issue.
+            models.Index(
+                fields=['issue', 'created_time', 'id'], name='comment_issue_created_idx'
+            ),
+        ]
+
+
+class ChangeLog(models.Model):
+    """
+    This is a class allowing to record a change of a row of a project for the sync endpoint.
+    The entries are written by projects.signals in the transaction of the change, their id is
+    the change token of the clients. The ids are plain integers so the tombstones outlive the
+    deleted rows.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+    project_id = models.IntegerField()
+    model = models.CharField(max_length=16)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=8)
+    # The user whose access to the project the change granted or removed.
+    user_id = models.IntegerField(null=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta options."""
+        indexes = [
+            # Changes of the projects of a user after a token.
+            models.Index(fields=['project_id', 'id'], name='changelog_project_idx'),
+            # Access changes of a user after a token.
+            models.Index(
+                fields=['user_id', 'id'], condition=Q(user_id__isnull=False),
+                name='changelog_user_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Represents the class objects as a string."""
+        return f'{self.model} {self.object_id} {self.action}'
+
+
+class Deletion(models.Model):
+    """
+    This is a class allowing to follow the background deletion of a project or a user.
+    Its id is random, the progress of the deletion of a user is read once the user can no
+    longer log in.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    model = models.CharField(max_length=16)
+    object_id = models.IntegerField()
+    status = models.CharField(max_length=8, default=PENDING)
+    # Counted by the worker before the first batch.
+    total_rows = models.PositiveIntegerField(null=True)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    finished_time = models.DateTimeField(null=True)
+
+    class Meta:
+        """Meta options."""
+        indexes = [
+            # Deletions left to resume.
+            models.Index(
+                fields=['created_time'], condition=~Q(status='done'), name='deletion_unfinished_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Represents the class objects as a string."""
+        return f'{self.model} {self.object_id} {self.status}'
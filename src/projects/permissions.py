@@ -1,11 +1,10 @@
 """Contains the permissions of projects app."""
 
 # rest_framework
-from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import BasePermission
 
-# models
-from projects.models import Project
+# membership
+from projects.membership import get_project_membership
 
 
 class IsAuthor(BasePermission):
@@ -18,11 +17,11 @@ class IsAuthor(BasePermission):
         """
         The instance must have an author attribute and be equal to the authenticated user.
         """
-        if request.method == 'GET' and request.user in obj.contributors.all():
+        if request.user.pk == obj.author_id:
             return True
-        if request.user.is_superuser:
+        if request.method == 'GET' and get_project_membership(request, obj.pk).is_contributor:
             return True
-        return request.user == obj.author
+        return request.user.is_superuser
 
 
 class IsAuthorOrContributor(BasePermission):
@@ -36,12 +35,12 @@ class IsAuthorOrContributor(BasePermission):
         """
         The instance must have an author attribute and be equal to the authenticated user.
         """
-        project = get_object_or_404(Project, pk=view.kwargs.get("id_project"))
-        if request.method == 'GET' and request.user in project.contributors.all():
+        membership = get_project_membership(request, view.kwargs.get("id_project"))
+        if request.method == 'GET' and membership.is_contributor:
             return True
         if request.user.is_superuser:
             return True
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
 
 class IsProjectAuthor(BasePermission):
@@ -54,12 +53,12 @@ class IsProjectAuthor(BasePermission):
         """
         The instance must have an author attribute and be equal to the authenticated user.
         """
-        project = get_object_or_404(Project, pk=view.kwargs.get("id_project"))
-        if request.method == 'GET' and request.user in project.contributors.all():
+        membership = get_project_membership(request, view.kwargs.get("id_project"))
+        if request.method == 'GET' and membership.is_contributor:
             return True
         if request.user.is_superuser:
             return True
-        return request.user == project.author
+        return membership.is_author
 
 
 class IsProjectContributor(BasePermission):
@@ -71,7 +70,4 @@ class IsProjectContributor(BasePermission):
         """
         The instance must have an author attribute and must contain the authenticated user.
         """
-        project = get_object_or_404(Project, pk=view.kwargs.get("id_project"))
-        if project.author == request.user:
-            return True
-        return request.user in project.contributors.all()
+        return get_project_membership(request, view.kwargs.get("id_project")).is_member
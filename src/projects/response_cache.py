@@ -0,0 +1,181 @@
+"""
+Contains the cache of the rendered project and issue lists.
+An entry holds the bytes of a response and the version it was built from: the version of the
+user for the project list, the version of the project for the issue list. A write bumps the
+versions of its project and of the members of the project once its transaction commits, the
+entries built from a former version are stale. Nothing else is invalidated and nothing is
+flushed.
+"""
+
+# lib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
+from threading import Lock
+from time import time
+from uuid import uuid4
+
+# django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+
+# models
+from projects.models import Project, Contributor
+
+
+class ResponseCache:
+    """
+    Cache of the list responses of the users, shared between the requests.
+    Uses the cache alias RESPONSE_CACHE_ALIAS, which must be shared by the processes, and keeps
+    the entries RESPONSE_CACHE_TIMEOUT seconds. A stale entry is served during the first
+    RESPONSE_CACHE_STALE_SECONDS after the write which made it stale, while a worker of the
+    revalidation pool renders the list again. The hits, stale hits and misses are counted per
+    list and per process.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(lambda: {'hits': 0, 'stale': 0, 'misses': 0})
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def cache(self):
+        """The cache backend storing the responses and the versions."""
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    @property
+    def executor(self):
+        """The executor with RESPONSE_CACHE_REVALIDATE_WORKERS threads."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.RESPONSE_CACHE_REVALIDATE_WORKERS,
+                        thread_name_prefix='response-cache',
+                    )
+        return self._executor
+
+    @staticmethod
+    def user_version_key(user_id):
+        """Cache key of the version of the projects of user_id."""
+        return f'response:user-version:{user_id}'
+
+    @staticmethod
+    def project_version_key(project_id):
+        """Cache key of the version of the issues of project_id."""
+        return f'response:project-version:{project_id}'
+
+    @staticmethod
+    def key(name, user_id, request):
+        """Cache key of the response of the list name to a request of user_id."""
+        variant = f'{request.get_full_path()}:{request.accepted_media_type}'
+        return f'response:{name}:{user_id}:{md5(variant.encode()).hexdigest()}'
+
+    @staticmethod
+    def new_version():
+        """Returns a version unique to a write, with the time of the write."""
+        return time(), uuid4().hex
+
+    def get(self, key, version_key):
+        """Returns the cached entry or None and the current version, created if missing."""
+        values = self.cache.get_many([key, version_key])
+        version = values.get(version_key)
+        if version is None:
+            self.cache.add(version_key, self.new_version(), None)
+            version = self.cache.get(version_key)
+        return values.get(key), version
+
+    def set(self, key, version, response):
+        """Caches the rendered response built from version."""
+        self.cache.set(key, {
+            'version': version,
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'headers': {
+                header: response[header] for header in ('ETag', 'Last-Modified')
+                if response.has_header(header)
+            },
+        }, settings.RESPONSE_CACHE_TIMEOUT)
+
+    @staticmethod
+    def is_servable_stale(version):
+        """The write which made an entry stale is recent enough to serve the entry."""
+        bumped_at, _ = version
+        return time() - bumped_at < settings.RESPONSE_CACHE_STALE_SECONDS
+
+    def revalidate(self, key, func):
+        """
+        Runs func in the revalidation pool unless the entry is already revalidated.
+        Without workers, func runs in the request thread.
+        """
+        lock_key = f'{key}:revalidating'
+        if not self.cache.add(lock_key, True, settings.RESPONSE_CACHE_STALE_SECONDS):
+            return
+        if not settings.RESPONSE_CACHE_REVALIDATE_WORKERS:
+            try:
+                func()
+            finally:
+                self.cache.delete(lock_key)
+            return
+        self.executor.submit(self.call, func, lock_key)
+
+    def call(self, func, lock_key):
+        """Runs func in a worker."""
+        close_old_connections()
+        try:
+            func()
+        finally:
+            self.cache.delete(lock_key)
+            close_old_connections()
+
+    def count(self, name, outcome):
+        """Counts a hit, a stale hit or a miss of the list name."""
+        with self._lock:
+            self.counters[name][outcome] += 1
+
+    def stats(self):
+        """Returns the counters of the process per list."""
+        stats = {}
+        for name, counters in self.counters.items():
+            total = sum(counters.values())
+            hits = counters['hits'] + counters['stale']
+            stats[name] = {**counters, 'hit_ratio': hits / total if total else None}
+        return stats
+
+    def bump(self, project_ids, user_ids):
+        """Bumps the versions of the projects and of the users."""
+        version = self.new_version()
+        self.cache.set_many({
+            **{self.project_version_key(pk): version for pk in project_ids},
+            **{self.user_version_key(pk): version for pk in user_ids},
+        }, None)
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_responses(projects, user_ids=()):
+    """
+    Makes stale, once the transaction commits, the issue lists of the projects queryset and the
+    project lists of their members and of user_ids. The members are read in a single query.
+    The versions bumped before the commit would be read again by the requests still seeing
+    the former rows.
+    """
+    if not settings.RESPONSE_CACHE_TIMEOUT:
+        return
+    rows = projects.order_by().values_list('pk', 'author_id').union(
+        Contributor.objects.filter(project__in=projects.order_by().values('pk'))
+        .order_by().values_list('project_id', 'user_id')
+    )
+    project_ids, users = set(), set(user_ids)
+    for project_id, user_id in rows:
+        project_ids.add(project_id)
+        users.add(user_id)
+    if project_ids or users:
+        transaction.on_commit(lambda: response_cache.bump(project_ids, users))
+
+
+def invalidate_project_responses(project_ids, user_ids=()):
+    """Makes stale the responses of the projects of project_ids and of user_ids."""
+    invalidate_responses(Project.objects.filter(pk__in=project_ids), user_ids)
@@ -0,0 +1,342 @@
+"""
+Contains the full-text search of the issues and comments.
+The backends share the same ranked results: SQLite FTS5 virtual tables maintained by the signals
+of projects app, a PostgreSQL GIN index on a tsvector expression maintained by the database,
+and the LIKE scan used as a baseline. The index is created by the migration of the vendor.
+"""
+
+# lib
+import re
+
+# django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# models
+from projects.models import Issue, Comment
+
+# Columns of a search result.
+COLUMNS = ('kind', 'id', 'project', 'issue', 'title', 'snippet', 'rank')
+MAX_TERMS = 10
+
+
+def parse_terms(query):
+    """Returns the words of a search query, the punctuation and operators are ignored."""
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+class SearchResults:
+    """
+    Lazy ranked results of a search, counted and sliced like a queryset by the pagination.
+    """
+
+    def __init__(self, backend, terms, projects):
+        self.backend = backend
+        self.terms = terms
+        self.projects = projects
+        self._count = None
+
+    def count(self):
+        """Number of matching issues and comments."""
+        if self._count is None:
+            sql, params = self.backend.union_sql(self.terms, self.projects)
+            self._count = self.backend.fetch(
+                f'SELECT COUNT(*) FROM ({sql}) AS hits', params
+            )[0][0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None or item.stop is None:
+            raise TypeError("The search results are only sliced by pages.")
+        start = item.start or 0
+        sql, params = self.backend.union_sql(self.terms, self.projects)
+        rows = self.backend.fetch(
+            f'{sql} ORDER BY rank, kind, id LIMIT %s OFFSET %s',
+            [*params, max(item.stop - start, 0), start]
+        )
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+class SearchBackend:
+    """
+    Base of the search backends. A backend returns the clauses matching the terms in the issues
+    and the comments, the project filter, the union and the ordering are shared.
+    """
+    issue_table = Issue._meta.db_table
+    comment_table = Comment._meta.db_table
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        """The connection of the database searched."""
+        return connections[self.using]
+
+    def fetch(self, sql, params):
+        """Runs a query and returns its rows."""
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def search(self, query, projects):
+        """Returns the issues and comments of the projects queryset matching the query."""
+        return SearchResults(self, parse_terms(query), projects)
+
+    def union_sql(self, terms, projects):
+        """Returns the SQL and the parameters of the issues and comments matching the terms."""
+        projects_sql, projects_params = projects.order_by().values('pk').query.sql_with_params()
+        issue = self.issue_clauses(terms)
+        comment = self.comment_clauses(terms)
+        sql = (
+            f"SELECT 'issue' AS kind, i.id AS id, i.project_id AS project, i.id AS issue, "
+            f"i.title AS title, {issue['snippet']} AS snippet, {issue['rank']} AS rank "
+            f"FROM {issue['source']} "
+            f"WHERE {issue['match']} AND i.project_id IN ({projects_sql}) "
+            f"UNION ALL "
+            f"SELECT 'comment', c.id, i.project_id, i.id, i.title, {comment['snippet']}, "
+            f"{comment['rank']} "
+            f"FROM {comment['source']} JOIN {self.issue_table} i ON i.id = c.issue_id "
+            f"WHERE {comment['match']} AND i.project_id IN ({projects_sql})"
+        )
+        params = [
+            *issue['params'], *projects_params, *comment['params'], *projects_params
+        ]
+        return sql, params
+
+    def issue_clauses(self, terms):
+        """
+        Returns the source, match, snippet and rank clauses of the issues aliased as i. Only
+        the source and the match take parameters, in this order. A lower rank is better.
+        """
+        raise NotImplementedError
+
+    def comment_clauses(self, terms):
+        """Returns the clauses of the comments aliased as c."""
+        raise NotImplementedError
+
+    def index(self, model, instances, created=False):
+        """Adds or replaces the instances in the index."""
+
+    def unindex(self, model, pks):
+        """Removes the instances from the index."""
+
+    @classmethod
+    def create_index(cls, schema_editor):
+        """Creates the index and fills it."""
+
+    @classmethod
+    def drop_index(cls, schema_editor):
+        """Drops the index."""
+
+    def rebuild(self):
+        """Fills the index again from the tables."""
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Case-insensitive LIKE scan of the titles and descriptions, every term must match.
+    Requires no index, the results are not ranked.
+    """
+
+    def like_clauses(self, columns, terms):
+        """Returns the clause matching every term in one of the columns and its parameters."""
+        operator = self.connection.operators['icontains'] % '%s'
+        cast = self.connection.ops.lookup_cast('icontains')
+        clauses = []
+        params = []
+        for term in terms:
+            clauses.append('(' + ' OR '.join(
+                f'{cast % column} {operator}' for column in columns
+            ) + ')')
+            params += [f'%{self.connection.ops.prep_for_like_query(term)}%'] * len(columns)
+        return ' AND '.join(clauses) or '1 = 0', params
+
+    def issue_clauses(self, terms):
+        match, params = self.like_clauses(('i.title', 'i.description'), terms)
+        return {
+            'source': f'{self.issue_table} i', 'match': match, 'params': params,
+            'snippet': 'SUBSTR(i.description, 1, 100)', 'rank': '0.0',
+        }
+
+    def comment_clauses(self, terms):
+        match, params = self.like_clauses(('c.description',), terms)
+        return {
+            'source': f'{self.comment_table} c', 'match': match, 'params': params,
+            'snippet': 'SUBSTR(c.description, 1, 100)', 'rank': '0.0',
+        }
+
+
+class FTS5SearchBackend(SearchBackend):
+    """
+    SQLite FTS5 virtual tables keyed by the id of the issues and comments, ranked by bm25.
+    The title of an issue weighs ten times its description. The last term matches prefixes.
+    """
+    issue_index = f'{Issue._meta.db_table}_fts'
+    comment_index = f'{Comment._meta.db_table}_fts'
+    tokenizer = 'unicode61 remove_diacritics 2'
+    snippet = "snippet({table}, -1, '<mark>', '</mark>', '…', 12)"
+
+    @classmethod
+    def indexes(cls):
+        """Index table, indexed columns and source table by model."""
+        return {
+            Issue: (cls.issue_index, ('title', 'description'), cls.issue_table),
+            Comment: (cls.comment_index, ('description',), cls.comment_table),
+        }
+
+    @staticmethod
+    def match_query(terms):
+        """Returns the terms quoted as FTS5 strings, the operators of the query are ignored."""
+        quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        if quoted:
+            quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def issue_clauses(self, terms):
+        table = self.issue_index
+        return {
+            'source': f'{table} JOIN {self.issue_table} i ON i.id = {table}.rowid',
+            'match': f'{table} MATCH %s', 'params': [self.match_query(terms)],
+            'snippet': self.snippet.format(table=table), 'rank': f'bm25({table}, 10.0, 1.0)',
+        }
+
+    def comment_clauses(self, terms):
+        table = self.comment_index
+        return {
+            'source': f'{table} JOIN {self.comment_table} c ON c.id = {table}.rowid',
+            'match': f'{table} MATCH %s', 'params': [self.match_query(terms)],
+            'snippet': self.snippet.format(table=table), 'rank': f'bm25({table})',
+        }
+
+    def index(self, model, instances, created=False):
+        table, columns, _ = self.indexes()[model]
+        if not created:
+            self.unindex(model, [instance.pk for instance in instances])
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES ({placeholders})",
+                [
+                    (instance.pk, *(getattr(instance, column) for column in columns))
+                    for instance in instances
+                ]
+            )
+
+    def unindex(self, model, pks):
+        table, _, _ = self.indexes()[model]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    @classmethod
+    def fill_sql(cls, model):
+        """Returns the statement copying the rows of a model into its index."""
+        table, columns, source = cls.indexes()[model]
+        return (
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) "
+            f"SELECT id, {', '.join(columns)} FROM {source}"
+        )
+
+    @classmethod
+    def create_index(cls, schema_editor):
+        for model, (table, columns, _) in cls.indexes().items():
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {table} USING fts5({', '.join(columns)}, "
+                f"tokenize='{cls.tokenizer}')"
+            )
+            schema_editor.execute(cls.fill_sql(model))
+
+    @classmethod
+    def drop_index(cls, schema_editor):
+        for table, _, _ in cls.indexes().values():
+            schema_editor.execute(f'DROP TABLE {table}')
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            for model, (table, _, _) in self.indexes().items():
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(self.fill_sql(model))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL full-text search on GIN indexes of the tsvector of the titles and descriptions,
+    ranked by ts_rank. The text search configuration is SEARCH_CONFIG.
+    """
+    headline = "'StartSel=<mark>, StopSel=</mark>, MaxWords=12, MinWords=4'"
+
+    @staticmethod
+    def config():
+        """The text search configuration as a SQL literal, identical in the indexes."""
+        if not re.fullmatch(r'\w+', settings.SEARCH_CONFIG):
+            raise ValueError(f"Invalid SEARCH_CONFIG {settings.SEARCH_CONFIG!r}.")
+        return f"'{settings.SEARCH_CONFIG}'::regconfig"
+
+    @classmethod
+    def vectors(cls):
+        """Indexed tsvector expression of the issues and comments."""
+        return {
+            Issue: f"to_tsvector({cls.config()}, title || ' ' || description)",
+            Comment: f"to_tsvector({cls.config()}, description)",
+        }
+
+    def clauses(self, model, alias, snippet_column, terms):
+        """Returns the clauses of a model, the columns of the vector are prefixed by alias."""
+        vector = re.sub(r'\b(title|description)\b', rf'{alias}.\1', self.vectors()[model])
+        return {
+            'source': (
+                f"{model._meta.db_table} {alias} "
+                f"CROSS JOIN plainto_tsquery({self.config()}, %s) AS query"
+            ),
+            'match': f'{vector} @@ query', 'params': [' '.join(terms)],
+            'snippet': (
+                f"ts_headline({self.config()}, {alias}.{snippet_column}, query, {self.headline})"
+            ),
+            'rank': f'-ts_rank({vector}, query)',
+        }
+
+    def issue_clauses(self, terms):
+        return self.clauses(Issue, 'i', 'description', terms)
+
+    def comment_clauses(self, terms):
+        return self.clauses(Comment, 'c', 'description', terms)
+
+    @classmethod
+    def create_index(cls, schema_editor):
+        for model, vector in cls.vectors().items():
+            table = model._meta.db_table
+            schema_editor.execute(
+                f'CREATE INDEX {table}_search_idx ON {table} USING GIN (({vector}))'
+            )
+
+    @classmethod
+    def drop_index(cls, schema_editor):
+        for model in cls.vectors():
+            schema_editor.execute(f'DROP INDEX {model._meta.db_table}_search_idx')
+
+
+BACKENDS = {
+    'like': LikeSearchBackend,
+    'fts5': FTS5SearchBackend,
+    'postgres': PostgresSearchBackend,
+}
+# Backend created by the migrations for each database vendor.
+VENDOR_BACKENDS = {
+    'sqlite': FTS5SearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Returns the search backend of a database: SEARCH_BACKEND if set, else the backend of its
+    vendor, else the LIKE scan.
+    """
+    if settings.SEARCH_BACKEND:
+        backend_class = BACKENDS[settings.SEARCH_BACKEND]
+    else:
+        backend_class = VENDOR_BACKENDS.get(connections[using].vendor, LikeSearchBackend)
+    return backend_class(using)
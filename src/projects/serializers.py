@@ -1,21 +1,106 @@
 """Contains the serializers of projects app."""
 
+# django
+from django.db.models import Prefetch
+
 # rest_framework
 from rest_framework import serializers
 
+# instrumentation
+from SoftDesk.instrumentation import TimedSerializerMixin
+
 # accounts serializers
 from accounts.serializers import CustomUserSerializer
 
 # models
-from projects.models import Project, Issue, Comment, Contributor
+from projects.models import Project, Issue, Comment, Contributor, Deletion
+
+
+def split_query_param(request, name):
+    """Returns the comma separated values of a query parameter of a GET request, or None."""
+    if request is None or request.method != 'GET' or name not in request.query_params:
+        return None
+    return [value.strip() for value in request.query_params[name].split(',') if value.strip()]
+
+
+class DynamicFieldsModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    ModelSerializer pruned by the ?fields= query parameter and extended by the ?expand=
+    query parameter of GET requests. The expansions of the nested serializers are dotted,
+    e.g. ?expand=issues.comments.
+    Only the serializer of the response reads the query parameters.
+    """
+    # field name: (serializer class, keyword arguments), serialized on demand only.
+    expandable_fields = {}
+    # field name: lookup, loaded with select_related when the field is serialized.
+    select_related_fields = {}
+    # field name: lookup, loaded with prefetch_related when the field is serialized.
+    prefetch_related_fields = {}
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if fields is None and expand is None:
+            fields = split_query_param(request, 'fields')
+            expand = split_query_param(request, 'expand')
+        for name, nested_expand in self.get_expansions(expand).items():
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(expand=nested_expand, **options)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-class ContributorSerializer(serializers.ModelSerializer):
+    @classmethod
+    def get_expansions(cls, expand):
+        """Returns the expanded field names with the expansions of their serializer."""
+        expansions = {}
+        for value in expand or ():
+            name, _, nested = value.partition('.')
+            if name in cls.expandable_fields:
+                expansions.setdefault(name, [])
+                if nested:
+                    expansions[name].append(nested)
+        return expansions
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=None):
+        """
+        Returns the queryset loading the relations which are serialized, and only those.
+        """
+        expansions = cls.get_expansions(expand)
+        names = set(cls.Meta.fields) | set(expansions)
+        if fields is not None:
+            names &= set(fields)
+        for name in names:
+            if name in cls.select_related_fields:
+                queryset = queryset.select_related(cls.select_related_fields[name])
+            if name in cls.prefetch_related_fields:
+                queryset = queryset.prefetch_related(cls.prefetch_related_fields[name])
+            if name in expansions:
+                serializer_class, options = cls.expandable_fields[name]
+                nested_queryset = serializer_class.setup_eager_loading(
+                    serializer_class.Meta.model.objects.all(), expand=expansions[name]
+                )
+                queryset = queryset.prefetch_related(
+                    Prefetch(options.get('source', name), queryset=nested_queryset)
+                )
+        return queryset
+
+    @classmethod
+    def eager_load(cls, queryset, request):
+        """Returns the queryset loading the relations serialized for request."""
+        return cls.setup_eager_loading(
+            queryset, split_query_param(request, 'fields'), split_query_param(request, 'expand')
+        )
+
+
+class ContributorSerializer(DynamicFieldsModelSerializer):
     """
     Allows to serialize or deserialize the contributor according
     to the verb of the request.
     """
     user = CustomUserSerializer(read_only=True)
+    select_related_fields = {'user': 'user'}
 
     class Meta:
         """Meta options."""
@@ -23,49 +108,106 @@ class ContributorSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'role')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsModelSerializer):
     """
     Allows to serialize or deserialize the comment according
     to the verb of the request.
     """
     author = CustomUserSerializer(read_only=True)
+    select_related_fields = {'author': 'author'}
 
     class Meta:
         """Meta options."""
         model = Comment
-        fields = ('id', 'description', 'author', 'created_time')
+        fields = ('id', 'description', 'author', 'created_time', 'updated_time')
 
 
-class IssueSerializer(serializers.ModelSerializer):
+class IssueSerializer(DynamicFieldsModelSerializer):
     """
     Allows to serialize or deserialize the issue according
     to the verb of the request.
+    The comments are serialized with ?expand=comments.
     """
-    comments = CommentSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     assignee = CustomUserSerializer(read_only=True)
+    expandable_fields = {
+        'comments': (CommentSerializer, {'source': 'comment', 'many': True, 'read_only': True}),
+    }
+    select_related_fields = {'author': 'author', 'assignee': 'assignee'}
 
     class Meta:
         """Meta options."""
         model = Issue
         fields = ('id', 'title', 'description', 'tag', 'priority', 'status', "created_time",
-                  'author', 'assignee', 'comments')
+                  'updated_time', 'author', 'assignee', 'comment_count')
+
+
+class IssueBulkUpdateSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Allows to deserialize the status and priority changes of a batch of issues.
+    """
+    id = serializers.IntegerField()
+    status = serializers.CharField(max_length=128, required=False)
+    priority = serializers.CharField(max_length=128, required=False)
+
+    def create(self, validated_data):
+        pass
 
+    def update(self, instance, validated_data):
+        pass
 
-class ProjectSerializer(serializers.ModelSerializer):
+
+class ProjectSerializer(DynamicFieldsModelSerializer):
     """
     Allows to serialize or deserialize the project according
     to the verb of the request.
+    The issues are serialized with ?expand=issues, and their comments with
+    ?expand=issues.comments.
     """
-    issues = IssueSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
     contributors = CustomUserSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
+    expandable_fields = {
+        'issues': (IssueSerializer, {'source': 'issue', 'many': True, 'read_only': True}),
+    }
+    select_related_fields = {'author': 'author'}
+    prefetch_related_fields = {'contributors': 'contributors'}
 
     class Meta:
         """Meta options."""
         model = Project
         fields = (
-            'id', 'title', 'description', 'type', 'author',
-            'contributors', 'issues', 'comments', 'created_time',
+            'id', 'title', 'description', 'type', 'author', 'contributors', 'created_time',
+            'updated_time', 'issue_count', 'comment_count', 'contributor_count',
         )
+
+
+class SearchResultSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Allows to serialize a search result, an issue or a comment with its issue.
+    The snippet surrounds the matching terms with <mark> tags.
+    """
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    project = serializers.IntegerField()
+    issue = serializers.IntegerField()
+    title = serializers.CharField()
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
+
+    def create(self, validated_data):
+        pass
+
+    def update(self, instance, validated_data):
+        pass
+
+
+class DeletionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Allows to serialize the progress of the background deletion of a project or a user.
+    """
+
+    class Meta:
+        """Meta options."""
+        model = Deletion
+        fields = ('id', 'model', 'object_id', 'status', 'total_rows', 'deleted_rows',
+                  'created_time', 'updated_time', 'finished_time')
@@ -0,0 +1,409 @@
+"""Contains the signal receivers of projects app."""
+
+# lib
+from collections import Counter
+
+# django
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+
+# events
+from projects.events import publish_event
+
+# membership
+from projects.membership import membership_cache
+
+# models
+from projects.models import Project, Contributor, Issue, Comment, ChangeLog
+
+# response cache
+from projects.response_cache import invalidate_responses, invalidate_project_responses
+
+# search
+from projects.search import get_search_backend
+
+# sync
+from projects.sync import log_changes
+
+# Sent with the instances created or updated by bulk_create and bulk_update,
+# which do not send post_save.
+post_bulk_create = Signal()
+post_bulk_update = Signal()
+# Sent with the instances deleted by batches by projects.deletion, which does not send
+# post_delete, and with the projects hidden before their deletion.
+post_bulk_delete = Signal()
+post_soft_delete = Signal()
+
+# Fields of the issues and comments in the search index.
+SEARCHED_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def invalidate_contributor_membership(sender, instance, **kwargs):
+    """A contributor was added to or removed from a project."""
+    membership_cache.invalidate(instance.project_id)
+
+
+def add_to_counters(queryset, **deltas):
+    """
+    Adds the deltas to the counter fields of the rows of the queryset in a single UPDATE.
+    The counters are part of the representation of the rows, their update time is bumped.
+    """
+    changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    queryset.update(updated_time=timezone.now(), **changes)
+
+
+@receiver(post_save, sender=Contributor)
+def count_saved_contributor(sender, instance, created, **kwargs):
+    """The contributors are part of the project representation, its update time is bumped."""
+    add_to_counters(
+        Project.objects.filter(pk=instance.project_id), contributor_count=1 if created else 0
+    )
+
+
+@receiver(post_delete, sender=Contributor)
+def count_deleted_contributor(sender, instance, **kwargs):
+    """A contributor was removed from a project."""
+    add_to_counters(Project.objects.filter(pk=instance.project_id), contributor_count=-1)
+
+
+@receiver(post_save, sender=Issue)
+def count_created_issue(sender, instance, created, **kwargs):
+    """An issue was added to a project."""
+    if created:
+        add_to_counters(Project.objects.filter(pk=instance.project_id), issue_count=1)
+
+
+@receiver(post_delete, sender=Issue)
+def count_deleted_issue(sender, instance, **kwargs):
+    """
+    An issue was removed from a project.
+    Its comments are deleted and counted before it by the cascade.
+    """
+    add_to_counters(Project.objects.filter(pk=instance.project_id), issue_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    """A comment was added to an issue."""
+    if created:
+        add_to_counters(Issue.objects.filter(pk=instance.issue_id), comment_count=1)
+        add_to_counters(Project.objects.filter(issue=instance.issue_id), comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """A comment was removed from an issue."""
+    add_to_counters(Issue.objects.filter(pk=instance.issue_id), comment_count=-1)
+    add_to_counters(Project.objects.filter(issue=instance.issue_id), comment_count=-1)
+
+
+def count_bulk_rows(sender, instances, sign):
+    """Counts a batch of created or deleted rows with one UPDATE per parent row."""
+    if sender is Comment:
+        per_issue = Counter(instance.issue_id for instance in instances)
+        for issue_id, count in per_issue.items():
+            add_to_counters(Issue.objects.filter(pk=issue_id), comment_count=sign * count)
+        issue_projects = Issue.objects.filter(pk__in=per_issue).values_list('pk', 'project_id')
+        per_project = Counter()
+        for issue_id, project_id in issue_projects:
+            per_project[project_id] += per_issue[issue_id]
+        counter = 'comment_count'
+    else:
+        per_project = Counter(instance.project_id for instance in instances)
+        counter = 'issue_count' if sender is Issue else 'contributor_count'
+    for project_id, count in per_project.items():
+        add_to_counters(Project.objects.filter(pk=project_id), **{counter: sign * count})
+
+
+@receiver(post_bulk_create, sender=Contributor)
+@receiver(post_bulk_create, sender=Issue)
+@receiver(post_bulk_create, sender=Comment)
+def count_bulk_created(sender, instances, **kwargs):
+    """Counts a batch of created rows."""
+    count_bulk_rows(sender, instances, 1)
+
+
+@receiver(post_bulk_delete, sender=Contributor)
+@receiver(post_bulk_delete, sender=Issue)
+@receiver(post_bulk_delete, sender=Comment)
+def count_bulk_deleted(sender, instances, **kwargs):
+    """
+    Counts a batch of deleted rows, the comments are deleted before their issue.
+    """
+    count_bulk_rows(sender, instances, -1)
+
+
+@receiver(post_bulk_delete, sender=Contributor)
+def invalidate_bulk_deleted_memberships(sender, instances, **kwargs):
+    """A batch of contributors was removed from their projects."""
+    for project_id in {instance.project_id for instance in instances}:
+        membership_cache.invalidate(project_id)
+
+
+@receiver(pre_save, sender=Project)
+def invalidate_author_membership(sender, instance, **kwargs):
+    """
+    The author of a project changed, the former and the new author lose their cached role and
+    their access to the project changes for the sync.
+    """
+    if instance.pk is None:
+        return
+    former_author_id = Project.objects.filter(pk=instance.pk) \
+        .values_list('author_id', flat=True).first()
+    if former_author_id is not None and former_author_id != instance.author_id:
+        membership_cache.invalidate(instance.pk)
+        invalidate_project_responses([instance.pk], [former_author_id])
+        log_changes(Project, [
+            (instance.pk, instance.pk, former_author_id),
+            (instance.pk, instance.pk, instance.author_id),
+        ], ChangeLog.UPDATED, kwargs['using'])
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_deleted_project_membership(sender, instance, **kwargs):
+    """The members of a deleted project lose their cached role."""
+    membership_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+def index_saved_text(sender, instance, created, using, update_fields=None, **kwargs):
+    """The text of the issue or comment is added to the search index or replaced."""
+    if update_fields is None or SEARCHED_FIELDS & set(update_fields):
+        get_search_backend(using).index(sender, [instance], created)
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_text(sender, instance, using, **kwargs):
+    """The issue or comment is removed from the search index."""
+    get_search_backend(using).unindex(sender, [instance.pk])
+
+
+@receiver(post_bulk_create, sender=Issue)
+@receiver(post_bulk_create, sender=Comment)
+def index_bulk_created_text(sender, instances, **kwargs):
+    """A batch of issues or comments is added to the search index."""
+    if instances:
+        get_search_backend(instances[0]._state.db).index(sender, instances, created=True)
+
+
+@receiver(post_bulk_delete, sender=Issue)
+@receiver(post_bulk_delete, sender=Comment)
+def unindex_bulk_deleted_text(sender, instances, **kwargs):
+    """A batch of issues or comments is removed from the search index."""
+    if instances:
+        get_search_backend(instances[0]._state.db).unindex(
+            sender, [instance.pk for instance in instances]
+        )
+
+
+@receiver(post_bulk_update, sender=Issue)
+def index_bulk_updated_text(sender, instances, fields, **kwargs):
+    """A batch of issues is replaced in the search index if their text changed."""
+    if instances and SEARCHED_FIELDS & set(fields):
+        get_search_backend(instances[0]._state.db).index(sender, instances)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_list_responses(sender, instance, **kwargs):
+    """The project is in the project lists of its members, and of its author once deleted."""
+    invalidate_project_responses([instance.pk], [instance.author_id])
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Issue)
+def invalidate_project_child_responses(sender, instance, **kwargs):
+    """
+    The contributors and issues are serialized or counted in the project lists, and the issues
+    in the issue list of their project. A removed contributor is invalidated too.
+    """
+    user_ids = [instance.user_id] if sender is Contributor else []
+    invalidate_project_responses([instance.project_id], user_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    """The comments are counted in the project and issue lists, and expanded in the latter."""
+    invalidate_responses(Project.objects.filter(issue=instance.issue_id))
+
+
+@receiver(post_bulk_create, sender=Contributor)
+@receiver(post_bulk_create, sender=Issue)
+@receiver(post_bulk_update, sender=Issue)
+@receiver(post_bulk_create, sender=Comment)
+@receiver(post_bulk_delete, sender=Contributor)
+@receiver(post_bulk_delete, sender=Issue)
+@receiver(post_bulk_delete, sender=Comment)
+def invalidate_bulk_responses(sender, instances, **kwargs):
+    """A batch of rows invalidates the responses of their projects once."""
+    if sender is Comment:
+        invalidate_responses(Project.objects.filter(
+            issue__in=[instance.issue_id for instance in instances]
+        ))
+    else:
+        invalidate_project_responses({instance.project_id for instance in instances})
+
+
+def comment_project_ids(comments):
+    """Returns the project id of the issue of each comment, by issue id."""
+    project_ids = {
+        comment.issue_id: comment.issue.project_id for comment in comments
+        if Comment.issue.is_cached(comment)
+    }
+    missing = {comment.issue_id for comment in comments} - set(project_ids)
+    if missing:
+        project_ids.update(Issue.objects.filter(pk__in=missing).values_list('pk', 'project_id'))
+    return project_ids
+
+
+def row_project_ids(sender, instances):
+    """Returns the project id of each row."""
+    if sender is Comment:
+        project_ids = comment_project_ids(instances)
+        return [project_ids.get(instance.issue_id) for instance in instances]
+    return [instance.project_id for instance in instances]
+
+
+def publish_row_events(sender, instances, action):
+    """Publishes an event per row to the streams of its project."""
+    for instance, project_id in zip(instances, row_project_ids(sender, instances)):
+        publish_event(project_id, f'{sender._meta.model_name}.{action}', instance)
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+def publish_saved_row(sender, instance, created, **kwargs):
+    """A row of a project was created or updated."""
+    publish_row_events(sender, [instance], 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Contributor)
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def publish_deleted_row(sender, instance, **kwargs):
+    """A row of a project was deleted, the issue of a comment still exists in a cascade."""
+    publish_row_events(sender, [instance], 'deleted')
+
+
+@receiver(post_bulk_create, sender=Contributor)
+@receiver(post_bulk_create, sender=Issue)
+@receiver(post_bulk_create, sender=Comment)
+def publish_bulk_created_rows(sender, instances, **kwargs):
+    """A batch of rows was created."""
+    publish_row_events(sender, instances, 'created')
+
+
+@receiver(post_bulk_update, sender=Issue)
+def publish_bulk_updated_rows(sender, instances, **kwargs):
+    """A batch of issues was updated."""
+    publish_row_events(sender, instances, 'updated')
+
+
+@receiver(post_bulk_delete, sender=Contributor)
+@receiver(post_bulk_delete, sender=Issue)
+@receiver(post_bulk_delete, sender=Comment)
+def publish_bulk_deleted_rows(sender, instances, **kwargs):
+    """A batch of rows was deleted."""
+    publish_row_events(sender, instances, 'deleted')
+
+
+@receiver(post_delete, sender=Project)
+def publish_deleted_project(sender, instance, **kwargs):
+    """The streams of a deleted project are closed."""
+    publish_event(instance.pk, 'project.deleted', id=instance.pk)
+
+
+def log_row_changes(sender, instances, action):
+    """
+    Logs the change of each row for the sync. A contributor added or removed changes the access
+    of its user to the project.
+    """
+    if not instances:
+        return
+    with_access = sender is Contributor and action != ChangeLog.UPDATED
+    log_changes(sender, [
+        (project_id, instance.pk, instance.user_id if with_access else None)
+        for instance, project_id in zip(instances, row_project_ids(sender, instances))
+    ], action, instances[0]._state.db)
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+def log_saved_row(sender, instance, created, **kwargs):
+    """A row of a project was created or updated."""
+    log_row_changes(sender, [instance], ChangeLog.CREATED if created else ChangeLog.UPDATED)
+
+
+@receiver(post_delete, sender=Contributor)
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def log_deleted_row(sender, instance, **kwargs):
+    """A row of a project was deleted, the tombstone keeps its id."""
+    log_row_changes(sender, [instance], ChangeLog.DELETED)
+
+
+@receiver(post_bulk_create, sender=Contributor)
+@receiver(post_bulk_create, sender=Issue)
+@receiver(post_bulk_create, sender=Comment)
+def log_bulk_created_rows(sender, instances, **kwargs):
+    """A batch of rows was created, logged with a single INSERT."""
+    log_row_changes(sender, instances, ChangeLog.CREATED)
+
+
+@receiver(post_bulk_update, sender=Issue)
+def log_bulk_updated_rows(sender, instances, **kwargs):
+    """A batch of issues was updated."""
+    log_row_changes(sender, instances, ChangeLog.UPDATED)
+
+
+@receiver(post_bulk_delete, sender=Contributor)
+@receiver(post_bulk_delete, sender=Issue)
+@receiver(post_bulk_delete, sender=Comment)
+def log_bulk_deleted_rows(sender, instances, **kwargs):
+    """A batch of rows was deleted."""
+    log_row_changes(sender, instances, ChangeLog.DELETED)
+
+
+@receiver(post_save, sender=Project)
+def log_saved_project(sender, instance, created, using, **kwargs):
+    """A project was created or updated."""
+    action = ChangeLog.CREATED if created else ChangeLog.UPDATED
+    log_changes(Project, [(instance.pk, instance.pk, None)], action, using)
+
+
+@receiver(post_delete, sender=Project)
+def log_deleted_project(sender, instance, using, **kwargs):
+    """A project was deleted, its author loses access to it like its removed contributors."""
+    log_changes(Project, [(instance.pk, instance.pk, instance.author_id)], ChangeLog.DELETED, using)
+
+
+@receiver(post_soft_delete, sender=Project)
+def hide_deleted_projects(sender, instances, **kwargs):
+    """
+    The projects are hidden before their rows are deleted: their members lose their cached role
+    and their lists, their streams are closed and the sync sends their tombstones to each member.
+    Their rows are then deleted without signals.
+    """
+    members = {(instance.pk, instance.author_id) for instance in instances}
+    members.update(Contributor.objects.filter(project__in=instances)
+                   .values_list('project_id', 'user_id'))
+    invalidate_project_responses(
+        [instance.pk for instance in instances], [user_id for _, user_id in members]
+    )
+    for instance in instances:
+        membership_cache.invalidate(instance.pk)
+        publish_event(instance.pk, 'project.deleted', id=instance.pk)
+    log_changes(Project, [
+        (project_id, project_id, user_id) for project_id, user_id in sorted(members)
+    ], ChangeLog.DELETED)
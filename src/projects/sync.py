@@ -0,0 +1,147 @@
+"""
+Contains the incremental sync of the projects of a user.
+The signals of projects app write a ChangeLog entry per created, updated or deleted project,
+contributor, issue and comment, in the transaction of the change. A client sends back the token
+of its last sync and receives the rows changed since, read by their primary key, and the ids of
+the deleted ones: the cost of a sync follows the number of changes, not the size of the projects.
+The entries of a contributor added or removed, or of a project deleted or given to another
+author, also carry the user whose access changed: a client is told to load the projects it
+joined and to drop the projects it left.
+"""
+
+# lib
+from collections import defaultdict
+from datetime import timedelta
+
+# django
+from django.conf import settings
+from django.utils import timezone
+
+# rest_framework
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# models
+from projects.models import Project, Contributor, Issue, Comment, ChangeLog
+
+# Fields of the rows sent by the sync, the related rows are sent by id.
+SYNC_FIELDS = {
+    Project: ('id', 'title', 'description', 'type', 'author_id', 'issue_count', 'comment_count',
+              'contributor_count', 'created_time', 'updated_time'),
+    Contributor: ('id', 'project_id', 'user_id', 'role'),
+    Issue: ('id', 'project_id', 'title', 'description', 'tag', 'priority', 'status', 'author_id',
+            'assignee_id', 'comment_count', 'created_time', 'updated_time'),
+    Comment: ('id', 'issue_id', 'description', 'author_id', 'created_time', 'updated_time'),
+}
+
+
+class ExpiredToken(APIException):
+    """The changes after the token are no longer logged, the client loads its projects again."""
+    status_code = status.HTTP_410_GONE
+    default_detail = "The changes since this token are no longer available, sync from scratch."
+    default_code = 'expired_token'
+
+
+def log_changes(model, rows, action, using='default'):
+    """
+    Writes an entry per row in a single INSERT. rows are (project_id, object_id, user_id)
+    tuples, user_id is the user whose access to the project changed or None.
+    """
+    ChangeLog.objects.using(using).bulk_create([
+        ChangeLog(
+            project_id=project_id, model=model._meta.model_name, object_id=object_id,
+            action=action, user_id=user_id,
+        )
+        for project_id, object_id, user_id in rows
+    ], batch_size=settings.BULK_BATCH_SIZE)
+
+
+def current_token():
+    """
+    Returns the token of the last change logged. With SYNC_SETTLE_SECONDS, the changes of the
+    last seconds are left to the next sync, in case an older one is not committed yet.
+    """
+    entries = ChangeLog.objects.order_by('-id')
+    if settings.SYNC_SETTLE_SECONDS:
+        cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+        entries = entries.filter(created_time__lte=cutoff)
+    return entries.values_list('id', flat=True).first() or 0
+
+
+def parse_token(token):
+    """Returns the change log id of a token, or None."""
+    return int(token) if token is not None and token.isdigit() else None
+
+
+def check_token(since):
+    """
+    Raises ExpiredToken if entries after since were pruned, or if since is ahead of the log,
+    for instance after the restoration of a backup.
+    """
+    bounds = ChangeLog.objects.order_by('id').values_list('id', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        if since:
+            raise ExpiredToken()
+    elif since < first - 1 or since > last:
+        raise ExpiredToken()
+
+
+def changes_since(user, since, limit):
+    """
+    Returns the changes of the projects of the user after the token since, at most limit
+    entries. The rows created or updated are read at their current state, a row changed
+    several times is sent once.
+    """
+    check_token(since)
+    until = current_token()
+    member_of = set(Project.objects.for_user(user).values_list('pk', flat=True))
+    # The two branches each follow an index, the entries of the other projects are not read.
+    entries = ChangeLog.objects.filter(id__gt=since, id__lte=until).order_by('id') \
+        .values_list('id', 'project_id', 'model', 'object_id', 'action', 'user_id')
+    project_entries = entries.filter(project_id__in=Project.objects.for_user(user).values('pk'))
+    access_entries = entries.filter(user_id=user.pk)
+    rows = sorted(
+        set(project_entries[:limit + 1]) | set(access_entries[:limit + 1])
+    )[:limit + 1]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Last action per row, the entries are ordered.
+    actions = {}
+    changed_projects = set()
+    joined, left = set(), set()
+    for _, project_id, model, object_id, action, user_id in rows:
+        if user_id == user.pk:
+            if project_id not in member_of:
+                left.add(project_id)
+                continue
+            if action != ChangeLog.DELETED:
+                joined.add(project_id)
+        if project_id in member_of:
+            actions[model, object_id] = action
+            changed_projects.add(project_id)
+
+    upserted, deleted = defaultdict(set), defaultdict(set)
+    for (model, object_id), action in actions.items():
+        (deleted if action == ChangeLog.DELETED else upserted)[model].add(object_id)
+    # The counters and update time of a project change with its rows.
+    upserted['project'] |= changed_projects - deleted['project']
+    deleted['project'] |= left
+
+    data = {
+        'token': str(rows[-1][0] if has_more else max(since, until)),
+        'has_more': has_more,
+        'joined': sorted(joined),
+    }
+    for model, fields in SYNC_FIELDS.items():
+        name = model._meta.model_name
+        ids = upserted[name]
+        data[f'{name}s'] = list(
+            model.objects.filter(pk__in=ids).order_by('pk').values(*fields)
+        ) if ids else []
+    data['deleted'] = {
+        f'{model._meta.model_name}s': sorted(deleted[model._meta.model_name])
+        for model in SYNC_FIELDS
+    }
+    return data
@@ -1,3 +1,1150 @@
-from django.test import TestCase
+"""Contains the tests of projects app."""
 
-# Create your tests here.
+# lib
+import json
+import os
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+
+# asgiref
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+
+# django
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.signals import request_started, request_finished
+from django.db import close_old_connections, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+# rest_framework
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+# async views
+from SoftDesk.async_views import StreamingASGIHandler
+
+# events
+from projects import events
+from projects.events import get_event_broker
+
+# export
+from projects.export import ProjectImporter
+
+# membership
+from projects.membership import membership_cache
+
+# models
+from accounts.models import CustomUser
+from projects.models import Project, Contributor, Issue, Comment, Deletion
+
+# deletion
+from projects.deletion import hide_projects
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProjectsAPITestCase(APITestCase):
+    """
+    Creates a project with its author, a contributor, an issue and a comment.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user('author@softdesk.fr', 'Author', 'Test', 'pw')
+        self.contributor = CustomUser.objects.create_user(
+            'contributor@softdesk.fr', 'Contributor', 'Test', 'pw'
+        )
+        self.project = self.create_project(self.author)
+        Contributor.objects.create(user=self.contributor, project=self.project, role='dev')
+        self.issue = self.create_issue(self.project, self.author)
+        self.comment = Comment.objects.create(
+            description='comment', author=self.author, issue=self.issue
+        )
+        self.client.force_authenticate(self.author)
+
+    @staticmethod
+    def create_project(author):
+        """Creates a project of author."""
+        return Project.objects.create(
+            title='project', description='description', type='back-end', author=author
+        )
+
+    @staticmethod
+    def create_issue(project, author):
+        """Creates an issue of project assigned to author."""
+        return Issue.objects.create(
+            title='issue', description='description', tag='bug', priority='high',
+            status='open', author=author, assignee=project.author, project=project
+        )
+
+
+class QueryCountTestCase(ProjectsAPITestCase):
+    """
+    The number of queries of each endpoint must not depend on the number of rows.
+    """
+
+    def create_user(self, index):
+        """Creates a user who is a contributor of the project."""
+        user = CustomUser.objects.create_user(f'user{index}@softdesk.fr', 'User', 'Test', 'pw')
+        Contributor.objects.create(user=user, project=self.project, role='dev')
+        return user
+
+    def grow(self, rows=10):
+        """Adds rows to every relation serialized by the endpoints."""
+        for index in range(rows):
+            user = self.create_user(index)
+            project = self.create_project(user)
+            Contributor.objects.create(user=self.author, project=project, role='dev')
+            issue = self.create_issue(self.project, user)
+            Comment.objects.create(description='comment', author=user, issue=self.issue)
+            Comment.objects.create(description='comment', author=user, issue=issue)
+
+    def assertConstantQueries(self, num, url):
+        """
+        Asserts url runs num queries before and after growing the dataset.
+        The membership cache is cleared to measure the worst case.
+        """
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.grow()
+        cache.clear()
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    # The lists run an aggregate query for their ETag.
+
+    def test_list_projects(self):
+        self.assertConstantQueries(3, '/api/projects/')
+
+    def test_retrieve_project(self):
+        self.assertConstantQueries(2, f'/api/projects/{self.project.pk}/')
+
+    def test_list_contributors(self):
+        self.assertConstantQueries(2, f'/api/projects/{self.project.pk}/users/')
+
+    def test_list_issues(self):
+        self.assertConstantQueries(3, f'/api/projects/{self.project.pk}/issues/')
+
+    def test_filter_open_issues_by_priority(self):
+        self.assertConstantQueries(
+            3, f'/api/projects/{self.project.pk}/issues/?status=open&ordering=-priority'
+        )
+
+    def test_filter_issues(self):
+        self.assertConstantQueries(
+            3, f'/api/projects/{self.project.pk}/issues/?status=open&priority=high'
+        )
+
+    def test_filter_assigned_issues(self):
+        self.assertConstantQueries(
+            3, f'/api/projects/{self.project.pk}/issues/?assignee={self.author.pk}&tag=bug'
+        )
+
+    def test_retrieve_issue(self):
+        self.assertConstantQueries(
+            2, f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/'
+        )
+
+    def test_list_comments(self):
+        self.assertConstantQueries(
+            3, f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        )
+
+    def test_retrieve_comment(self):
+        self.assertConstantQueries(
+            2,
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/{self.comment.pk}/'
+        )
+
+
+class ProjectMembershipTestCase(ProjectsAPITestCase):
+    """
+    The project of the url is loaded once and shared by the permissions and the view.
+    """
+
+    def test_contributor_can_list_issues(self):
+        self.client.force_authenticate(self.contributor)
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_outsider_cannot_list_issues(self):
+        outsider = CustomUser.objects.create_user('outsider@softdesk.fr', 'Out', 'Sider', 'pw')
+        self.client.force_authenticate(outsider)
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_project(self):
+        response = self.client.get('/api/projects/0/issues/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_issue_loads_project_once(self):
+        data = {
+            'title': 'issue', 'description': 'description', 'tag': 'bug',
+            'priority': 'high', 'status': 'open',
+        }
+        # membership, insert, issue_count, search index, change log
+        with self.assertNumQueries(5):
+            response = self.client.post(f'/api/projects/{self.project.pk}/issues/', data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['assignee']['id'], self.author.pk)
+
+
+class MembershipCacheTestCase(ProjectsAPITestCase):
+    """
+    The role of a user in a project is shared between the requests.
+    """
+
+    def test_second_request_hits_the_cache(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        hits = membership_cache.hits
+        # membership, etag, issues
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        self.assertEqual(membership_cache.hits, hits + 1)
+
+    def test_new_contributor_invalidates_the_cache(self):
+        user = CustomUser.objects.create_user('new@softdesk.fr', 'New', 'Test', 'pw')
+        self.client.force_authenticate(user)
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        contributor = Contributor.objects.create(user=user, project=self.project, role='dev')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        contributor.delete()
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_author_change_invalidates_the_cache(self):
+        url = f'/api/projects/{self.project.pk}/users/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.project.author = CustomUser.objects.create_user(
+            'new@softdesk.fr', 'New', 'Test', 'pw'
+        )
+        self.project.save()
+        self.assertEqual(self.client.delete(f'{url}1/').status_code, 403)
+
+    def test_invalidation_during_a_miss(self):
+        # A request reads the role, the contributor is removed, then the request caches it.
+        key = membership_cache.key(self.author.pk, self.project.pk)
+        membership_cache.invalidate(self.project.pk)
+        membership_cache.set(key, False, True)
+        key = membership_cache.key(self.author.pk, self.project.pk)
+        self.assertIsNone(membership_cache.get(key))
+
+    def test_stats_require_admin(self):
+        response = self.client.get('/api/stats/membership-cache/')
+        self.assertEqual(response.status_code, 403)
+        self.author.is_staff = True
+        response = self.client.get('/api/stats/membership-cache/')
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_ratio'})
+
+
+class SparseFieldsetsTestCase(ProjectsAPITestCase):
+    """
+    The ?fields= and ?expand= query parameters prune and extend the serializers.
+    """
+
+    def test_fields(self):
+        # etag, projects
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/projects/?fields=id,title')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_default_fields(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertIn('contributors', response.data)
+        self.assertNotIn('issues', response.data)
+
+    def test_expand_issues_and_comments(self):
+        # projects, contributors, issues, comments
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/api/projects/?fields=id,contributors,issues&expand=issues.comments'
+            )
+        project = response.data['results'][0]
+        self.assertEqual(project['issues'][0]['id'], self.issue.pk)
+        self.assertEqual(project['issues'][0]['comments'][0]['id'], self.comment.pk)
+        self.assertEqual(project['issues'][0]['author']['id'], self.author.pk)
+
+    def test_expand_comments(self):
+        response = self.client.get(
+            f'/api/projects/{self.project.pk}/issues/?expand=comments&fields=id,comments'
+        )
+        self.assertEqual(set(response.data['results'][0]), {'id', 'comments'})
+        self.assertEqual(response.data['results'][0]['comments'][0]['id'], self.comment.pk)
+
+
+class ConditionalGetTestCase(ProjectsAPITestCase):
+    """
+    The GET requests matching the ETag or Last-Modified validators are answered 304.
+    """
+
+    def test_list_etag(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        # the membership is cached, etag
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.create_issue(self.project, self.author)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_after_deletion(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.create_issue(self.project, self.author)
+        etag = self.client.get(url)['ETag']
+        self.issue.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_last_modified(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/'
+        response = self.client.get(url)
+        last_modified = response['Last-Modified']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304
+        )
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        self.issue.status = 'closed'
+        self.issue.save()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200
+        )
+
+    def test_contributor_change_updates_project(self):
+        url = f'/api/projects/{self.project.pk}/'
+        etag = self.client.get(url)['ETag']
+        Contributor.objects.filter(project=self.project).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_nested_user_change(self):
+        list_url = f'/api/projects/{self.project.pk}/issues/'
+        detail_url = f'{list_url}{self.issue.pk}/'
+        etags = [self.client.get(url)['ETag'] for url in (list_url, detail_url)]
+        self.author.first_name = 'Renamed'
+        self.author.save()
+        for url, etag in zip((list_url, detail_url), etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_of_each_user(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.contributor)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_expand_is_not_conditional(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/?expand=comments')
+        self.assertNotIn('ETag', response)
+
+
+class BulkTestCase(ProjectsAPITestCase):
+    """
+    The issues and comments lists accept batches.
+    """
+
+    def issue_data(self, index):
+        """Returns the payload of an issue."""
+        return {
+            'title': f'issue {index}', 'description': 'description', 'tag': 'bug',
+            'priority': 'low', 'status': 'open',
+        }
+
+    def test_bulk_create_issues(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        data = [self.issue_data(index) for index in range(20)]
+        # membership, savepoint, insert, ids, issue_count, search index, change log,
+        # release savepoint
+        with self.assertNumQueries(8):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+        issue = Issue.objects.get(pk=response.data[-1]['id'])
+        self.assertEqual(issue.title, 'issue 19')
+        self.assertEqual(issue.assignee, self.author)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        data = [self.issue_data(index) for index in range(3)]
+        del data[1]['title']
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertEqual(Issue.objects.count(), 1)
+
+    def test_bulk_create_comments(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        data = [{'description': f'comment {index}'} for index in range(5)]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.issue.comment.count(), 6)
+
+    def test_bulk_update_issues(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        other = self.create_issue(self.project, self.author)
+        data = [
+            {'id': self.issue.pk, 'status': 'closed'},
+            {'id': other.pk, 'priority': 'low'},
+        ]
+        response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.issue.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.issue.status, self.issue.priority), ('closed', 'high'))
+        self.assertEqual((other.status, other.priority), ('open', 'low'))
+
+    def test_bulk_update_checks_each_issue(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        other_project = self.create_project(self.author)
+        foreign = self.create_issue(other_project, self.author)
+        contributor_issue = self.create_issue(self.project, self.contributor)
+        data = [
+            {'id': self.issue.pk, 'status': 'closed'},
+            {'id': foreign.pk, 'status': 'closed'},
+            {'id': contributor_issue.pk, 'status': 'closed'},
+        ]
+        response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        self.assertIn('id', response.data[2])
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.status, 'open')
+
+
+class CounterTestCase(ProjectsAPITestCase):
+    """
+    The counters of the projects and issues follow the creations and deletions.
+    """
+
+    def assertCounters(self, issues, comments, contributors, issue_comments):
+        self.project.refresh_from_db()
+        self.issue.refresh_from_db()
+        self.assertEqual(
+            (self.project.issue_count, self.project.comment_count, self.project.contributor_count),
+            (issues, comments, contributors),
+        )
+        self.assertEqual(self.issue.comment_count, issue_comments)
+
+    def test_counters_follow_changes(self):
+        self.assertCounters(1, 1, 1, 1)
+        other = self.create_issue(self.project, self.author)
+        Comment.objects.create(description='second', author=self.author, issue=other)
+        self.assertCounters(2, 2, 1, 1)
+        self.comment.delete()
+        self.assertCounters(2, 1, 1, 0)
+        # The comments of a deleted issue are counted by the cascade.
+        other.delete()
+        self.assertCounters(1, 0, 1, 0)
+        Contributor.objects.get(user=self.contributor).delete()
+        self.assertCounters(1, 0, 0, 0)
+
+    def test_save_keeps_counters(self):
+        stale = Issue.objects.get(pk=self.issue.pk)
+        Comment.objects.create(description='second', author=self.author, issue=self.issue)
+        stale.title = 'renamed'
+        stale.save()
+        self.assertCounters(1, 2, 1, 2)
+
+    def test_bulk_creations_are_counted(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        data = [{'description': f'comment {index}'} for index in range(5)]
+        self.client.post(url, data, format='json')
+        self.assertCounters(1, 6, 1, 6)
+
+    def test_counters_are_serialized(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(
+            (response.data['issue_count'], response.data['comment_count'],
+             response.data['contributor_count']),
+            (1, 1, 1),
+        )
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/')
+        self.assertEqual(response.data['comment_count'], 1)
+
+    def test_reconcile_counters(self):
+        Project.objects.update(issue_count=5)
+        Issue.objects.update(comment_count=0)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn(f"Project {self.project.pk}: issue_count 5 -> 1", out.getvalue())
+        self.assertCounters(5, 1, 1, 0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 1, 1)
+
+
+class SearchTestCase(ProjectsAPITestCase):
+    """
+    The issues and comments are searched in a project or in all the projects of the user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.issue.title = 'Login timeout'
+        self.issue.description = 'The login page hangs on slow networks'
+        self.issue.save()
+        self.comment.description = 'The timeout is thirty seconds'
+        self.comment.save()
+        self.url = f'/api/projects/{self.project.pk}/search/'
+
+    def search(self, url, query):
+        response = self.client.get(url, {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [(hit['kind'], hit['id']) for hit in response.data['results']]
+
+    def test_search_project(self):
+        response = self.client.get(self.url, {'q': 'timeout'})
+        self.assertEqual(response.data['count'], 2)
+        # The title weighs more than the description.
+        first, second = response.data['results']
+        self.assertEqual((first['kind'], first['id']), ('issue', self.issue.pk))
+        self.assertEqual((second['kind'], second['issue']), ('comment', self.issue.pk))
+        self.assertIn('<mark>', second['snippet'])
+        self.assertEqual(self.search(self.url, 'slow network'), [('issue', self.issue.pk)])
+        self.assertEqual(self.search(self.url, 'unknown'), [])
+
+    def test_index_follows_changes(self):
+        self.comment.description = 'Fixed'
+        self.comment.save()
+        self.assertEqual(self.search(self.url, 'timeout'), [('issue', self.issue.pk)])
+        self.assertEqual(self.search(self.url, 'fixed'), [('comment', self.comment.pk)])
+        self.issue.delete()
+        self.assertEqual(self.search(self.url, 'fixed'), [])
+
+    def test_bulk_created_comments_are_indexed(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        data = [{'description': f'deadlock {index}'} for index in range(3)]
+        self.client.post(url, data, format='json')
+        self.assertEqual(len(self.search(self.url, 'deadlock')), 3)
+
+    def test_search_all_projects(self):
+        outsider = CustomUser.objects.create_user('outsider@softdesk.fr', 'Out', 'Sider', 'pw')
+        other_project = self.create_project(outsider)
+        other_issue = self.create_issue(other_project, outsider)
+        other_issue.title = 'Timeout'
+        other_issue.save()
+        self.assertEqual(len(self.search('/api/search/', 'timeout')), 2)
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.search('/api/search/', 'timeout'), [('issue', other_issue.pk)])
+        response = self.client.get(self.url, {'q': 'timeout'})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(SEARCH_BACKEND='like')
+    def test_like_backend(self):
+        self.assertEqual(
+            sorted(self.search(self.url, 'TIMEOUT')),
+            [('comment', self.comment.pk), ('issue', self.issue.pk)],
+        )
+
+    @skipUnless(
+        connection.vendor == 'sqlite', "The PostgreSQL index is maintained by the database."
+    )
+    def test_rebuild_search_index(self):
+        Comment.objects.filter(pk=self.comment.pk).update(description='rebuilt')
+        self.assertEqual(self.search(self.url, 'rebuilt'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search(self.url, 'rebuilt'), [('comment', self.comment.pk)])
+
+    def test_query_is_required(self):
+        response = self.client.get(self.url, {'q': ' ?! '})
+        self.assertEqual(response.status_code, 400)
+
+
+class IssueFilterTestCase(ProjectsAPITestCase):
+    """
+    The issue list is filtered and ordered by the allowed query parameters.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.pk}/issues/'
+        self.low = self.create_issue(self.project, self.author)
+        Issue.objects.filter(pk=self.low.pk).update(priority='low', assignee=self.contributor)
+        self.closed = self.create_issue(self.project, self.author)
+        Issue.objects.filter(pk=self.closed.pk).update(status='closed')
+
+    def list(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [issue['id'] for issue in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.list(status='open', priority='high'), [self.issue.pk])
+        self.assertEqual(
+            self.list(status='open,closed', priority='high'), [self.closed.pk, self.issue.pk]
+        )
+        self.assertEqual(self.list(assignee=self.contributor.pk), [self.low.pk])
+        self.assertEqual(self.list(tag='feature'), [])
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.list(ordering='priority'), [self.issue.pk, self.closed.pk, self.low.pk]
+        )
+        self.assertEqual(
+            self.list(ordering='-priority'), [self.low.pk, self.closed.pk, self.issue.pk]
+        )
+
+    def test_ordering_is_paginated(self):
+        response = self.client.get(self.url, {'ordering': '-priority', 'page_size': 2})
+        ids = [issue['id'] for issue in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [issue['id'] for issue in response.data['results']]
+        self.assertEqual(ids, [self.low.pk, self.closed.pk, self.issue.pk])
+
+    def test_tied_ordering_is_paginated_to_the_end(self):
+        # More ties than the offset cutoff of CursorPagination, with the same creation time.
+        created_time = self.issue.created_time
+        Issue.objects.bulk_create([
+            Issue(title='issue', description='description', tag='bug', priority='high',
+                  status='open', author=self.author, assignee=self.author, project=self.project,
+                  created_time=created_time)
+            for _ in range(1600)
+        ])
+        expected = list(Issue.objects.filter(project=self.project)
+                        .order_by('priority', 'created_time', 'id').values_list('id', flat=True))
+        ids, pages = [], []
+        url = f'{self.url}?ordering=priority&page_size=500'
+        while url and len(pages) < 6:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids += [issue['id'] for issue in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, expected)
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+        self.assertEqual(self.client.get(f'{self.url}?cursor=invalid').status_code, 404)
+
+    def test_invalid_parameters(self):
+        for params in ({'assignee': 'me'}, {'status': 'open,'}, {'ordering': 'description'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=300, RESPONSE_CACHE_REVALIDATE_WORKERS=0)
+class ResponseCacheTestCase(ProjectsAPITestCase):
+    """
+    The project and issue lists are served from the cache until a write bumps their version.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.issues_url = f'/api/projects/{self.project.pk}/issues/'
+        self.other_project = self.create_project(self.author)
+        self.other_issues_url = f'/api/projects/{self.other_project.pk}/issues/'
+
+    def assertCached(self, url, cached=True):
+        """Asserts url is answered from the cache, without a query, or not."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(not context.captured_queries, cached)
+        return response.json()
+
+    def test_hit(self):
+        body = self.assertCached('/api/projects/', cached=False)
+        self.assertEqual(self.assertCached('/api/projects/'), body)
+        self.assertCached('/api/projects/?fields=id', cached=False)
+        etag = self.client.get('/api/projects/')['ETag']
+        response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates_its_project(self):
+        for url in (self.issues_url, self.other_issues_url):
+            self.assertCached(url, cached=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(description='new', author=self.author, issue=self.issue)
+        body = self.assertCached(self.issues_url, cached=False)
+        self.assertEqual(body['results'][0]['comment_count'], 2)
+        self.assertCached(self.other_issues_url)
+
+    def test_removed_contributor(self):
+        self.client.force_authenticate(self.contributor)
+        self.assertEqual(len(self.assertCached('/api/projects/', cached=False)['results']), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Contributor.objects.filter(user=self.contributor).delete()
+        self.assertEqual(self.assertCached('/api/projects/', cached=False)['results'], [])
+
+    @override_settings(RESPONSE_CACHE_STALE_SECONDS=60)
+    def test_stale_while_revalidate(self):
+        self.assertCached(self.issues_url, cached=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            Issue.objects.filter(pk=self.issue.pk).update(title='renamed')
+            Issue.objects.get(pk=self.issue.pk).save()
+        # The stale list is served and rendered again for the next request.
+        self.assertEqual(self.client.get(self.issues_url).json()['results'][0]['title'], 'issue')
+        body = self.assertCached(self.issues_url)
+        self.assertEqual(body['results'][0]['title'], 'renamed')
+
+    def test_stats(self):
+        self.author.is_staff = True
+        self.author.save()
+        before = self.client.get('/api/stats/response-cache/').json().get('issues', {})
+        self.client.get(self.issues_url)
+        self.client.get(self.issues_url)
+        stats = self.client.get('/api/stats/response-cache/').json()['issues']
+        self.assertEqual(stats['hits'], before.get('hits', 0) + 1)
+        self.assertEqual(stats['misses'], before.get('misses', 0) + 1)
+        self.assertEqual(
+            stats['hit_ratio'],
+            (stats['hits'] + stats['stale']) / (stats['hits'] + stats['stale'] + stats['misses'])
+        )
+
+
+@override_settings(ASYNC_DB_WORKERS=0)
+class AsyncReadTestCase(ProjectsAPITestCase):
+    """
+    The async reads answer like the synchronous views, authenticated by the access token.
+    The database work runs in the thread of the test, which sees its transaction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.authenticate(self.author)
+
+    def authenticate(self, user):
+        """Sends the access token of user with the next requests."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def assertSameResponse(self, url):
+        """Asserts the async variant of url answers like url."""
+        response = self.client.get(f'/api{url}')
+        async_response = self.client.get(f'/api/async{url}')
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), response.json())
+        self.assertTrue(async_response.has_header('ETag'))
+
+    def test_reads(self):
+        issue_url = f'/projects/{self.project.pk}/issues/{self.issue.pk}/'
+        for url in (
+            '/projects/', f'/projects/{self.project.pk}/', f'/projects/{self.project.pk}/issues/',
+            issue_url, f'{issue_url}comments/', f'{issue_url}comments/{self.comment.pk}/',
+        ):
+            with self.subTest(url=url):
+                self.assertSameResponse(url)
+
+    def test_permissions(self):
+        url = f'/api/async/projects/{self.project.pk}/issues/'
+        outsider = CustomUser.objects.create_user('outsider@softdesk.fr', 'Out', 'Test', 'pw')
+        self.authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.credentials()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_reads_only(self):
+        response = self.client.post('/api/async/projects/', {'title': 'project'})
+        self.assertEqual(response.status_code, 405)
+
+
+class EventsTestCase(ProjectsAPITestCase):
+    """
+    The writes of a project are published to its streams once committed and replayed after
+    the Last-Event-ID of a client.
+    """
+
+    def setUp(self):
+        super().setUp()
+        events._brokers.clear()
+        self.url = f'/api/projects/{self.project.pk}/events/'
+
+    def read(self, last_event_id):
+        """Returns the events sent to a client resuming after last_event_id."""
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID=last_event_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_replay_after_last_event_id(self):
+        issues_url = f'/api/projects/{self.project.pk}/issues/'
+        # The events are logged once a client follows the project.
+        self.read(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'{issues_url}{self.issue.pk}/', {
+                'title': 'renamed', 'description': 'description', 'tag': 'bug',
+                'priority': 'high', 'status': 'open',
+            })
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{issues_url}{self.issue.pk}/comments/', [
+                {'description': 'first'}, {'description': 'second'},
+            ], format='json')
+        first_id = get_event_broker().logs[self.project.pk].events[0].id
+        content = self.read(first_id)
+        self.assertNotIn('issue.updated', content)
+        self.assertEqual(content.count('event: comment.created'), 2)
+        self.assertNotIn('event: reset', content)
+        # Nothing is published for a rolled back write.
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.delete(f'{issues_url}{self.issue.pk}/')
+        self.assertEqual(len(get_event_broker().logs[self.project.pk].events), 3)
+
+    @override_settings(EVENTS_LOG_SIZE=1)
+    def test_reset_after_missed_events(self):
+        broker = get_event_broker()
+        broker.follow(self.project.pk)
+        for index in range(3):
+            broker.publish(self.project.pk, 'issue.updated', {'id': index})
+        epoch = broker.logs[self.project.pk].epoch
+        self.assertIn('event: reset', self.read(f'{epoch}-1'))
+        self.assertIn('event: reset', self.read('unknown-1'))
+        self.assertNotIn('event: reset', self.read(f'{epoch}-2'))
+
+    @override_settings(EVENTS_LOG_PROJECTS=1, EVENTS_LOG_IDLE_SECONDS=60)
+    def test_log_eviction(self):
+        broker = get_event_broker()
+        broker.publish(self.project.pk, 'issue.updated', {'id': 1})
+        self.assertFalse(broker.logs)
+        broker.follow(self.project.pk)
+        broker.publish(self.project.pk, 'issue.updated', {'id': 1})
+        epoch = broker.logs[self.project.pk].epoch
+        # Idle for longer than EVENTS_LOG_IDLE_SECONDS.
+        broker.logs[self.project.pk].followed_at -= 61
+        broker.publish(self.project.pk, 'issue.updated', {'id': 1})
+        self.assertFalse(broker.logs)
+        self.assertIn('event: reset', self.read(f'{epoch}-1'))
+        # The least recently used log is evicted beyond EVENTS_LOG_PROJECTS.
+        broker.follow(self.project.pk + 1)
+        self.assertEqual(list(broker.logs), [self.project.pk + 1])
+
+    def test_permissions(self):
+        outsider = CustomUser.objects.create_user('outsider@softdesk.fr', 'Out', 'Test', 'pw')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    async def test_stream(self):
+        # The connections of the test are kept, like by the test client.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        communicator = ApplicationCommunicator(StreamingASGIHandler(), {
+            'type': 'http', 'method': 'GET', 'path': self.url, 'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {AccessToken.for_user(self.author)}'.encode()),
+            ],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(5)
+        self.assertEqual(start['status'], 200)
+        self.assertIn(b'retry:', (await communicator.receive_output(5))['body'])
+        broker = get_event_broker()
+        broker.publish(self.project.pk, 'issue.created', {'id': 1})
+        body = (await communicator.receive_output(5))['body']
+        epoch = broker.logs[self.project.pk].epoch
+        self.assertIn(f'id: {epoch}-1\nevent: issue.created'.encode(), body)
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(5)
+        self.assertFalse(broker.subscriptions)
+
+
+class SyncTestCase(ProjectsAPITestCase):
+    """
+    The sync returns the rows changed since a token and the tombstones of the deleted ones.
+    """
+
+    def sync(self, token):
+        """Returns the changes since token."""
+        response = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_token(self):
+        token = self.client.get('/api/sync/').data['token']
+        issues_url = f'/api/projects/{self.project.pk}/issues/'
+        self.client.patch(f'{issues_url}{self.issue.pk}/', {'status': 'closed'})
+        self.client.patch(f'{issues_url}{self.issue.pk}/', {'priority': 'low'})
+        self.client.delete(f'{issues_url}{self.issue.pk}/comments/{self.comment.pk}/')
+        data = self.sync(token)
+        self.assertEqual([issue['status'] for issue in data['issues']], ['closed'])
+        self.assertEqual(data['comments'], [])
+        self.assertEqual(data['deleted']['comments'], [self.comment.pk])
+        # The counters of the project changed.
+        self.assertEqual(data['projects'][0]['comment_count'], 0)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['token'])['issues'], [])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_pages(self):
+        token = self.client.get('/api/sync/').data['token']
+        self.client.post(f'/api/projects/{self.project.pk}/issues/', [
+            {'title': f'issue {index}', 'description': 'description', 'tag': 'bug',
+             'priority': 'low', 'status': 'open'} for index in range(3)
+        ], format='json')
+        first = self.sync(token)
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['token'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(first['issues']) + len(second['issues']), 3)
+
+    def test_access_changes(self):
+        self.client.force_authenticate(self.contributor)
+        token = self.client.get('/api/sync/').data['token']
+        outsider_project = self.create_project(self.author)
+        contributor = Contributor.objects.get(user=self.contributor, project=self.project)
+        contributor.delete()
+        data = self.sync(token)
+        self.assertEqual(data['deleted']['projects'], [self.project.pk])
+        self.assertEqual(data['projects'], [])
+        token = data['token']
+        Contributor.objects.create(user=self.contributor, project=outsider_project, role='dev')
+        data = self.sync(token)
+        self.assertEqual(data['joined'], [outsider_project.pk])
+        self.assertEqual([project['id'] for project in data['projects']], [outsider_project.pk])
+
+    def test_invalid_tokens(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/', {'since': '999999'}).status_code, 410)
+        token = self.client.get('/api/sync/').data['token']
+        call_command('prune_changelog', '--days', '0', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/sync/', {'since': '0'}).status_code, 410)
+        self.assertEqual(self.sync(token)['issues'], [])
+
+
+@override_settings(DELETION_WORKERS=0, DELETION_BATCH_SIZE=2)
+class DeletionTestCase(ProjectsAPITestCase):
+    """
+    A deleted project or user is hidden at once and its rows are deleted by batches once the
+    transaction commits.
+    """
+
+    def test_project_deletion(self):
+        for index in range(3):
+            Comment.objects.create(description=f'comment {index}', author=self.author,
+                                   issue=self.issue)
+        url = f'/api/projects/{self.project.pk}/'
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Deletion.PENDING)
+        # Hidden before the deletion of its rows.
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(f'{url}issues/').status_code, 404)
+        self.assertEqual(self.client.get('/api/projects/').data['results'], [])
+        self.assertTrue(Issue.objects.filter(project=self.project).exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Contributor.objects.exists())
+        self.client.force_authenticate(None)
+        deletion = self.client.get(response['Location']).data
+        self.assertEqual(deletion['status'], Deletion.DONE)
+        # 4 comments, an issue, a contributor and the project.
+        self.assertEqual(deletion['deleted_rows'], 7)
+        self.assertEqual(deletion['total_rows'], 7)
+
+    def test_user_deletion(self):
+        own_project = self.create_project(self.contributor)
+        self.create_issue(own_project, self.contributor)
+        issue = self.create_issue(self.project, self.contributor)
+        Comment.objects.create(description='comment', author=self.author, issue=issue)
+        Comment.objects.create(description='comment', author=self.contributor, issue=self.issue)
+        token = self.client.get('/api/sync/').data['token']
+        self.client.force_authenticate(self.contributor)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'/api/users/{self.contributor.pk}/delete-user/', {'password': 'pw'}
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Deletion.objects.get().status, Deletion.DONE)
+        self.assertFalse(CustomUser.objects.filter(pk=self.contributor.pk).exists())
+        self.assertFalse(Project.all_objects.filter(pk=own_project.pk).exists())
+        # The rows of the user in the other projects are deleted and counted.
+        self.assertEqual(list(Issue.objects.all()), [self.issue])
+        self.assertEqual(list(Comment.objects.all()), [self.comment])
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.issue_count, self.project.comment_count,
+             self.project.contributor_count), (1, 1, 0)
+        )
+        self.client.force_authenticate(self.author)
+        deleted = self.client.get('/api/sync/', {'since': token}).data['deleted']
+        self.assertEqual(deleted['issues'], [issue.pk])
+        self.assertEqual(len(deleted['comments']), 2)
+
+    def test_process_deletions(self):
+        hide_projects([self.project])
+        Deletion.objects.create(model='project', object_id=self.project.pk)
+        out = StringIO()
+        call_command('process_deletions', stdout=out)
+        self.assertIn(f"project {self.project.pk}: done, 4/4 rows", out.getvalue())
+        self.assertFalse(Issue.objects.exists())
+
+    def test_running_deletion_is_skipped(self):
+        hide_projects([self.project])
+        deletion = Deletion.objects.create(
+            model='project', object_id=self.project.pk, status=Deletion.RUNNING
+        )
+        # Run by another worker.
+        call_command('process_deletions', stdout=StringIO())
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.deleted_rows), (Deletion.RUNNING, 0))
+        self.assertTrue(Issue.objects.exists())
+        # Its worker stopped.
+        Deletion.objects.filter(pk=deletion.pk) \
+            .update(updated_time=timezone.now() - timedelta(seconds=601))
+        call_command('process_deletions', stdout=StringIO())
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.deleted_rows), (Deletion.DONE, 4))
+
+
+class ExportTestCase(ProjectsAPITestCase):
+    """
+    A project is exported as newline-delimited JSON and imported back.
+    """
+
+    def test_export_and_import(self):
+        Comment.objects.create(description='second', author=self.contributor, issue=self.issue)
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['model'] for line in lines],
+            ['project', 'contributor', 'issue', 'comment', 'comment'],
+        )
+
+        importer = ProjectImporter(batch_size=1)
+        project = importer.run(lines)
+        self.assertNotEqual(project.pk, self.project.pk)
+        self.assertEqual(project.author, self.author)
+        self.assertEqual(list(project.contributors.all()), [self.contributor])
+        issue = project.issue.get()
+        self.assertEqual(issue.title, self.issue.title)
+        self.assertEqual(
+            sorted(issue.comment.values_list('description', flat=True)), ['comment', 'second']
+        )
+
+    @override_settings(ASYNC_DB_WORKERS=0, EXPORT_CHUNK_SIZE=1)
+    async def test_asgi_export(self):
+        # The connections of the test are kept, like by the test client.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        await sync_to_async(Comment.objects.create)(
+            description='second', author=self.contributor, issue=self.issue
+        )
+        communicator = ApplicationCommunicator(StreamingASGIHandler(), {
+            'type': 'http', 'method': 'GET', 'path': f'/api/projects/{self.project.pk}/export/',
+            'query_string': b'', 'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {AccessToken.for_user(self.author)}'.encode()),
+            ],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(5)
+        self.assertEqual(start['status'], 200)
+        body = b''
+        while True:
+            message = await communicator.receive_output(5)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        self.assertEqual(
+            [json.loads(line)['model'] for line in body.decode().splitlines()],
+            ['project', 'contributor', 'issue', 'comment', 'comment'],
+        )
+
+    def test_export_requires_membership(self):
+        outsider = CustomUser.objects.create_user('outsider@softdesk.fr', 'Out', 'Sider', 'pw')
+        self.client.force_authenticate(outsider)
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/')
+        self.assertEqual(response.status_code, 403)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is specific to SQLite.")
+class QueryPlanTestCase(QueryCountTestCase):
+    """
+    The queries of the endpoints must use the indexes: no full table or index scan, and no
+    temporary B-tree to sort the rows, except for the prefetch of a page of parents (IN list).
+    """
+
+    def assertConstantQueries(self, num, url, allow=()):
+        """Overrides the query count test to check the query plans of url instead."""
+        self.grow(rows=50)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            b''.join(getattr(response, 'streaming_content', []))
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plan = [row[3] for row in cursor.fetchall()]
+            for step in plan:
+                if any(step.startswith(allowed) for allowed in allow):
+                    continue
+                self.assertFalse(step.startswith('SCAN'), f"{step} in {query['sql']}")
+                if ' IN (' not in query['sql']:
+                    self.assertNotIn(
+                        'USE TEMP B-TREE FOR ORDER BY', step, f"{step} in {query['sql']}"
+                    )
+
+    def test_list_projects(self):
+        # The projects of the author and of the contributor are searched by two indexes,
+        # their union is sorted.
+        self.assertConstantQueries(0, '/api/projects/', allow=('USE TEMP B-TREE',))
+
+    @override_settings(EXPORT_CHUNK_SIZE=10)
+    def test_export(self):
+        # The comments of each issue are sorted, the rows are still streamed. The chunks after
+        # the first one seek from the last row.
+        self.assertConstantQueries(0, f'/api/projects/{self.project.pk}/export/')
+
+
+class BenchmarkTestCase(ProjectsAPITestCase):
+    """
+    The generated dataset is consistent and the endpoint benchmark compares its runs.
+    """
+
+    def test_generate_dataset(self):
+        call_command(
+            'generate_dataset', '--users', '5', '--projects', '4', '--contributors', '2',
+            '--issues', '3', '--comments', '2', '--password', 'bench', stdout=StringIO(),
+        )
+        users = CustomUser.objects.filter(email__endswith='@bench.softdesk.local')
+        self.assertEqual(users.count(), 5)
+        self.assertTrue(users[0].check_password('bench'))
+        self.assertEqual(Project.objects.filter(author__in=users).count(), 4)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn("0 drifted Projects.", out.getvalue())
+        self.assertIn("0 drifted Issues.", out.getvalue())
+
+    def test_bench_endpoints(self):
+        routes = ['list_create_project', 'update_destroy_retrieve_comment', 'logout']
+        with TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command(
+                'bench_endpoints', '--iterations', '2', '--warmup', '0', '--routes', *routes,
+                '--output', output, stdout=StringIO(), stderr=StringIO(),
+            )
+            with open(output) as file:
+                results = json.load(file)['results']
+            self.assertEqual(results['GET list_create_project']['status'], 200)
+            self.assertEqual(results['DELETE update_destroy_retrieve_comment']['status'], 204)
+            self.assertEqual(results['POST logout']['status'], 204)
+            self.assertGreater(results['GET list_create_project']['queries'], 0)
+            # The writes of the benchmark are rolled back.
+            self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+            results['GET list_create_project']['queries'] = 0
+            with open(output, 'w') as file:
+                json.dump({'results': results}, file)
+            with self.assertRaisesMessage(CommandError, "GET list_create_project"):
+                call_command(
+                    'bench_endpoints', '--iterations', '2', '--warmup', '0', '--routes', *routes,
+                    '--baseline', output, stdout=StringIO(), stderr=StringIO(),
+                )
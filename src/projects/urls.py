@@ -3,10 +3,15 @@
 # django
 from django.urls import path
 
+# async views
+from SoftDesk.async_views import async_read_view
+
 # views
 from projects.views import ProjectListCreateView, ProjectRetrieveUpdateDestroyView, \
     ContributorDestroyView, ContributorListCreateView, IssueListCreateView, \
-    IssueRetrieveUpdateDestroyView, CommentListCreateView, CommentRetrieveUpdateDestroyView
+    IssueRetrieveUpdateDestroyView, CommentListCreateView, CommentRetrieveUpdateDestroyView, \
+    ProjectExportView, MembershipCacheStatsView, ResponseCacheStatsView, SearchView, \
+    ProjectSearchView, ProjectEventsView, SyncView, DeletionView
 
 urlpatterns = [
     # project
@@ -16,6 +21,29 @@ urlpatterns = [
     path('projects/<int:pk>/', ProjectRetrieveUpdateDestroyView.as_view(),
          name="update_destroy_retrieve_project"),
 
+    # GET
+    path('projects/<int:id_project>/export/', ProjectExportView.as_view(),
+         name="export_project"),
+
+    # events, streamed by the ASGI application
+    # GET
+    path('projects/<int:id_project>/events/', ProjectEventsView.as_view(),
+         name="project_events"),
+
+    # search
+    # GET
+    path('projects/<int:id_project>/search/', ProjectSearchView.as_view(),
+         name="search_project"),
+    path('search/', SearchView.as_view(), name="search"),
+
+    # sync
+    # GET
+    path('sync/', SyncView.as_view(), name="sync"),
+
+    # background deletions of the projects and users
+    # GET
+    path('deletions/<uuid:pk>/', DeletionView.as_view(), name="deletion"),
+
     # contributor
     # GET, POST
     path('projects/<int:id_project>/users/', ContributorListCreateView.as_view(),
@@ -42,4 +70,24 @@ urlpatterns = [
     ),
     path('projects/<int:id_project>/issues/<int:id_issue>/comments/<int:pk>/',
          CommentRetrieveUpdateDestroyView.as_view(), name="update_destroy_retrieve_comment"),
+
+    # async reads, served concurrently by the ASGI application
+    # GET
+    path('async/projects/', async_read_view(ProjectListCreateView), name="async_list_project"),
+    path('async/projects/<int:pk>/', async_read_view(ProjectRetrieveUpdateDestroyView),
+         name="async_retrieve_project"),
+    path('async/projects/<int:id_project>/issues/', async_read_view(IssueListCreateView),
+         name="async_list_issue"),
+    path('async/projects/<int:id_project>/issues/<int:pk>/',
+         async_read_view(IssueRetrieveUpdateDestroyView), name="async_retrieve_issue"),
+    path('async/projects/<int:id_project>/issues/<int:id_issue>/comments/',
+         async_read_view(CommentListCreateView), name="async_list_comment"),
+    path('async/projects/<int:id_project>/issues/<int:id_issue>/comments/<int:pk>/',
+         async_read_view(CommentRetrieveUpdateDestroyView), name="async_retrieve_comment"),
+
+    # stats
+    # GET
+    path('stats/membership-cache/', MembershipCacheStatsView.as_view(),
+         name="membership_cache_stats"),
+    path('stats/response-cache/', ResponseCacheStatsView.as_view(), name="response_cache_stats"),
 ]
@@ -1,20 +1,56 @@
 """Contains the views of projects app."""
 
-# lib
-from itertools import chain
-
 # django
-from django.db import IntegrityError
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
 
 # rest_framework
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView,\
-    DestroyAPIView, get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+    DestroyAPIView, ListAPIView, RetrieveAPIView, get_object_or_404
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# instrumentation
+from SoftDesk.instrumentation import InstrumentedViewMixin
+
+# pagination
+from SoftDesk.pagination import IdCursorPagination, KeysetCursorPagination, SearchPagination
 
 # models
 from accounts.models import CustomUser
-from projects.models import Project, Contributor, Issue, Comment
+from projects.models import Project, Contributor, Issue, Comment, Deletion
+
+# deletion
+from projects.deletion import delete_project
+
+# events
+from projects.events import EventStreamRenderer, EventStreamResponse
+
+# export
+from projects.export import ExportResponse
+
+# sync
+from projects.sync import changes_since, current_token, parse_token
+
+# filters
+from projects.filters import AllowListFilterBackend
+
+# search
+from projects.search import get_search_backend, parse_terms
+
+# mixins
+from projects.mixins import ConditionalGetMixin, BulkCreateMixin, CachedListMixin, \
+    BackgroundDestroyMixin
+
+# membership
+from projects.membership import get_project_membership, membership_cache
+
+# response cache
+from projects.response_cache import response_cache
 
 # permissions
 from projects.permissions import IsProjectAuthor, IsProjectContributor, \
@@ -22,25 +58,34 @@ from projects.permissions import IsProjectAuthor, IsProjectContributor, \
 
 # serializers
 from projects.serializers import ProjectSerializer, ContributorSerializer, IssueSerializer,\
-    CommentSerializer
+    CommentSerializer, IssueBulkUpdateSerializer, SearchResultSerializer, DeletionSerializer
 
+# signals
+from projects.signals import post_bulk_update
 
-class ProjectListCreateView(ListCreateAPIView):
+
+class ProjectListCreateView(InstrumentedViewMixin, CachedListMixin, ConditionalGetMixin,
+                            ListCreateAPIView):
     """
     Concrete view for listing a queryset or creating a Project instance.
     """
     serializer_class = ProjectSerializer
     # A user must be authenticated
     permission_classes = [IsAuthenticated]
+    response_cache_name = 'projects'
+
+    def get_response_version_key(self):
+        """
+        Override of the get_response_version_key method to depend on the projects of the user.
+        """
+        return response_cache.user_version_key(self.request.user.pk)
 
     def get_queryset(self):
         """
         Override of the get_queryset method to return projects related to the authenticated user.
         """
-        contributor_projects = Project.objects.filter(author=self.request.user)
-        author_projects = Project.objects.filter(contributors=self.request.user)
-        set_projects = set(list(chain(contributor_projects, author_projects)))
-        return set_projects
+        queryset = Project.objects.for_user(self.request.user)
+        return self.get_serializer_class().eager_load(queryset, self.request)
 
     def perform_create(self, serializer):
         """
@@ -49,37 +94,55 @@ class ProjectListCreateView(ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class ProjectRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class ProjectRetrieveUpdateDestroyView(InstrumentedViewMixin, ConditionalGetMixin,
+                                       BackgroundDestroyMixin, RetrieveUpdateDestroyAPIView):
     """
     Concrete view for retrieving, updating or deleting a Project instance.
+    A deleted project is hidden at once, its rows are deleted in the background.
     """
     serializer_class = ProjectSerializer
-    queryset = Project.objects.all()
     # The user must be authenticated, the author of the issue or admin.
     permission_classes = [IsAuthenticated, IsAuthor]
 
+    def get_queryset(self):
+        """
+        Override of the get_queryset method to load the relations serialized for the request.
+        """
+        return self.get_serializer_class().eager_load(Project.objects.all(), self.request)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Override of the destroy method to hide the project and queue the deletion of its rows.
+        """
+        return self.deletion_response(delete_project(self.get_object()))
+
 
-class ContributorListCreateView(ListCreateAPIView):
+class ContributorListCreateView(InstrumentedViewMixin, ListCreateAPIView):
     """
     Concrete view for listing a queryset or creating a Project instance.
     """
     serializer_class = ContributorSerializer
     # The user must be authenticated, be part of the contributor ou the author of the project.
     permission_classes = [IsAuthenticated, IsProjectAuthor]
+    # Contributor has no creation time.
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         """
         Override of the get_queryset method to return contributors related to the project.
         """
-        return Contributor.objects.filter(project__id=self.kwargs.get('id_project'))
+        queryset = Contributor.objects.filter(project__id=self.kwargs.get('id_project'))
+        return self.get_serializer_class().eager_load(queryset, self.request)
 
     def perform_create(self, serializer):
         """
         Override of the perform_create method to add the projet and user instance.
         """
-        user = get_object_or_404(CustomUser, pk=self.request.data.get("user"))
-        project = get_object_or_404(Project, pk=self.kwargs.get("id_project"))
-        if user == project.author:
+        user = get_object_or_404(
+            CustomUser.objects.filter(deleted_time__isnull=True), pk=self.request.data.get("user")
+        )
+        project = get_project_membership(self.request, self.kwargs.get("id_project")).project
+        if user.pk == project.author_id:
             raise ValidationError("An author cannot be added as a contributor")
         try:
             serializer.save(project=project, user=user)
@@ -87,7 +150,7 @@ class ContributorListCreateView(ListCreateAPIView):
             raise ValidationError('This user is already a contributor') from err
 
 
-class ContributorDestroyView(DestroyAPIView):
+class ContributorDestroyView(InstrumentedViewMixin, DestroyAPIView):
     """
     Concrete view for deleting a contributor instance.
     """
@@ -97,41 +160,107 @@ class ContributorDestroyView(DestroyAPIView):
     queryset = Contributor.objects.all()
 
 
-class IssueListCreateView(ListCreateAPIView):
+class IssueListCreateView(InstrumentedViewMixin, BulkCreateMixin, CachedListMixin,
+                          ConditionalGetMixin, ListCreateAPIView):
     """
     Concrete view for listing a queryset or creating a Issue instance.
+    A list of issues can be created in a batch, and the status and priority of
+    a list of issues can be updated in a batch.
     """
     serializer_class = IssueSerializer
     # The user must be authenticated, be part of the contributor ou the author of the project.
     permission_classes = [IsAuthenticated, IsProjectContributor]
+    # ?status=open,closed&priority=high&ordering=-priority
+    filter_backends = [AllowListFilterBackend]
+    filter_fields = ('status', 'priority', 'tag', 'assignee')
+    ordering_fields = ('created_time', 'updated_time', 'priority', 'status')
+    # The ordering fields are not unique, the cursor holds the whole ordering.
+    pagination_class = KeysetCursorPagination
+    response_cache_name = 'issues'
+
+    def get_response_version_key(self):
+        """
+        Override of the get_response_version_key method to depend on the issues of the project.
+        """
+        return response_cache.project_version_key(self.kwargs.get('id_project'))
 
     def get_queryset(self):
         """
         Override of the get_queryset method to return issues related to the project.
         """
-        return Issue.objects.filter(project__id=self.kwargs.get('id_project'))
+        queryset = Issue.objects.filter(project__id=self.kwargs.get('id_project'))
+        return self.get_serializer_class().eager_load(queryset, self.request)
 
-    def perform_create(self, serializer):
+    def get_save_kwargs(self):
+        """
+        Override of the get_save_kwargs method to add the projet author and assignee.
+        """
+        project = get_project_membership(self.request, self.kwargs.get("id_project")).project
+        return {'project': project, 'author': self.request.user, 'assignee': project.author}
+
+    def patch(self, request, *args, **kwargs):
         """
-        Override of the perform_create method to add the projet author and assignee.
+        Updates the status and priority of a list of issues with bulk_update in a single
+        transaction. The errors are reported at the index of each item.
         """
-        project = get_object_or_404(Project, pk=self.kwargs.get("id_project"))
-        serializer.save(project=project, author=self.request.user, assignee=project.author)
+        if not isinstance(request.data, list):
+            raise ValidationError("Expected a list of issues.")
+        if len(request.data) > settings.MAX_BULK_SIZE:
+            raise ValidationError(f"A batch contains at most {settings.MAX_BULK_SIZE} items.")
+        serializer = IssueBulkUpdateSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+        issues = self.get_queryset().in_bulk([item['id'] for item in items])
 
+        errors = []
+        for item in items:
+            issue = issues.get(item['id'])
+            if issue is None:
+                errors.append({'id': ["This issue does not belong to the project."]})
+            elif not (request.user.is_superuser or issue.author_id == request.user.pk):
+                errors.append({'id': ["You do not have permission to update this issue."]})
+            else:
+                errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
 
-class IssueRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+        updated_time = timezone.now()
+        fields = {'updated_time'}
+        for item in items:
+            issue = issues[item['id']]
+            for field in ('status', 'priority'):
+                if field in item:
+                    setattr(issue, field, item[field])
+                    fields.add(field)
+            issue.updated_time = updated_time
+        instances = [issues[pk] for pk in dict.fromkeys(item['id'] for item in items)]
+        with transaction.atomic():
+            Issue.objects.bulk_update(instances, fields, batch_size=settings.BULK_BATCH_SIZE)
+            post_bulk_update.send(sender=Issue, instances=instances, fields=fields)
+        return Response(self.get_serializer(instances, many=True).data)
+
+
+class IssueRetrieveUpdateDestroyView(InstrumentedViewMixin, ConditionalGetMixin,
+                                     RetrieveUpdateDestroyAPIView):
     """
     Concrete view for retrieving, updating or deleting a Issue instance.
     """
     serializer_class = IssueSerializer
-    queryset = Issue.objects.all()
     # The user must be authenticated, be part of the contributor ou the author of the project.
     permission_classes = [IsAuthenticated, IsAuthorOrContributor]
 
+    def get_queryset(self):
+        """
+        Override of the get_queryset method to load the relations serialized for the request.
+        """
+        return self.get_serializer_class().eager_load(Issue.objects.all(), self.request)
+
 
-class CommentListCreateView(ListCreateAPIView):
+class CommentListCreateView(InstrumentedViewMixin, BulkCreateMixin, ConditionalGetMixin,
+                            ListCreateAPIView):
     """
     Concrete view for listing a queryset or creating a Comment instance.
+    A list of comments can be created in a batch.
     """
     serializer_class = CommentSerializer
     # The user must be authenticated, be part of the contributor ou the author of the project.
@@ -141,20 +270,149 @@ class CommentListCreateView(ListCreateAPIView):
         """
         Override of the get_queryset method to return comments related to the issue.
         """
-        return Comment.objects.filter(issue__id=self.kwargs.get('id_issue'))
+        queryset = Comment.objects.filter(issue__id=self.kwargs.get('id_issue'))
+        return self.get_serializer_class().eager_load(queryset, self.request)
 
-    def perform_create(self, serializer):
+    def get_save_kwargs(self):
         """
-        Override of the perform_create method to add the issue and author.
+        Override of the get_save_kwargs method to add the issue and author.
         """
         issue = get_object_or_404(Issue, pk=self.kwargs.get("id_issue"))
-        serializer.save(issue=issue, author=self.request.user)
+        return {'issue': issue, 'author': self.request.user}
 
 
-class CommentRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class CommentRetrieveUpdateDestroyView(InstrumentedViewMixin, ConditionalGetMixin,
+                                       RetrieveUpdateDestroyAPIView):
     """
     Concrete view for retrieving, updating or deleting a Comment instance.
     """
     serializer_class = CommentSerializer
-    queryset = Comment.objects.all()
     permission_classes = [IsAuthenticated, IsAuthorOrContributor]
+
+    def get_queryset(self):
+        """
+        Override of the get_queryset method to load the relations serialized for the request.
+        """
+        return self.get_serializer_class().eager_load(Comment.objects.all(), self.request)
+
+
+class ProjectExportView(InstrumentedViewMixin, APIView):
+    """
+    Concrete view for streaming the export of a project as newline-delimited JSON.
+    """
+    # The user must be authenticated, be part of the contributor ou the author of the project.
+    permission_classes = [IsAuthenticated, IsProjectContributor]
+
+    def get(self, request, id_project):
+        """Streams the project, its contributors, issues and comments."""
+        return ExportResponse(id_project)
+
+
+class ProjectEventsView(InstrumentedViewMixin, APIView):
+    """
+    Concrete view for streaming the events of the issues, comments and contributors of a
+    project as server-sent events. The stream resumes after the Last-Event-ID header, or the
+    last_event_id query parameter, and is closed when the access token expires.
+    """
+    # The user must be authenticated, be part of the contributor ou the author of the project.
+    permission_classes = [IsAuthenticated, IsProjectContributor]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, id_project):
+        """Streams the events of the project."""
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') \
+            or request.query_params.get('last_event_id')
+        expires_at = request.auth.get('exp') if request.auth is not None else None
+        return EventStreamResponse(id_project, request.user.pk, last_event_id, expires_at)
+
+
+class SyncView(InstrumentedViewMixin, APIView):
+    """
+    Concrete view for retrieving the projects, contributors, issues and comments of the user
+    created, updated or deleted since the token of ?since=. Without it, only the current token
+    is returned, to sync from once the projects are loaded.
+    """
+    # A user must be authenticated
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Returns the changes since the token, or the current token."""
+        token = request.query_params.get('since')
+        if token is None:
+            return Response({'token': str(current_token())})
+        since = parse_token(token)
+        if since is None:
+            raise ValidationError({'since': ["A valid token is required."]})
+        return Response(changes_since(request.user, since, settings.SYNC_PAGE_SIZE))
+
+
+class SearchView(InstrumentedViewMixin, ListAPIView):
+    """
+    Concrete view for searching the issues and comments of the projects of the user with ?q=.
+    The results are ranked by relevance.
+    """
+    serializer_class = SearchResultSerializer
+    pagination_class = SearchPagination
+    # A user must be authenticated
+    permission_classes = [IsAuthenticated]
+
+    def get_projects(self):
+        """Returns the projects searched."""
+        return Project.objects.for_user(self.request.user)
+
+    def get_queryset(self):
+        """
+        Override of the get_queryset method to return the lazy results of the search.
+        """
+        query = self.request.query_params.get('q', '')
+        if not parse_terms(query):
+            raise ValidationError({'q': ["A search term is required."]})
+        backend = get_search_backend(router.db_for_read(Issue))
+        return backend.search(query, self.get_projects())
+
+
+class ProjectSearchView(SearchView):
+    """
+    Concrete view for searching the issues and comments of a project with ?q=.
+    """
+    # The user must be authenticated, be part of the contributor ou the author of the project.
+    permission_classes = [IsAuthenticated, IsProjectContributor]
+
+    def get_projects(self):
+        """Returns the project of the url."""
+        return Project.objects.filter(pk=self.kwargs['id_project'])
+
+
+class DeletionView(InstrumentedViewMixin, RetrieveAPIView):
+    """
+    Concrete view for retrieving the progress of the background deletion of a project or a user.
+    """
+    queryset = Deletion.objects.all()
+    serializer_class = DeletionSerializer
+    # The id of a deletion is random and known by its requester only, a deleted user can no
+    # longer authenticate.
+    permission_classes = [AllowAny]
+
+
+class MembershipCacheStatsView(InstrumentedViewMixin, APIView):
+    """
+    Concrete view for retrieving the hit and miss counters of the membership cache.
+    """
+    # The user must be admin.
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Returns the counters of the process."""
+        return Response(membership_cache.stats())
+
+
+class ResponseCacheStatsView(InstrumentedViewMixin, APIView):
+    """
+    Concrete view for retrieving the hit ratios of the response cache per list.
+    """
+    # The user must be admin.
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Returns the counters of the process."""
+        return Response(response_cache.stats())